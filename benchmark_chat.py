@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /chat latency with a per-request MCP subprocess vs the session pool
+
+A stub LLM replaces Claude so only the MCP overhead is measured: every
+conversation makes one tool call (get_cart) and then ends. The backend the
+tool talks to does not need to be running; the tool returns an error payload.
+
+Usage (from the repository root):
+    python benchmark_chat.py [--requests 30] [--concurrency 1 4] [--pool-size 4]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from mcp.client.session import ClientSession
+from mcp.client.stdio import stdio_client
+
+import service
+from mcp_pool import McpSessionPool
+
+
+class StubClaude:
+    """Mimics claude.messages.create: one tool_use turn, then end_turn."""
+
+    def __init__(self):
+        self.messages = self
+
+    async def create(self, messages, **_):
+        if len(messages) == 1:
+            tool_use = SimpleNamespace(type="tool_use", id="toolu_1", name="get_cart", input={"cart_id": "cart-1"})
+            return SimpleNamespace(stop_reason="tool_use", content=[tool_use])
+        return SimpleNamespace(stop_reason="end_turn", content=[SimpleNamespace(type="text", text="Your cart is empty.")])
+
+
+async def chat_spawning(message: str):
+    """The previous /chat: new subprocess + initialize + list_tools per call."""
+    async with stdio_client(service.server_params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as client:
+            await client.initialize()
+            tools = (await client.list_tools()).tools
+            return await service.run_conversation(client, service.tool_definitions(tools), message)
+
+
+async def chat_pooled(pool: McpSessionPool, message: str):
+    async with pool.session() as client:
+        return await service.run_conversation(client, service.tool_definitions(pool.tools), message)
+
+
+async def measure(call, requests: int, concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return samples, requests / (time.perf_counter() - start)
+
+
+def fmt(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"{statistics.median(ordered):8.1f} / {p99:8.1f}"
+
+
+async def main(args):
+    service.claude = StubClaude()
+    pool = McpSessionPool(service.server_params, size=args.pool_size)
+    start = time.perf_counter()
+    await pool.start()
+    print(f"Pool of {args.pool_size} warmed in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    print(f"{'conc':>5}  {'spawn p50/p99 ms':>20}  {'spawn req/s':>11}  {'pool p50/p99 ms':>20}  {'pool req/s':>10}")
+    try:
+        for concurrency in args.concurrency:
+            spawn, spawn_rps = await measure(lambda: chat_spawning("show my cart"), args.requests, concurrency)
+            pooled, pool_rps = await measure(lambda: chat_pooled(pool, "show my cart"), args.requests, concurrency)
+            print(f"{concurrency:>5}  {fmt(spawn):>20}  {spawn_rps:>11.1f}  {fmt(pooled):>20}  {pool_rps:>10.1f}")
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--pool-size", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
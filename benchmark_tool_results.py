@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt tokens of a canned agent conversation, full JSON vs shaped tool results
+
+Replays a fixed shopping conversation (search -> "show me more" -> add to
+cart -> checkout) and counts the tokens of every tool result and of the
+prompt the model is sent on each turn, where each prompt re-sends all
+earlier tool results. "before" is what FastMCP emitted for the old dict/list
+return values (indented JSON); "after" is the tool_results encoding.
+
+Tokens are counted with tiktoken's cl100k_base when it is installed, and
+approximated (words + punctuation marks) otherwise.
+
+Usage (from the repository root):
+    python benchmark_tool_results.py [--hits 24] [--page-size 8]
+"""
+import argparse
+import json
+import random
+import re
+
+from telegram_ucp_project.tool_results import ResultPages, encode_record
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+    TOKENIZER = "tiktoken cl100k_base"
+except ImportError:
+    def count_tokens(text: str) -> int:
+        return len(re.findall(r"\w+|[^\w\s]", text))
+    TOKENIZER = "approximate (words + punctuation)"
+
+SYSTEM_PROMPT = "You are a shopping assistant. Use the available tools to search products, manage carts, and place orders."
+USER_TURNS = ["find me organic honey under 900", "show me more options", "add the cheapest one to my cart", "check out, deliver today 5-7pm"]
+
+
+def canned_hits(count: int, seed: int = 3) -> list[dict]:
+    """Federated search hits shaped like the Shopify, Supabase and Hub sources."""
+    rng = random.Random(seed)
+    hits = []
+    for i in range(count):
+        source = ("shopify", "supabase", "gaura")[i % 3]
+        name = f"{rng.choice(['Wild', 'Raw', 'Forest', 'Organic'])} Honey {rng.choice([250, 500, 1000])}g"
+        hit = {
+            "id": f"gid://shopify/Product/{8800000000 + i}" if source == "shopify" else f"{source}-{i}",
+            "name": name,
+            "price": float(rng.randint(150, 900)),
+            "currency": "INR",
+            "description": f"{name} harvested by a small co-operative in the Western Ghats. Unprocessed, "
+                           "cold-extracted and filtered through cloth; no added sugar or preservatives.",
+            "source": source,
+        }
+        if source == "shopify":
+            hit["image"] = f"https://cdn.shopify.com/s/files/1/0000/0000/products/honey-{i}.jpg?v=1700000000"
+            hit["variant_id"] = f"gid://shopify/ProductVariant/{4400000000 + i}"
+        else:
+            hit.update(size=rng.choice(["250g", "500g", "1kg"]), seller_location=rng.choice(["Civil Lines", "Mall Road"]), stock=rng.randint(0, 40))
+        hits.append(hit)
+    return hits
+
+
+def conversation(hits: list[dict], pages: ResultPages | None) -> list[tuple[str, str]]:
+    """(tool name, tool result text) for each assistant turn; None pages = old encoding."""
+    cheapest = min(hits, key=lambda h: h["price"])
+    cart = {"cart_id": "cart-1a2b3c4d", "user_id": "user-123", "items": [
+        {"product_id": cheapest["id"], "name": cheapest["name"], "price": cheapest["price"], "size": cheapest.get("size"), "qty": 1}]}
+    order = {"order_id": "order-9f8e7d6c", "status": "placed", "user_id": "user-123", "items": cart["items"],
+             "delivery_slot": "today 5-7pm", "total_price": cheapest["price"], "created_at": "2026-10-18T09:30:00",
+             "payment_status": "pending", "delivery_status": "not_started"}
+
+    if pages is None:
+        indented = lambda value: json.dumps(value, indent=2, ensure_ascii=False)
+        # Without continuations the whole list was already in the first result.
+        return [("search_products", indented(hits)), ("", ""), ("add_item_to_cart", indented(cart)), ("checkout_cart", indented(order))]
+
+    first = pages.first_page("search_products", hits)
+    token = re.search(r'token="([^"]+)"', first).group(1)
+    return [("search_products", first), ("get_more", pages.next_page(token)),
+            ("add_item_to_cart", encode_record(cart)), ("checkout_cart", encode_record(order))]
+
+
+def replay(turns: list[tuple[str, str]]) -> tuple[list[int], list[int]]:
+    """Tokens of each tool result, and of the prompt sent after it."""
+    history = count_tokens(SYSTEM_PROMPT)
+    result_tokens, prompt_tokens = [], []
+    for user_turn, (_, result) in zip(USER_TURNS, turns):
+        history += count_tokens(user_turn) + count_tokens(result)
+        result_tokens.append(count_tokens(result))
+        prompt_tokens.append(history)
+    return result_tokens, prompt_tokens
+
+
+def main(args):
+    hits = canned_hits(args.hits)
+    before = conversation(hits, None)
+    after = conversation(hits, ResultPages(page_size=args.page_size))
+    before_results, before_prompts = replay(before)
+    after_results, after_prompts = replay(after)
+
+    print(f"Tokenizer: {TOKENIZER}; {args.hits} search hits, page size {args.page_size}\n")
+    print(f"{'turn':>36}  {'result before':>13}  {'result after':>12}  {'prompt before':>13}  {'prompt after':>12}")
+    for i, user_turn in enumerate(USER_TURNS):
+        print(f"{user_turn[:36]:>36}  {before_results[i]:>13}  {after_results[i]:>12}  {before_prompts[i]:>13}  {after_prompts[i]:>12}")
+    total_before, total_after = sum(before_prompts), sum(after_prompts)
+    print(f"\nPrompt tokens over the conversation: {total_before} -> {total_after} "
+          f"({100 * (1 - total_after / total_before):.0f}% fewer)")
+    if args.show:
+        print("\nFirst search result after shaping:\n" + after[0][1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hits", type=int, default=24)
+    parser.add_argument("--page-size", type=int, default=8)
+    parser.add_argument("--show", action="store_true", help="print the shaped search result")
+    main(parser.parse_args())
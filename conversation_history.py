@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted conversation history for the Gemini orchestrator
+
+Every generate_content call re-sends the whole history, so an unbounded list
+makes each turn slower and more expensive than the last. ConversationHistory
+groups the history into exchanges (a user message plus the model turns and
+function responses it led to) and keeps the prompt under `token_budget`:
+
+1. Function responses of older exchanges are cut to `max_result_chars`; the
+   last `keep_recent` exchanges keep their tool results intact.
+2. If that is not enough, the oldest exchanges are folded into a rolling
+   text summary (user request, tools called, IDs they returned, final
+   answer) that is sent ahead of the retained exchanges.
+
+The system instruction lives in GenerateContentConfig and is never touched.
+Token counts are estimated (about 4 characters per token); record_usage()
+logs the real prompt_token_count Gemini reports next to the estimate.
+
+    history = ConversationHistory(token_budget=8000)
+    history.start_exchange(user_text)
+    response = generate_content(contents=history.contents(), ...)
+    history.record_usage(response.usage_metadata)
+    history.append(response.candidates[0].content)
+"""
+import json
+import re
+from dataclasses import dataclass, field
+
+from google.genai import types
+
+CHARS_PER_TOKEN = 4
+# IDs worth remembering after the tool result that produced them is gone.
+_ID_PATTERN = re.compile(r"\b(?:cart|order)-[0-9a-f]{6,}\b")
+
+
+def estimate_tokens(content: types.Content) -> int:
+    return len(content.model_dump_json(exclude_none=True)) // CHARS_PER_TOKEN + 1
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+@dataclass
+class Exchange:
+    contents: list = field(default_factory=list)
+    tokens: int = 0
+    compacted: bool = False
+    # Collected on add(), before compaction can cut them out of the results.
+    ids: list = field(default_factory=list)
+
+    def add(self, content: types.Content):
+        self.contents.append(content)
+        self.tokens += estimate_tokens(content)
+        for part in content.parts or []:
+            if part.function_response is not None:
+                for found in _ID_PATTERN.findall(json.dumps(part.function_response.response, default=str)):
+                    if found not in self.ids:
+                        self.ids.append(found)
+
+    def summary_line(self, limit: int = 160) -> str:
+        user_text, answer, tools = "", "", []
+        for content in self.contents:
+            for part in content.parts or []:
+                if part.function_call is not None:
+                    tools.append(part.function_call.name)
+                elif part.text:
+                    if content.role == "user" and not user_text:
+                        user_text = part.text
+                    elif content.role == "model":
+                        answer = part.text
+        line = f"- User: {_clip(user_text, limit)}"
+        if tools:
+            line += f" | tools: {', '.join(dict.fromkeys(tools))}"
+        if self.ids:
+            line += f" | ids: {', '.join(self.ids)}"
+        if answer:
+            line += f" | Assistant: {_clip(answer, limit)}"
+        return line
+
+
+class ConversationHistory:
+    def __init__(
+        self,
+        token_budget: int = 8000,
+        keep_recent: int = 2,
+        max_result_chars: int = 400,
+        max_summary_chars: int = 2000,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.max_result_chars = max_result_chars
+        self.max_summary_chars = max_summary_chars
+        self.exchanges: list[Exchange] = []
+        self.summary_lines: list[str] = []
+        self.summarized = 0
+        self.prompt_sizes: list[dict] = []
+
+    def start_exchange(self, user_text: str):
+        exchange = Exchange()
+        exchange.add(types.Content(role="user", parts=[types.Part(text=user_text)]))
+        self.exchanges.append(exchange)
+
+    def append(self, content: types.Content):
+        """Add a model turn or function responses to the current exchange."""
+        self.exchanges[-1].add(content)
+
+    @property
+    def estimated_tokens(self) -> int:
+        summary = sum(len(line) for line in self.summary_lines) // CHARS_PER_TOKEN
+        return summary + sum(exchange.tokens for exchange in self.exchanges)
+
+    def contents(self) -> list[types.Content]:
+        """The history to send, trimmed to the token budget."""
+        self._enforce_budget()
+        contents = [content for exchange in self.exchanges for content in exchange.contents]
+        if self.summary_lines:
+            # Prepend to the first retained user message so the roles still
+            # alternate user/model.
+            summary = "[Summary of the earlier conversation]\n" + "\n".join(self.summary_lines)
+            first = contents[0]
+            contents[0] = types.Content(role=first.role, parts=[types.Part(text=summary), *first.parts])
+        return contents
+
+    def record_usage(self, usage_metadata) -> dict:
+        """Log the prompt size of the call just made; returns the record."""
+        record = {
+            "turn": len(self.prompt_sizes) + 1,
+            "prompt_tokens": getattr(usage_metadata, "prompt_token_count", None),
+            "estimated_tokens": self.estimated_tokens,
+            "exchanges": len(self.exchanges),
+            "summarized": self.summarized,
+        }
+        self.prompt_sizes.append(record)
+        print(
+            f"[📏 PROMPT] turn {record['turn']}: {record['prompt_tokens']} tokens "
+            f"(est. {record['estimated_tokens']}), {record['exchanges']} exchanges kept, "
+            f"{record['summarized']} summarized"
+        )
+        return record
+
+    def _enforce_budget(self):
+        if self.estimated_tokens <= self.token_budget:
+            return
+        older = self.exchanges[:-self.keep_recent] if self.keep_recent else self.exchanges[:-1]
+        for exchange in older:
+            if not exchange.compacted:
+                self._compact(exchange)
+            if self.estimated_tokens <= self.token_budget:
+                return
+        # Never fold the exchange in progress, or the recent ones.
+        while self.estimated_tokens > self.token_budget and len(self.exchanges) > max(1, self.keep_recent):
+            self._summarize(self.exchanges.pop(0))
+
+    def _compact(self, exchange: Exchange):
+        """Cut long function responses of an older exchange."""
+        compacted = Exchange(compacted=True, ids=exchange.ids)
+        for content in exchange.contents:
+            parts = []
+            for part in content.parts or []:
+                response = part.function_response
+                if response is not None:
+                    text = json.dumps(response.response, default=str, ensure_ascii=False)
+                    if len(text) > self.max_result_chars:
+                        part = types.Part(function_response=types.FunctionResponse(
+                            name=response.name,
+                            response={"result": text[:self.max_result_chars] + "…(truncated)"},
+                        ))
+                parts.append(part)
+            compacted.add(types.Content(role=content.role, parts=parts))
+        exchange.contents, exchange.tokens, exchange.compacted = compacted.contents, compacted.tokens, True
+
+    def _summarize(self, exchange: Exchange):
+        self.summary_lines.append(exchange.summary_line())
+        self.summarized += 1
+        while len(self.summary_lines) > 1 and sum(len(line) + 1 for line in self.summary_lines) > self.max_summary_chars:
+            self.summary_lines.pop(0)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Pool of warm MCP client sessions
+
+Starting `mcp_server_official.py` over stdio and running initialize() +
+list_tools() costs hundreds of milliseconds. McpSessionPool keeps `size`
+sessions running for the lifetime of the app and hands them out one request
+at a time:
+
+    pool = McpSessionPool(StdioServerParameters(command="python3", args=["mcp_server_official.py"]))
+    await pool.start()
+    async with pool.session() as client:
+        await client.call_tool(...)
+    await pool.close()
+
+The tool list is fetched once and cached. A session that raised while
+checked out, or that has sat idle longer than `health_check_interval`, is
+pinged before reuse and restarted if the ping fails.
+"""
+import asyncio
+import contextlib
+import time
+
+from mcp.client.session import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+
+class PooledSession:
+    """One MCP server process + initialized ClientSession.
+
+    stdio_client() and ClientSession are context managers that must be
+    entered and exited by the same task, so a background task owns them and
+    keeps them open until close().
+    """
+
+    def __init__(self, server_params: StdioServerParameters):
+        self.server_params = server_params
+        self.client: ClientSession | None = None
+        self.tools = []
+        self.last_used = time.monotonic()
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float):
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        await asyncio.wait_for(ready, timeout)
+
+    async def _run(self, ready: asyncio.Future):
+        try:
+            async with stdio_client(self.server_params) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as client:
+                    await client.initialize()
+                    self.tools = (await client.list_tools()).tools
+                    self.client = client
+                    ready.set_result(None)
+                    await self._stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.client = None
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.alive or self.client is None:
+            return False
+        try:
+            await asyncio.wait_for(self.client.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    async def close(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except Exception:
+            self._task.cancel()
+            with contextlib.suppress(BaseException):
+                await self._task
+
+
+class McpSessionPool:
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = 2,
+        startup_timeout: float = 30.0,
+        checkout_timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 2.0,
+    ):
+        self.server_params = server_params
+        self.size = size
+        self.startup_timeout = startup_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.tools = []
+        self.restarts = 0
+        self._idle: asyncio.Queue[PooledSession] = asyncio.Queue()
+        self._sessions: set[PooledSession] = set()
+
+    async def _spawn(self) -> PooledSession:
+        pooled = PooledSession(self.server_params)
+        await pooled.start(self.startup_timeout)
+        self._sessions.add(pooled)
+        if not self.tools:
+            self.tools = pooled.tools
+        return pooled
+
+    async def start(self):
+        """Start `size` sessions concurrently and cache the tool list."""
+        sessions = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+        for pooled in sessions:
+            self._idle.put_nowait(pooled)
+
+    async def _restart(self, pooled: PooledSession) -> PooledSession:
+        self._sessions.discard(pooled)
+        await pooled.close()
+        self.restarts += 1
+        print("♻️  [MCP pool] Restarting crashed MCP session")
+        return await self._spawn()
+
+    async def _checkout(self) -> PooledSession:
+        pooled = await asyncio.wait_for(self._idle.get(), self.checkout_timeout)
+        idle_for = time.monotonic() - pooled.last_used
+        if not pooled.alive or (idle_for > self.health_check_interval and not await pooled.ping(self.ping_timeout)):
+            try:
+                pooled = await self._restart(pooled)
+            except BaseException:
+                # Keep the pool at full size; the next checkout retries.
+                self._idle.put_nowait(PooledSession(self.server_params))
+                raise
+        return pooled
+
+    async def _checkin(self, pooled: PooledSession, failed: bool):
+        if failed and not await pooled.ping(self.ping_timeout):
+            try:
+                pooled = await self._restart(pooled)
+            except Exception:
+                # Put back the dead session; checkout restarts it later.
+                pass
+        pooled.last_used = time.monotonic()
+        self._idle.put_nowait(pooled)
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        """Check out a warm ClientSession; it is returned to the pool on exit."""
+        pooled = await self._checkout()
+        failed = False
+        try:
+            yield pooled.client
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self._checkin(pooled, failed)
+
+    async def close(self):
+        await asyncio.gather(*(pooled.close() for pooled in self._sessions))
+        self._sessions.clear()
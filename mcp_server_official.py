@@ -4,28 +4,90 @@ Official FastMCP Server Pattern
 Based on: https://github.com/modelcontextprotocol/python-sdk
 """
 from mcp.server.fastmcp import FastMCP
+import contextlib
 import httpx
 import json
+import os
+
+from telegram_ucp_project.tool_results import ResultPages, encode_record
+from telegram_ucp_project.ttl_cache import TTLCache
 
 BACKEND_URL = "http://localhost:8001"
-mcp = FastMCP("ecommerce-marketplace")
-
-async def call_backend(endpoint: str, method: str = "GET", data: dict = None, params: dict = None):
-    """Call backend API"""
-    async with httpx.AsyncClient(timeout=10) as client:
-        try:
-            if method == "GET":
-                resp = await client.get(f"{BACKEND_URL}{endpoint}", params=params)
-            else:
-                resp = await client.post(f"{BACKEND_URL}{endpoint}", json=data)
-            if resp.status_code >= 400:
-                return {"error": f"Backend error: {resp.text}"}
-            return resp.json()
-        except Exception as e:
-            return {"error": str(e)}
+CACHE_TTL_SECONDS = float(os.environ.get("MCP_CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.environ.get("MCP_CACHE_MAX_ENTRIES", "256"))
+
+# One keep-alive client for the life of the server (opened by the lifespan)
+backend_client: httpx.AsyncClient | None = None
+
+def _new_backend_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=BACKEND_URL,
+        timeout=10,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
+
+@contextlib.asynccontextmanager
+async def lifespan(server):
+    global backend_client
+    backend_client = _new_backend_client()
+    try:
+        yield {}
+    finally:
+        await backend_client.aclose()
+        backend_client = None
+
+mcp = FastMCP("ecommerce-marketplace", lifespan=lifespan)
+
+
+response_cache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+# List results reach the model as a capped, compact table; get_more pages on.
+tool_pages = ResultPages(
+    page_size=int(os.environ.get("MCP_RESULT_PAGE_SIZE", "8")),
+    max_chars=int(os.environ.get("MCP_RESULT_MAX_CHARS", "1500")),
+)
+
+def _normalize(value):
+    """Normalize argument values so equivalent calls share a cache key."""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+def cache_key(endpoint: str, params: dict = None) -> tuple:
+    return (endpoint, tuple(sorted((k, _normalize(v)) for k, v in (params or {}).items() if v is not None)))
+
+async def call_backend(endpoint: str, method: str = "GET", data: dict = None, params: dict = None, cache: bool = False):
+    """Call backend API
+
+    With `cache=True` (read-only GETs only) successful responses are kept for
+    CACHE_TTL_SECONDS, keyed by endpoint and normalized params.
+    """
+    global backend_client
+    if cache:
+        key = cache_key(endpoint, params)
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+    if backend_client is None:
+        backend_client = _new_backend_client()
+    try:
+        if method == "GET":
+            resp = await backend_client.get(endpoint, params=params)
+        else:
+            resp = await backend_client.post(endpoint, json=data)
+        if resp.status_code >= 400:
+            return {"error": f"Backend error: {resp.text}"}
+        result = resp.json()
+    except Exception as e:
+        return {"error": str(e)}
+    if cache:
+        response_cache.put(key, result)
+    return result
 
 @mcp.tool()
-async def search_products(query: str = None, max_price: float = None, location: str = None) -> dict:
+async def search_products(query: str = None, max_price: float = None, location: str = None) -> str:
     """
     Search for products in the catalog.
     
@@ -40,42 +102,58 @@ async def search_products(query: str = None, max_price: float = None, location:
     - "black t-shirts under 400 from civil lines" → query="black t-shirt", max_price=400, location="Civil Lines"
     - "jeans in mall road under 900" → query="jeans", max_price=900, location="Mall Road"
     - "hoodies from rajpur road" → query="hoodie", location="Rajpur Road"
+
+    Returns a table: a summary line (with a get_more token when more rows
+    exist), a `|`-separated header, then one row per product.
     """
     params = {k: v for k, v in {"q": query, "max_price": max_price, "location": location}.items() if v is not None}
-    return await call_backend("/catalog/search", params=params)
+    result = await call_backend("/catalog/search", params=params, cache=True)
+    if "error" in result:
+        return encode_record(result)
+    return tool_pages.first_page("search_products", result.get("items", []))
+
+@mcp.tool()
+async def get_more(token: str) -> str:
+    """Fetch the next rows of an earlier result, using the token from its get_more hint"""
+    return tool_pages.next_page(token)
 
 @mcp.tool()
-async def create_cart(user_id: str) -> dict:
+async def create_cart(user_id: str) -> str:
     """Create a new shopping cart for a user"""
-    return await call_backend("/cart", "POST", {"user_id": user_id})
+    return encode_record(await call_backend("/cart", "POST", {"user_id": user_id}))
 
 @mcp.tool()
-async def add_item_to_cart(cart_id: str, product_id: str, qty: int) -> dict:
+async def add_item_to_cart(cart_id: str, product_id: str, qty: int) -> str:
     """Add an item to the shopping cart"""
-    return await call_backend(
+    return encode_record(await call_backend(
         f"/cart/{cart_id}/items",
         "POST",
         {"cart_id": cart_id, "product_id": product_id, "qty": qty}
-    )
+    ))
 
 @mcp.tool()
-async def create_order(cart_id: str, user_id: str, delivery_slot: str = "today 5-7pm") -> dict:
+async def create_order(cart_id: str, user_id: str, delivery_slot: str = "today 5-7pm") -> str:
     """Create an order from a cart"""
-    return await call_backend(
+    return encode_record(await call_backend(
         "/order",
         "POST",
         {"cart_id": cart_id, "user_id": user_id, "delivery_slot": delivery_slot}
-    )
+    ))
 
 @mcp.tool()
-async def get_cart(cart_id: str) -> dict:
+async def get_cart(cart_id: str) -> str:
     """Get the contents of a shopping cart"""
-    return await call_backend(f"/cart/{cart_id}")
+    return encode_record(await call_backend(f"/cart/{cart_id}"))
 
 @mcp.tool()
-async def get_order_status(order_id: str) -> dict:
+async def get_order_status(order_id: str) -> str:
     """Get the status of an order"""
-    return await call_backend(f"/order/{order_id}")
+    return encode_record(await call_backend(f"/order/{order_id}"))
+
+@mcp.tool()
+async def cache_stats() -> dict:
+    """Diagnostics: hit/miss counters of the backend response cache."""
+    return response_cache.stats()
 
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
@@ -5,16 +5,21 @@ MCP Orchestrator - Powered by Google Gemini (google-genai SDK, REST API)
 import asyncio
 import os
 import json
+import time
 from mcp.client.stdio import stdio_client, StdioServerParameters
 from mcp.client.session import ClientSession
 from google import genai
 from google.genai import types
 
+from conversation_history import ConversationHistory
+from tool_dispatcher import dispatch_tool_calls
+
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("❌ GEMINI_API_KEY not set. Run: export GEMINI_API_KEY='your-key'")
 
 client_gemini = genai.Client(api_key=GEMINI_API_KEY)
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "8000"))
 
 
 def mcp_tool_to_gemini_declaration(tool) -> dict:
@@ -81,8 +86,8 @@ async def main():
             print("Tools:", [t.name for t in tools_response.tools])
             print("\nType 'exit' to quit.\n")
 
-            # Maintain conversation history manually
-            conversation: list[types.Content] = []
+            # Maintain conversation history manually, within a token budget
+            history = ConversationHistory(token_budget=HISTORY_TOKEN_BUDGET)
 
             while True:
                 try:
@@ -96,24 +101,23 @@ async def main():
                     print("[🤖 Gemini] Thinking...")
 
                     # Add user message to history
-                    conversation.append(
-                        types.Content(role="user", parts=[types.Part(text=user_input)])
-                    )
+                    history.start_exchange(user_input)
 
                     # Agentic loop
                     while True:
                         response = await asyncio.to_thread(
                             client_gemini.models.generate_content,
                             model="gemini-2.0-flash",
-                            contents=conversation,
+                            contents=history.contents(),
                             config=config,
                         )
+                        history.record_usage(response.usage_metadata)
 
                         candidate = response.candidates[0]
                         model_content = candidate.content
 
                         # Add model response to history
-                        conversation.append(model_content)
+                        history.append(model_content)
 
                         # Check for function calls
                         fn_calls = [
@@ -130,36 +134,31 @@ async def main():
                             print(f"\n[🤖 ASSISTANT]\n{text}\n")
                             break
 
-                        # Execute tools
-                        tool_response_parts = []
-                        for fn_call in fn_calls:
-                            tool_name = fn_call.name
-                            tool_args = dict(fn_call.args) if fn_call.args else {}
+                        # Execute tools (independent calls run concurrently)
+                        calls = [(fn_call.name, dict(fn_call.args) if fn_call.args else {}) for fn_call in fn_calls]
+                        for tool_name, tool_args in calls:
                             print(f"[🔧 CALLING] {tool_name}({tool_args})")
 
-                            try:
-                                result = await mcp_client.call_tool(tool_name, tool_args)
-                                result_text = result.content[0].text if result.content else "{}"
-                                try:
-                                    result_data = json.loads(result_text)
-                                except Exception:
-                                    result_data = {"result": result_text}
-                                print(f"[✓] {tool_name} → {str(result_data)[:120]}")
-                            except Exception as e:
-                                result_data = {"error": str(e)}
-                                print(f"[✗] {tool_name}: {e}")
-
-                            tool_response_parts.append(
-                                types.Part(
-                                    function_response=types.FunctionResponse(
-                                        name=tool_name,
-                                        response={"result": result_data},
-                                    )
+                        start = time.perf_counter()
+                        results = await dispatch_tool_calls(mcp_client, calls)
+                        for call in results:
+                            mark = "✓" if call.ok else "✗"
+                            print(f"[{mark}] {call.name} ({call.elapsed_ms:.0f}ms) → {str(call.data)[:120]}")
+                        if len(results) > 1:
+                            print(f"[⏱️] {len(results)} tools in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+                        tool_response_parts = [
+                            types.Part(
+                                function_response=types.FunctionResponse(
+                                    name=call.name,
+                                    response={"result": call.data},
                                 )
                             )
+                            for call in results
+                        ]
 
                         # Add tool results to history and loop back
-                        conversation.append(
+                        history.append(
                             types.Content(role="user", parts=tool_response_parts)
                         )
 
@@ -3,19 +3,34 @@
 Orchestrator as HTTP Service
 Based on the working CLI version, converted to FastAPI
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import asyncio
+import contextlib
+import json
 import os
-from mcp.client.stdio import stdio_client, StdioServerParameters
-from mcp.client.session import ClientSession
+import time
+from mcp.client.stdio import StdioServerParameters
+from mcp_pool import McpSessionPool
 import anthropic
 from dotenv import load_dotenv
 import os
 load_dotenv()
 
-app = FastAPI()
+server_params = StdioServerParameters(command="python3", args=["mcp_server_official.py"])
+mcp_pool = McpSessionPool(server_params, size=int(os.environ.get("MCP_POOL_SIZE", "2")))
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm MCP sessions live as long as the service
+    await mcp_pool.start()
+    print(f"🔌 MCP pool ready: {mcp_pool.size} sessions, {len(mcp_pool.tools)} tools")
+    yield
+    await mcp_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,7 +40,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-claude = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+
+# Async client so model calls never block the event loop
+claude = anthropic.AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+# Global cap on in-flight model calls across all /chat requests
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+async def create_message(**kwargs):
+    """claude.messages.create under the concurrency limit and per-call timeout.
+
+    The timeout covers waiting for a free slot as well as the call itself.
+    """
+    async def limited():
+        async with llm_semaphore:
+            return await claude.messages.create(**kwargs)
+    try:
+        return await asyncio.wait_for(limited(), LLM_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Model call timed out after {LLM_TIMEOUT_SECONDS:g}s")
 
 class ChatRequest(BaseModel):
     message: str
@@ -40,84 +74,141 @@ async def chat(request: ChatRequest):
     print(f"\n[You] {request.message}")
     print(f"[🤖 Claude] Processing...")
     
-    server_params = StdioServerParameters(command="python3", args=["mcp_server_official.py"])
-    
-    async with stdio_client(server_params) as streams:
-        read_stream, write_stream = streams
-        async with ClientSession(read_stream, write_stream) as client:
-            # Initialize client
-            await client.initialize()
-            
-            # Get tools from MCP server
-            tools_response = await client.list_tools()
-            tool_defs = [
-                {
-                    "name": tool.name,
-                    "description": tool.description,
-                    "input_schema": tool.inputSchema,
-                }
-                for tool in tools_response.tools
-            ]
-            
-            messages = [{"role": "user", "content": request.message}]
-            
-            # Keep looping while Claude wants to use tools
-            while True:
-                response = claude.messages.create(
-                    model="claude-haiku-4-5-20251001",
-                    max_tokens=1024,
-                    tools=tool_defs,
-                    messages=messages
-                )
-                
-                if response.stop_reason == "end_turn":
-                    # Claude is done - extract final text
-                    text = next(
-                        (block.text for block in response.content if hasattr(block, "text")),
-                        None
-                    )
-                    if text:
-                        print(f"\n[🤖 ASSISTANT]\n{text}\n")
-                    
-                    return ChatResponse(response=text or "No response generated")
-                
-                if response.stop_reason == "tool_use":
-                    # Claude wants to use a tool
-                    tool_uses = [b for b in response.content if b.type == "tool_use"]
-                    
-                    # Add assistant message to history
-                    messages.append({"role": "assistant", "content": response.content})
-                    
-                    # Call each tool and collect results
-                    tool_results = []
-                    for tool_use in tool_uses:
-                        print(f"[🔧 CALLING] {tool_use.name}")
-                        try:
-                            result = await client.call_tool(tool_use.name, tool_use.input)
-                            # Parse the result
-                            result_text = result.content[0].text if result.content else "{}"
-                            
-                            tool_results.append({
-                                "type": "tool_result",
-                                "tool_use_id": tool_use.id,
-                                "content": result_text,
-                            })
-                            print(f"[✓] {tool_use.name}")
-                        except Exception as e:
-                            tool_results.append({
-                                "type": "tool_result",
-                                "tool_use_id": tool_use.id,
-                                "content": f"Error: {str(e)}",
-                            })
-                            print(f"[✗] {tool_use.name}: {e}")
-                    
-                    # Add tool results to messages
-                    messages.append({"role": "user", "content": tool_results})
-                else:
-                    break
-    
+    async with mcp_pool.session() as client:
+        return await run_conversation(client, tool_definitions(mcp_pool.tools), request.message)
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """/chat as Server-Sent Events: `token` text deltas, `status` while tools run, then `done`."""
+    print(f"\n[You] {request.message} (streaming)")
+
+    async def events():
+        try:
+            async with mcp_pool.session() as client:
+                async for event, data in stream_conversation(client, tool_definitions(mcp_pool.tools), request.message):
+                    yield sse(event, data)
+        except Exception as e:
+            print(f"[✗] Chat stream failed: {e}")
+            yield sse("error", {"message": str(e)})
+        yield sse("done", {})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def tool_definitions(tools) -> list:
+    return [
+        {
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.inputSchema,
+        }
+        for tool in tools
+    ]
+
+async def call_tool(client, tool_use) -> dict:
+    """Run one tool_use block and turn the outcome into a tool_result."""
+    print(f"[🔧 CALLING] {tool_use.name}")
+    try:
+        result = await client.call_tool(tool_use.name, tool_use.input)
+        # Parse the result
+        result_text = result.content[0].text if result.content else "{}"
+        print(f"[✓] {tool_use.name}")
+    except Exception as e:
+        result_text = f"Error: {str(e)}"
+        print(f"[✗] {tool_use.name}: {e}")
+    return {
+        "type": "tool_result",
+        "tool_use_id": tool_use.id,
+        "content": result_text,
+    }
+
+async def run_conversation(client, tool_defs: list, message: str) -> ChatResponse:
+    """Run the Claude tool-use loop against an initialized MCP session."""
+    messages = [{"role": "user", "content": message}]
+
+    # Keep looping while Claude wants to use tools
+    while True:
+        response = await create_message(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=1024,
+            tools=tool_defs,
+            messages=messages
+        )
+
+        if response.stop_reason == "end_turn":
+            # Claude is done - extract final text
+            text = next(
+                (block.text for block in response.content if hasattr(block, "text")),
+                None
+            )
+            if text:
+                print(f"\n[🤖 ASSISTANT]\n{text}\n")
+
+            return ChatResponse(response=text or "No response generated")
+
+        if response.stop_reason == "tool_use":
+            # Claude wants to use a tool
+            tool_uses = [b for b in response.content if b.type == "tool_use"]
+
+            # Add assistant message to history
+            messages.append({"role": "assistant", "content": response.content})
+
+            # Call the tools of this turn concurrently; gather keeps their order
+            tool_results = list(await asyncio.gather(
+                *(call_tool(client, tool_use) for tool_use in tool_uses)
+            ))
+
+            # Add tool results to messages
+            messages.append({"role": "user", "content": tool_results})
+        else:
+            break
+
     return ChatResponse(response="Conversation ended unexpectedly")
 
+async def stream_conversation(client, tool_defs: list, message: str):
+    """run_conversation, yielding (event, data) as Claude's text streams in."""
+    messages = [{"role": "user", "content": message}]
+    wrote_text = False
+
+    while True:
+        # Holds a model slot for the whole stream; the SDK enforces the timeout.
+        async with llm_semaphore:
+            async with claude.messages.stream(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=1024,
+                tools=tool_defs,
+                messages=messages,
+                timeout=LLM_TIMEOUT_SECONDS,
+            ) as stream:
+                separate = wrote_text
+                async for text in stream.text_stream:
+                    if separate:
+                        yield "token", {"text": "\n\n"}
+                        separate = False
+                    wrote_text = True
+                    yield "token", {"text": text}
+                response = await stream.get_final_message()
+
+        if response.stop_reason != "tool_use":
+            return
+
+        tool_uses = [b for b in response.content if b.type == "tool_use"]
+        messages.append({"role": "assistant", "content": response.content})
+        names = ", ".join(tool_use.name for tool_use in tool_uses)
+        yield "status", {"message": f"🔧 Running {names}..."}
+
+        async def timed_call(tool_use):
+            start = time.perf_counter()
+            result = await call_tool(client, tool_use)
+            return result, (time.perf_counter() - start) * 1000
+
+        timed = await asyncio.gather(*(timed_call(tool_use) for tool_use in tool_uses))
+        for tool_use, (_, elapsed_ms) in zip(tool_uses, timed):
+            print(f"[⏱] {tool_use.name}: {elapsed_ms:.0f}ms")
+        messages.append({"role": "user", "content": [result for result, _ in timed]})
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
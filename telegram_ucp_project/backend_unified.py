@@ -1,7 +1,7 @@
 from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 import uuid
@@ -62,7 +62,20 @@ except Exception as e:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 import asyncio
-from ucp_server.shopify_client import search_products_in_shopify, get_product_in_shopify
+from ucp_server.shopify_client import search_products_in_shopify, get_product_in_shopify, get_products_in_shopify
+from ucp_server import shopify_client
+from federated_search import SearchSource, federated_search
+from tool_results import ResultPages, encode_record
+from intent_router import ADD_TO_CART, CHECKOUT, SEARCH, UNKNOWN, IntentRouter
+from response_cache import ChatResponseCache
+from session_store import SessionStore
+
+
+@app.on_event("shutdown")
+async def close_shopify_client():
+    # The pooled Shopify client is opened lazily by the first catalog query.
+    await shopify_client.close_client()
+
 
 Base = declarative_base()
 
@@ -164,8 +177,11 @@ PRODUCTS = [
     {"id": "p4", "name": "Digital Watch", "description": "Waterproof digital watch", "price": 599, "size": "Std", "seller_location": "Clock Tower", "stock": 20, "currency": "INR"},
     {"id": "p5", "name": "Printed Hoodie", "description": "Warm winter hoodie with graphic", "price": 799, "size": "XL", "seller_location": "Civil Lines", "stock": 8, "currency": "INR"},
 ]
-CARTS = {}
-ORDERS = {}
+# Bounded in memory, written behind to SQLite and reloaded on demand after a restart
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+CARTS = SessionStore(SESSION_DB_PATH, "carts", max_entries=SESSION_MAX_ENTRIES)
+ORDERS = SessionStore(SESSION_DB_PATH, "orders", max_entries=SESSION_MAX_ENTRIES)
 
 # ============ REQUEST MODELS ============
 
@@ -240,73 +256,77 @@ def _call_payment_service(order_id, amount):
 
 # ============ CORE LOGIC (SHARED BY API AND MCP) ============
 
-async def core_search_catalog(q: Optional[str] = None, size: Optional[str] = None, max_price: Optional[float] = None, location: Optional[str] = None, quantity: Optional[int] = None):
-    try:
-        all_results = []
-    
-        # 1. Search Shopify
-        try:
-            shopify_results = await search_products_in_shopify(q or "")
-            all_results.extend(shopify_results)
-        except Exception as e:
-            print(f"Shopify search error: {e}")
+async def _search_shopify(q=None, **_):
+    return await search_products_in_shopify(q or "")
 
-        # 2. ✅ Search Supabase DB (Local Vendor Products)
-        try:
-            if supabase:
-                query_builder = supabase.table("products").select("*")
-                if q:
-                    query_builder = query_builder.or_(f"name.ilike.%{q}%,description.ilike.%{q}%")
-                if size:
-                    query_builder = query_builder.eq("size", size)
-                if location:
-                    query_builder = query_builder.ilike("seller_location", f"%{location}%")
-                if max_price:
-                    query_builder = query_builder.lte("price", max_price)
-                if quantity:
-                    query_builder = query_builder.gte("stock", quantity)
-                
-                sb_res = query_builder.limit(20).execute()
-                for item in (sb_res.data or []):
-                    all_results.append({
-                        "id": item["id"],
-                        "name": item["name"],
-                        "price": item["price"],
-                        "currency": "INR",
-                        "description": item.get("description", ""),
-                        "size": item.get("size"),
-                        "seller_location": item.get("seller_location"),
-                        "stock": item.get("stock", 0),
-                        "source": "supabase"
-                    })
-                print(f"✅ Supabase returned {len(sb_res.data or [])} products")
-        except Exception as e:
-            print(f"Supabase search error: {e}")
+def _search_supabase_sync(q=None, size=None, max_price=None, location=None, quantity=None):
+    if not supabase:
+        return []
+    query_builder = supabase.table("products").select("*")
+    if q:
+        query_builder = query_builder.or_(f"name.ilike.%{q}%,description.ilike.%{q}%")
+    if size:
+        query_builder = query_builder.eq("size", size)
+    if location:
+        query_builder = query_builder.ilike("seller_location", f"%{location}%")
+    if max_price:
+        query_builder = query_builder.lte("price", max_price)
+    if quantity:
+        query_builder = query_builder.gte("stock", quantity)
+
+    sb_res = query_builder.limit(20).execute()
+    print(f"✅ Supabase returned {len(sb_res.data or [])} products")
+    return [{
+        "id": item["id"],
+        "name": item["name"],
+        "price": item["price"],
+        "currency": "INR",
+        "description": item.get("description", ""),
+        "size": item.get("size"),
+        "seller_location": item.get("seller_location"),
+        "stock": item.get("stock", 0),
+        "source": "supabase"
+    } for item in (sb_res.data or [])]
+
+async def _search_supabase(**params):
+    # supabase-py is synchronous; keep it off the event loop. A missed deadline
+    # abandons the wait, the worker thread finishes in the background.
+    return await asyncio.to_thread(_search_supabase_sync, **params)
+
+async def _search_gaura_hub(q=None, **_):
+    HUB_URL = os.getenv("HUB_URL", "http://localhost:8200")
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        hub_res = await client.get(f"{HUB_URL}/search", params={"query": q or ""})
+        if hub_res.status_code != 200:
+            return []
+        return [{
+            "id": f"gaura::{item['node_id']}::{item['id']}",
+            "name": f"📦 {item['name']}",
+            "price": item.get("price") or item.get("base_price", 0),
+            "currency": "USD",
+            "description": f"Verified Product from Node {item['node_id']}",
+            "source": "gaura"
+        } for item in hub_res.json()]
+
+# Sources are queried concurrently; earlier entries win on duplicate IDs.
+SEARCH_SOURCES = [
+    SearchSource("shopify", _search_shopify, deadline=float(os.getenv("SHOPIFY_SEARCH_DEADLINE", "3.0"))),
+    SearchSource("supabase", _search_supabase, deadline=float(os.getenv("SUPABASE_SEARCH_DEADLINE", "2.0"))),
+    SearchSource("gaura", _search_gaura_hub, deadline=float(os.getenv("HUB_SEARCH_DEADLINE", "2.0"))),
+]
 
-        # 3. Search Gaura Hub
-        HUB_URL = os.getenv("HUB_URL", "http://localhost:8200")
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                hub_res = await client.get(f"{HUB_URL}/search", params={"query": q or ""})
-                if hub_res.status_code == 200:
-                    hub_items = hub_res.json()
-                    for item in hub_items:
-                        all_results.append({
-                            "id": f"gaura::{item['node_id']}::{item['id']}",
-                            "name": f"📦 {item['name']}",
-                            "price": item.get("price") or item.get("base_price", 0),
-                            "currency": "USD",
-                            "description": f"Verified Product from Node {item['node_id']}",
-                            "source": "gaura"
-                        })
-        except Exception as e:
-            print(f"Gaura Hub search error: {e}")
+async def core_federated_search(q: Optional[str] = None, size: Optional[str] = None, max_price: Optional[float] = None, location: Optional[str] = None, quantity: Optional[int] = None):
+    result = await federated_search(SEARCH_SOURCES, q=q, size=size, max_price=max_price, location=location, quantity=quantity)
 
-        # 4. Apply Filters
-        if max_price:
-            all_results = [p for p in all_results if p.get("price", 0) <= max_price]
-        
-        return all_results
+    # Apply Filters
+    if max_price:
+        result.items = [p for p in result.items if p.get("price", 0) <= max_price]
+    return result
+
+async def core_search_catalog(q: Optional[str] = None, size: Optional[str] = None, max_price: Optional[float] = None, location: Optional[str] = None, quantity: Optional[int] = None):
+    try:
+        result = await core_federated_search(q, size, max_price, location, quantity)
+        return result.items
     except Exception as e:
         print(f"Search aggregator error: {e}")
         return []
@@ -319,14 +339,15 @@ def core_create_cart(user_id: str):
 
 
 async def core_add_item(cart_id: str, product_id: str, qty: int):
-    if cart_id not in CARTS: return None
+    if await CARTS.load(cart_id) is None: return None
     
     # Verify product via unified details fetcher
     product = await get_product_details(product_id)
     
     if not product: return False
     
-    cart = CARTS[cart_id]
+    cart = await CARTS.load(cart_id)
+    if cart is None: return None
     item_idx = next((i for i, item in enumerate(cart["items"]) if item["product_id"] == product_id), None)
     if item_idx is not None:
         cart["items"][item_idx]["qty"] += qty
@@ -338,6 +359,7 @@ async def core_add_item(cart_id: str, product_id: str, qty: int):
              "currency": product["currency"],
              "qty": qty
         })
+    CARTS[cart_id] = cart
     return cart
 
 def core_create_order(cart_id: str, user_id: str, delivery_slot: str):
@@ -361,7 +383,8 @@ def core_create_order(cart_id: str, user_id: str, delivery_slot: str):
     }
     
     ORDERS[order_id] = order
-    CARTS[cart_id]["items"] = []
+    cart["items"] = []
+    CARTS[cart_id] = cart
     
     # Save to SQL
     if SessionLocal:
@@ -384,15 +407,33 @@ def core_create_order(cart_id: str, user_id: str, delivery_slot: str):
 
 # ============ MCP TOOLS (The new layer) ============
 
+# Tool results go into the model's context: list results are sent as a
+# capped, compact table and the rest is served through get_more.
+tool_pages = ResultPages(
+    page_size=int(os.getenv("MCP_RESULT_PAGE_SIZE", "8")),
+    max_chars=int(os.getenv("MCP_RESULT_MAX_CHARS", "1500")),
+)
+
 @mcp.tool()
-async def search_products(query: str = None, max_price: float = None, location: str = None) -> list:
+async def search_products(query: str = None, max_price: float = None, location: str = None) -> str:
     """Search for products in the catalog. 
     Args:
         query: Search term (e.g. 'halwa')
         max_price: Maximum price limit
         location: Filter by seller location
+    Returns a table (first line: row range and, if there are more rows, a
+    get_more token), then a `|`-separated header and rows.
     """
-    return await core_search_catalog(q=query, max_price=max_price, location=location)
+    items = await core_search_catalog(q=query, max_price=max_price, location=location)
+    return tool_pages.first_page("search_products", items)
+
+@mcp.tool()
+async def get_more(token: str) -> str:
+    """Fetch the next rows of an earlier result.
+    Args:
+        token: The token from a previous result's `get_more(token=...)` hint
+    """
+    return tool_pages.next_page(token)
 
 @mcp.tool()
 async def create_new_cart(user_id: str) -> dict:
@@ -408,12 +449,13 @@ async def add_product_to_cart(cart_id: str, product_id: str, quantity: int = 1)
     return "Item added"
 
 @mcp.tool()
-async def checkout_cart(cart_id: str, user_id: str, delivery_slot: str = "today 5-7pm") -> dict:
+async def checkout_cart(cart_id: str, user_id: str, delivery_slot: str = "today 5-7pm") -> str:
     """Checkout and place order"""
+    await CARTS.load(cart_id)  # core_create_order reads it synchronously
     res = core_create_order(cart_id, user_id, delivery_slot)
-    if res == "empty": return {"error": "Cart is empty"}
-    if res is None: return {"error": "Cart not found"}
-    return res
+    if res == "empty": return encode_record({"error": "Cart is empty"})
+    if res is None: return encode_record({"error": "Cart not found"})
+    return encode_record(res)
 
 
 # ============ FASTAPI APP INTEGRATION ============
@@ -438,11 +480,13 @@ def health_check():
 
 @app.get("/catalog/search")
 async def search_catalog_api(q: Optional[str] = None, size: Optional[str] = None, max_price: Optional[float] = None, location: Optional[str] = None, quantity: Optional[int] = None):
-    return {"items": await core_search_catalog(q, size, max_price, location, quantity)}
+    result = await core_federated_search(q, size, max_price, location, quantity)
+    return {"items": result.items, "sources_timed_out": result.sources_timed_out}
 
 @app.get("/products")
 async def get_products_alias(q: Optional[str] = None):
-    return {"items": await core_search_catalog(q=q)}
+    result = await core_federated_search(q=q)
+    return {"items": result.items, "sources_timed_out": result.sources_timed_out}
 
 @app.get("/products/{product_id:path}")
 async def get_product_details(product_id: str):
@@ -550,19 +594,20 @@ class CheckoutSessionRequest(BaseModel):
 async def create_checkout_session(req: CheckoutSessionRequest):
     session_id = f"cs_{uuid.uuid4().hex[:12]}"
     total = 0
-    
+
+    # Lookup prices via Shopify, one batched query for the whole cart
+    pids = [line.get("item", {}).get("id") for line in req.line_items]
+    products = {}
+    try:
+        products = await get_products_in_shopify([pid for pid in pids if pid])
+    except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+        # Transport errors, bad JSON or malformed product nodes: price at 0.
+        print(f"⚠️ Checkout price lookup failed: {e}")
+
     # Process items to calculate total
-    for line in req.line_items:
-        item_data = line.get("item", {})
+    for line, pid in zip(req.line_items, pids, strict=True):
         qty = line.get("quantity", 1)
-        pid = item_data.get("id")
-        
-        # Lookup price via Shopify
-        product = None
-        try:
-            product = await get_product_in_shopify(pid)
-        except: pass
-        
+        product = products.get(pid)
         price = product.get("price", 0) if product else 0
         total += price * qty
 
@@ -585,9 +630,11 @@ async def create_checkout_session(req: CheckoutSessionRequest):
 
 @app.post("/checkout-sessions/{session_id}/complete")
 def complete_checkout_session(session_id: str, payment: dict):
-    if session_id in ORDERS:
-        ORDERS[session_id]["status"] = "paid"
-        ORDERS[session_id]["payment_info"] = payment
+    order = ORDERS.get(session_id)
+    if order is not None:
+        order["status"] = "paid"
+        order["payment_info"] = payment
+        ORDERS[session_id] = order
     return {"status": "complete", "message": "Order placed successfully"}
 
 @app.post("/auth/buyer/register")
@@ -619,9 +666,9 @@ if GEMINI_API_KEY:
 else:
     print("⚠️ WARNING: GEMINI_API_KEY not found. Chat will not work.")
 
-# In-Memory State Management
-CHAT_HISTORY = {} # Key: user_id, Value: List[Content]
-USER_CONTEXT = {} # Key: user_id, Value: {"cart_id": str, "last_search": list}
+# Per-user State Management (same bounded, persistent store as CARTS)
+CHAT_HISTORY = SessionStore(SESSION_DB_PATH, "chat_history", max_entries=SESSION_MAX_ENTRIES) # Key: user_id, Value: list of JSON message dicts
+USER_CONTEXT = SessionStore(SESSION_DB_PATH, "user_context", max_entries=SESSION_MAX_ENTRIES) # Key: user_id, Value: {"cart_id": str, "last_search": list, "response_cache": bool}
 
 class ChatRequest(BaseModel):
     message: str
@@ -631,31 +678,121 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
+# Keyword routes answered without the LLM; stats show the fast-path share.
+intent_router = IntentRouter()
+
+# Gemini fallback answers, reused for repeated small talk.
+chat_cache = ChatResponseCache(
+    ttl_seconds=float(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "512")),
+    similarity=os.getenv("CHAT_CACHE_SIMILARITY", "1") == "1",
+)
+# Caps Gemini calls running on worker threads, so a burst of chat traffic
+# cannot take over the default thread pool.
+gemini_slots = asyncio.Semaphore(int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")))
+
+async def _stream_content(model, prompt: str, timeout: float):
+    """Yield Gemini text chunks as they arrive; `timeout` bounds the whole reply.
+
+    The blocking SDK iterator runs on a worker thread that keeps its
+    gemini_slots slot until it returns, even after we stop waiting for it.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+
+    def produce():
+        try:
+            for chunk in model.generate_content(prompt, stream=True):
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+        except Exception as e:
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+    async def run():
+        async with gemini_slots:
+            await asyncio.to_thread(produce)
+
+    worker = asyncio.ensure_future(run())
+    deadline = loop.time() + timeout
+    while True:
+        chunk = await asyncio.wait_for(chunks.get(), max(0.0, deadline - loop.time()))
+        if chunk is None:
+            break
+        if isinstance(chunk, Exception):
+            raise chunk
+        if chunk:
+            yield chunk
+    await worker
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/chat/stats")
+def chat_stats():
+    return {**intent_router.stats.snapshot(), "response_cache": chat_cache.stats()}
+
+@app.get("/sessions/stats")
+def session_stats():
+    return {store.namespace: store.stats() for store in (CARTS, ORDERS, CHAT_HISTORY, USER_CONTEXT)}
+
+@app.on_event("shutdown")
+def close_session_stores():
+    # Flush pending write-behind so carts survive the restart.
+    for store in (CARTS, ORDERS, CHAT_HISTORY, USER_CONTEXT):
+        store.close()
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(req: ChatRequest):
-    user_id = req.user_id
-    msg = req.message.lower()
-    print(f"🤖 [Agent] Processing message: {msg}")
+    parts = [data["text"] async for event, data in chat_events(req) if event == "token"]
+    return {"response": "".join(parts)}
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """/chat as Server-Sent Events: `status` (progress), `token` (reply text, in order), then `done`."""
+    async def events():
+        try:
+            async for event, data in chat_events(req):
+                yield _sse(event, data)
+        except Exception as e:
+            print(f"⚠️ Chat stream error: {e}")
+            yield _sse("error", {"message": str(e)})
+        yield _sse("done", {})
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-    # 1. Initialize Context
-    if user_id not in CHAT_HISTORY: CHAT_HISTORY[user_id] = []
-    if user_id not in USER_CONTEXT: USER_CONTEXT[user_id] = {"cart_id": None, "last_search": []}
-    context = USER_CONTEXT[user_id]
+async def chat_events(req: ChatRequest):
+    """Answer a chat message as a sequence of (event, data) pairs."""
+    user_id = req.user_id
+    print(f"🤖 [Agent] Processing message: {req.message}")
+    route = intent_router.route(req.message, llm_available=bool(GEMINI_API_KEY))
+    # Confident routes skip Gemini; without Gemini, go with the best guess.
+    intent = route.intent if route.confident or not GEMINI_API_KEY else UNKNOWN
+    print(f"🧭 [Agent] {route} → {intent}")
+
+    # 1. Initialize Context (loaded without blocking the event loop)
+    if await CHAT_HISTORY.load(user_id) is None: CHAT_HISTORY[user_id] = []
+    context = await USER_CONTEXT.load(user_id)
+    if context is None:
+        context = {"cart_id": None, "last_search": []}
+        USER_CONTEXT[user_id] = context
+    # The response cache opt-out lives in the session, not in the cache.
+    if "response_cache" in (req.context or {}):
+        context["response_cache"] = bool(req.context["response_cache"])
+        USER_CONTEXT[user_id] = context
+    use_cache = GEMINI_API_KEY and context.get("response_cache", True)
 
     # 2. Logic: Hybrid Agent (Direct Search for Reliability)
     response_text = ""
     
     # Keyword Trigger: Search
-    if any(k in msg for k in ["find", "search", "show", "get", "honey", "milk", "lens", "ghee"]):
+    if intent == SEARCH:
         print("🔍 [Agent] Triggering direct search...")
-        # Remove stop words better
-        query = msg
-        for word in ["find", "search", "show", "get", "me", "some", "a", "the", "please"]:
-            query = query.replace(word, "")
-        query = query.strip()
+        query = route.query
+        yield "status", {"message": f"🔍 Searching for '{query}'..."}
         
         items = await core_search_catalog(q=query)
-        USER_CONTEXT[user_id]["last_search"] = items
+        context["last_search"] = items
+        USER_CONTEXT[user_id] = context
         
         if items:
             response_text = f"I found {len(items)} items for you:\n\n"
@@ -666,24 +803,20 @@ async def chat_endpoint(req: ChatRequest):
             response_text = f"I couldn't find any items matching '{query}'. Try another keyword?"
 
     # Keyword Trigger: Add to Cart
-    elif "add" in msg:
-        parts = msg.split()
-        product_id = None
-        # Try to find something that looks like an ID
-        for p in parts:
-            if p.startswith("gaura::") or p.startswith("gid://"):
-                product_id = p
-                break
+    elif intent == ADD_TO_CART:
+        product_id = route.product_id
         
         if not product_id and context["last_search"]:
             product_id = context["last_search"][0]["id"]
             
         if product_id:
+            yield "status", {"message": "🛒 Adding to your cart..."}
             if not context["cart_id"]:
                 cart = core_create_cart(user_id)
                 context["cart_id"] = cart["cart_id"]
+                USER_CONTEXT[user_id] = context
             
-            res = await core_add_item(context["cart_id"], product_id, 1)
+            res = await core_add_item(context["cart_id"], product_id, route.qty)
             if res:
                 response_text = f"Successfully added to your cart! Your Cart ID is `{context['cart_id']}`. Type 'checkout' to finish."
             else:
@@ -692,36 +825,49 @@ async def chat_endpoint(req: ChatRequest):
             response_text = "Which item would you like to add? Please provide the product ID."
 
     # Keyword Trigger: Checkout
-    elif "checkout" in msg:
+    elif intent == CHECKOUT:
         if not context["cart_id"]:
             response_text = "Your cart is empty! Try searching for products first."
         else:
+            yield "status", {"message": "📦 Placing your order..."}
+            await CARTS.load(context["cart_id"])  # core_create_order reads it synchronously
             order = core_create_order(context["cart_id"], user_id, "Standard")
             if isinstance(order, dict):
                 response_text = f"✅ Order placed! Order ID: `{order['order_id']}`. We are processing it now."
                 context["cart_id"] = None
+                USER_CONTEXT[user_id] = context
             else:
                 response_text = "Checkout failed. Please try again."
 
     # Fallback: AI Brain (Gemini)
     else:
-        if GEMINI_API_KEY:
+        cached = chat_cache.get(req.message) if use_cache else None
+        if cached is not None:
+            print("⚡ [Agent] Answered from the response cache")
+            response_text = cached
+        elif GEMINI_API_KEY:
+            print("🧠 [Agent] Using Gemini for conversational response...")
+            yield "status", {"message": "💭 Thinking..."}
+            model = genai.GenerativeModel('gemini-1.5-flash')
+            streamed = []
             try:
-                print("🧠 [Agent] Using Gemini for conversational response...")
-                model = genai.GenerativeModel('gemini-1.5-flash')
                 # Fast conversation without tools for now to prevent hangs
-                ai_res = await asyncio.wait_for(
-                    asyncio.to_thread(model.generate_content, f"You are a helpful shopping assistant. User says: {req.message}"),
-                    timeout=8.0
-                )
-                response_text = ai_res.text
+                async for chunk in _stream_content(model, f"You are a helpful shopping assistant. User says: {req.message}", timeout=8.0):
+                    streamed.append(chunk)
+                    yield "token", {"text": chunk}
+                if use_cache:
+                    chat_cache.put(req.message, "".join(streamed))
+                return
             except Exception as e:
                 print(f"⚠️ Gemini error: {e}")
+                if streamed:
+                    # Part of the reply is already out; end it there.
+                    return
                 response_text = "I'm here to help! I can find products, manage your cart, and place orders. What are you looking for?"
         else:
             response_text = "I'm your Gaura Shopping Assistant. Try asking me to 'find honey'!"
 
-    return {"response": response_text}
+    yield "token", {"text": response_text}
 
 
 def simulated_agent(message: str):
@@ -0,0 +1,80 @@
+"""Memory benchmark for SessionStore.
+
+Stores `--sessions` distinct chat contexts (a cart id plus a short search
+result, like backend_unified's USER_CONTEXT) into a store bounded at
+`--max-entries`, and reports Python heap usage (tracemalloc) every
+`--report-every` sessions, next to what a plain dict holding the same
+sessions uses.
+
+Usage:
+    python benchmark_session_store.py [--sessions 200000] [--max-entries 1000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from session_store import SessionStore
+
+
+def make_session(i: int) -> dict:
+    return {
+        "cart_id": f"cart_{i}",
+        "last_search": [
+            {"id": f"gid://shopify/Product/{i * 3 + n}", "name": f"Bouquet {n}", "price": 19.5 + n}
+            for n in range(3)
+        ],
+    }
+
+
+def run(fill, sessions: int, report_every: int) -> list:
+    """Call fill(i) for every session; return (sessions, heap MiB) samples."""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    samples = []
+    for i in range(sessions):
+        fill(i)
+        if (i + 1) % report_every == 0:
+            samples.append((i + 1, (tracemalloc.get_traced_memory()[0] - base) / 2**20))
+    peak = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+    tracemalloc.stop()
+    return samples, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--max-entries", type=int, default=1000)
+    parser.add_argument("--report-every", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "sessions.db"), "bench", max_entries=args.max_entries)
+        start = time.perf_counter()
+
+        def fill_store(i):
+            store[str(i)] = make_session(i)
+
+        store_samples, store_peak = run(fill_store, args.sessions, args.report_every)
+        elapsed = time.perf_counter() - start
+        store.close()
+
+        plain = {}
+
+        def fill_dict(i):
+            plain[str(i)] = make_session(i)
+
+        dict_samples, dict_peak = run(fill_dict, args.sessions, args.report_every)
+
+    print(f"{args.sessions} sessions, max_entries={args.max_entries} ({elapsed:.1f}s)")
+    print(f"{'sessions':>10}  {'SessionStore':>14}  {'dict':>10}")
+    for (n, store_mib), (_, dict_mib) in zip(store_samples, dict_samples):
+        print(f"{n:>10}  {store_mib:>10.1f} MiB  {dict_mib:>6.1f} MiB")
+    print(f"{'peak':>10}  {store_peak:>10.1f} MiB  {dict_peak:>6.1f} MiB")
+    print(f"store stats: {store.stats()}")
+
+
+if __name__ == "__main__":
+    main()
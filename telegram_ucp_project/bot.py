@@ -10,6 +10,9 @@ load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters
 
+from chat_stream import ProgressiveReply, stream_chat
+from session_store import SessionStore
+
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
@@ -17,23 +20,39 @@ logging.basicConfig(
 
 UCP_SERVER_URL = os.getenv("UCP_SERVER_URL", "http://127.0.0.1:8182")
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "YOUR_TOKEN_HERE")
+# Seconds between edits of a streaming reply (Telegram limits edit rate)
+CHAT_EDIT_INTERVAL = float(os.getenv("CHAT_EDIT_INTERVAL", "1.0"))
 
 # Auto-provisioned user sessions — keyed by Telegram user_id
 # No manual registration required. Each Telegram user gets a unique session.
-USER_SESSIONS = {}
+# Bounded in memory and persisted to SQLite, so sessions (and carts) survive restarts.
+USER_SESSIONS = SessionStore(
+    os.getenv("BOT_SESSION_DB_PATH", "bot_sessions.db"),
+    "telegram_users",
+    max_entries=int(os.getenv("BOT_SESSION_MAX_ENTRIES", "10000")),
+)
+
+async def get_session(user) -> dict:
+    """The user's session (which also holds their cart), created on first use."""
+    user_id = str(user.id)
+    session = await USER_SESSIONS.load(user_id)
+    if session is None:
+        session = {"cart_id": None, "last_search": [], "name": user.full_name}
+        USER_SESSIONS[user_id] = session
+    return session
+
+async def set_cart(user, cart: list):
+    """Replace the user's cart and store the session back for persistence."""
+    session = await get_session(user)
+    session["cart"] = cart
+    USER_SESSIONS[str(user.id)] = session
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Auto-provision user session on /start — zero config for end users."""
     user = update.effective_user
-    user_id = str(user.id)
 
     # Auto-create a session for this Telegram user if they don't have one
-    if user_id not in USER_SESSIONS:
-        USER_SESSIONS[user_id] = {
-            "cart_id": None,
-            "last_search": [],
-            "name": user.full_name,
-        }
+    await get_session(user)
 
     await update.message.reply_text(
         f"👋 Hey {user.first_name}! Welcome to *Gaura Commerce Bot* 🛍️\n"
@@ -121,7 +140,7 @@ async def add_to_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
             pass
 
     # Add to session cart
-    cart = context.user_data.get("cart", [])
+    cart = (await get_session(update.effective_user)).get("cart", [])
     
     # Check if item exists
     existing = next((item for item in cart if item["item"]["id"] == product_id), None)
@@ -142,13 +161,13 @@ async def add_to_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "unit_price": product.get("price", 0) 
         })
     
-    context.user_data["cart"] = cart
+    await set_cart(update.effective_user, cart)
     
     item_name = product.get('name') or (existing['item']['title'] if existing else 'Item')
     await update.message.reply_text(f"✅ Added {qty} x {item_name} to cart!")
 
 async def view_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    cart = context.user_data.get("cart", [])
+    cart = (await get_session(update.effective_user)).get("cart", [])
     if not cart:
         await update.message.reply_text("🛒 Your cart is empty.")
         return
@@ -164,11 +183,11 @@ async def view_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_markdown(msg)
 
 async def clear_cart(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    context.user_data["cart"] = []
+    await set_cart(update.effective_user, [])
     await update.message.reply_text("🗑️ Cart cleared.")
 
 async def checkout(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    cart = context.user_data.get("cart", [])
+    cart = (await get_session(update.effective_user)).get("cart", [])
     if not cart:
         await update.message.reply_text("Cart is empty.")
         return
@@ -218,7 +237,7 @@ async def checkout(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 
                 await update.message.reply_text("💳 Payment processed (Mock). Order Placed!")
-                context.user_data["cart"] = []
+                await set_cart(update.effective_user, [])
             else:
                 await update.message.reply_text(f"❌ Checkout failed: {resp.text}")
         except Exception as e:
@@ -234,8 +253,7 @@ async def chat_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(user.id)
 
     # Auto-provision session if user skipped /start
-    if user_id not in USER_SESSIONS:
-        USER_SESSIONS[user_id] = {"cart_id": None, "last_search": [], "name": user.full_name}
+    await get_session(user)
     
     # Send waiting action
     await context.bot.send_chat_action(chat_id=update.effective_chat.id, action="typing")
@@ -245,22 +263,30 @@ async def chat_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "user_id": user_id  # Unique per-Telegram-user, fully automated
     }
     
+    # The reply is sent on the first streamed event and edited as text arrives
+    reply = ProgressiveReply(update.message, min_interval=CHAT_EDIT_INTERVAL)
     async with httpx.AsyncClient(timeout=30.0) as client:
         try:
-            logging.info(f"Routing to AI backend at: {UCP_SERVER_URL}/chat")
-            resp = await client.post(f"{UCP_SERVER_URL}/chat", json=payload)
-            if resp.status_code == 200:
-                reply = resp.json().get("response", "I'm not sure how to respond.")
-                await update.message.reply_markdown(reply)
-            else:
-                logging.error(f"Backend returned error {resp.status_code}: {resp.text}")
-                await update.message.reply_text(f"⚠️ Backend error: {resp.text}")
+            logging.info(f"Routing to AI backend at: {UCP_SERVER_URL}/chat/stream")
+            async for event, data in stream_chat(client, f"{UCP_SERVER_URL}/chat/stream", payload):
+                if event == "status":
+                    await reply.set_status(data["message"])
+                elif event == "token":
+                    await reply.append(data["text"])
+                elif event == "error":
+                    logging.error(f"Backend stream error: {data.get('message')}")
+                    await reply.fail(f"⚠️ Error: {data.get('message')}")
+                    return
+            await reply.finish("I'm not sure how to respond.")
+        except httpx.HTTPStatusError as e:
+            logging.error(f"Backend returned error {e.response.status_code}: {e.response.text}")
+            await reply.fail(f"⚠️ Backend error: {e.response.text}")
         except httpx.ConnectError:
             logging.error(f"Could not connect to backend at {UCP_SERVER_URL}")
-            await update.message.reply_text("❌ AI backend is unreachable. Please try again shortly.")
+            await reply.fail("❌ AI backend is unreachable. Please try again shortly.")
         except Exception as e:
             logging.error(f"Unexpected error in chat: {e}", exc_info=True)
-            await update.message.reply_text(f"⚠️ Error: {e}")
+            await reply.fail(f"⚠️ Error: {e}")
 
 if __name__ == '__main__':
     app = ApplicationBuilder().token(BOT_TOKEN).build()
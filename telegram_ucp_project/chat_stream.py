@@ -0,0 +1,103 @@
+"""Client side of the streaming /chat/stream endpoint for the Telegram bots.
+
+stream_chat() reads the Server-Sent Events the backend emits (`status`,
+`token`, `error`, `done`) and yields them as (event, data) pairs.
+ProgressiveReply shows the answer while it is still being written: the
+first event sends a reply, later events edit it in place. Telegram
+rate-limits edits (roughly one per second per chat), so edits are
+debounced to `min_interval` seconds; finish() always writes the final text,
+and fail() does the same with an error message after any partial answer.
+
+    reply = ProgressiveReply(update.message)
+    async for event, data in stream_chat(client, f"{url}/chat/stream", payload):
+        if event == "status":
+            await reply.set_status(data["message"])
+        elif event == "token":
+            await reply.append(data["text"])
+    await reply.finish("Sorry, I have no answer.")
+"""
+
+import json
+import logging
+import time
+
+import httpx
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+TYPING_CURSOR = " ▌"
+
+
+async def stream_chat(client: httpx.AsyncClient, url: str, payload: dict):
+    """POST `payload` and yield (event, data) for each SSE event until `done`."""
+    async with client.stream("POST", url, json=payload, headers={"Accept": "text/event-stream"}) as resp:
+        if resp.status_code != 200:
+            await resp.aread()
+            resp.raise_for_status()
+        event, data = "message", []
+        async for line in resp.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif not line and data:
+                if event == "done":
+                    return
+                yield event, json.loads("\n".join(data))
+                event, data = "message", []
+
+
+class ProgressiveReply:
+    def __init__(self, message, min_interval: float = 1.0, clock=time.monotonic):
+        self._message = message
+        self.min_interval = min_interval
+        self._clock = clock
+        self._reply = None
+        self._shown = ""
+        self._last_edit = 0.0
+        self.status = ""
+        self.text = ""
+
+    async def set_status(self, status: str):
+        self.status = status
+        await self._render()
+
+    async def append(self, text: str):
+        self.text += text
+        await self._render()
+
+    async def _render(self):
+        body = (self.text or self.status) + TYPING_CURSOR
+        if body == self._shown:
+            return
+        now = self._clock()
+        if self._reply is None:
+            self._reply = await self._message.reply_text(body)
+        elif now - self._last_edit >= self.min_interval:
+            await self._reply.edit_text(body)
+        else:
+            # Skipped; a later edit or finish() shows the text.
+            return
+        self._shown, self._last_edit = body, now
+
+    async def fail(self, error: str):
+        """Finish with `error` after whatever text arrived, dropping the cursor."""
+        partial = self.text.strip()
+        self.text = f"{partial}\n\n{error}" if partial else error
+        await self.finish(error)
+
+    async def finish(self, fallback: str):
+        """Write the final text, as Markdown if Telegram accepts it."""
+        final = self.text.strip() or fallback
+        try:
+            if self._reply is None:
+                await self._message.reply_markdown(final)
+            else:
+                await self._reply.edit_text(final, parse_mode="Markdown")
+        except BadRequest as e:
+            logger.warning(f"Markdown rejected ({e}); sending plain text")
+            if self._reply is None:
+                await self._message.reply_text(final)
+            else:
+                await self._reply.edit_text(final)
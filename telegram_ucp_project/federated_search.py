@@ -0,0 +1,134 @@
+"""Concurrent catalog search across several product sources.
+
+Each source (Shopify, Supabase, the Gaura Hub, ...) is queried at the same
+time with its own deadline and circuit breaker, so a search takes as long as
+the slowest source that answers in time instead of the sum of all of them.
+Sources that miss their deadline are reported back so callers can tell the
+user the results are partial.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Skips a source after repeated failures until a cool-down passes.
+
+    closed -> open after `failure_threshold` consecutive failures; once
+    `reset_timeout` seconds have passed a single trial call is let through
+    (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        """Let the next call through as a trial if this one never recorded an outcome."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+
+
+@dataclass
+class SearchSource:
+    """A named product source with its own deadline and breaker."""
+    name: str
+    search: Callable[..., Awaitable[list]]
+    deadline: float = 3.0
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+
+@dataclass
+class SearchResult:
+    items: list
+    sources_timed_out: list = field(default_factory=list)
+    sources_failed: list = field(default_factory=list)
+    sources_skipped: list = field(default_factory=list)
+
+
+async def federated_search(sources: list[SearchSource], **params) -> SearchResult:
+    """Query every source concurrently and merge what arrives in time.
+
+    `params` are passed to each source's `search`. Items are de-duplicated by
+    `id`; when two sources return the same ID the earlier source in `sources`
+    wins, so the merged order does not depend on which source answered first.
+    """
+    result = SearchResult(items=[])
+    by_source = {}
+
+    async def run(source: SearchSource):
+        start = time.perf_counter()
+        try:
+            items = await asyncio.wait_for(source.search(**params), timeout=source.deadline)
+        except asyncio.TimeoutError:
+            source.breaker.record_failure()
+            result.sources_timed_out.append(source.name)
+            logger.warning("Search source %s missed its %.1fs deadline", source.name, source.deadline)
+            return
+        except Exception as e:
+            source.breaker.record_failure()
+            result.sources_failed.append(source.name)
+            logger.warning("Search source %s failed: %s", source.name, e)
+            return
+        finally:
+            # A cancelled half-open trial records nothing; without this the
+            # breaker would wait for its outcome and skip the source forever.
+            source.breaker.release_trial()
+        source.breaker.record_success()
+        by_source[source.name] = items or []
+        logger.info("Search source %s returned %d items in %.0fms", source.name, len(by_source[source.name]), (time.perf_counter() - start) * 1000)
+
+    active = []
+    for source in sources:
+        if source.breaker.allow():
+            active.append(source)
+        else:
+            result.sources_skipped.append(source.name)
+    await asyncio.gather(*(run(source) for source in active))
+
+    seen = set()
+    for source in sources:
+        for item in by_source.get(source.name, []):
+            key = item.get("id")
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            result.items.append(item)
+    return result
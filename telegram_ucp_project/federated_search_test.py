@@ -0,0 +1,51 @@
+"""Tests for federated_search: the circuit breaker's half-open trial."""
+import asyncio
+import unittest
+
+from federated_search import CircuitBreaker, SearchSource, federated_search
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HalfOpenTrialTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0, clock=self.clock)
+        self.breaker.record_failure()
+        self.clock.now = 30.0
+
+    def test_cancelled_trial_lets_the_next_call_through(self):
+        started = asyncio.Event()
+
+        async def hang(**params):
+            started.set()
+            await asyncio.sleep(60)
+            return []
+
+        async def cancel_trial():
+            source = SearchSource("shopify", hang, deadline=120.0, breaker=self.breaker)
+            task = asyncio.ensure_future(federated_search([source], q="honey"))
+            await started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_trial())
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertTrue(self.breaker.allow())
+
+    def test_only_one_trial_at_a_time(self):
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+
+
+if __name__ == "__main__":
+    unittest.main()
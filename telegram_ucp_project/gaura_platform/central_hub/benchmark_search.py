@@ -0,0 +1,94 @@
+"""Benchmark: LIKE scan vs FTS5 search over a synthetic metadata_index.
+
+Usage:
+    python -m gaura_platform.central_hub.benchmark_search [--items 100000] [--iterations 50]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from gaura_platform.central_hub import search_index
+
+ADJECTIVES = ["organic", "fresh", "handmade", "spicy", "roasted", "wild", "raw", "golden", "smoked", "sweet"]
+NOUNS = ["almond", "honey", "ghee", "cashew", "pepper", "cardamom", "coffee", "banana", "coconut", "jaggery",
+         "turmeric", "mango", "pickle", "rice", "tea", "milk", "soap", "basket", "saree", "lamp"]
+CATEGORIES = ["grocery", "spices", "dairy", "handicrafts", "beverages", "clothing", "home"]
+QUERIES = ["honey", "alm", "organic ghee", "spices", "smoked coconut", "tur", "lamp home", "zzz"]
+
+
+def build_db(path: str, items: int, seed: int = 7) -> sqlite3.Connection:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    # Mirrors the metadata_index table created by hub.init_db().
+    conn.execute('''
+        CREATE TABLE metadata_index (
+            id TEXT PRIMARY KEY,
+            node_id TEXT,
+            name TEXT,
+            category TEXT,
+            price REAL,
+            ai_generated_image_url TEXT
+        )
+    ''')
+    search_index.ensure_search_index(conn)
+    rows = (
+        (f"item_{i}", f"node_{i % 50}",
+         f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(NOUNS)} #{i}",
+         rng.choice(CATEGORIES), round(rng.uniform(10, 1000), 2), None)
+        for i in range(items)
+    )
+    conn.executemany(search_index.UPSERT_SQL, rows)
+    conn.commit()
+    return conn
+
+
+def time_ms(fn, iterations: int) -> list[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def fmt(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"{statistics.median(ordered):8.2f} / {p99:8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        conn = build_db(os.path.join(tmp, "hub.db"), args.items)
+        print(f"Seeded {args.items} items (with FTS triggers) in {time.perf_counter() - start:.1f}s")
+        conn.row_factory = sqlite3.Row
+        limit = search_index.DEFAULT_LIMIT
+
+        print(f"{'query':>16}  {'LIKE all p50/p99 ms':>20}  {'LIKE page p50/p99':>20}  {'FTS page p50/p99':>20}  {'matches':>8}")
+        for query in QUERIES:
+            def like_all():
+                return conn.execute(
+                    "SELECT * FROM metadata_index WHERE name LIKE ? OR category LIKE ?",
+                    (f"%{query}%", f"%{query}%"),
+                ).fetchall()
+            matches = len(like_all())
+            like_all_ms = time_ms(like_all, args.iterations)
+            like_page_ms = time_ms(lambda: search_index.search(conn, query, limit, use_fts=False), args.iterations)
+            fts_page_ms = time_ms(lambda: search_index.search(conn, query, limit), args.iterations)
+            print(f"{query:>16}  {fmt(like_all_ms):>20}  {fmt(like_page_ms):>20}  {fmt(fts_page_ms):>20}  {matches:>8}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
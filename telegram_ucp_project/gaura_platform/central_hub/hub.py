@@ -10,6 +10,8 @@ from pydantic import BaseModel
 # Shared config
 from gaura_platform.config.schema import PlatformItem, HubRelayRequest, MobileResponse, UserAuthRequest, UserProfile
 from gaura_platform.gaura_bot.bot_father_agent import BotFatherAgent
+from gaura_platform.central_hub import search_index
+from gaura_platform.central_hub.storage import HubStorage
 
 import os
 from dotenv import load_dotenv
@@ -24,6 +26,9 @@ def read_root():
     return {"status": "online", "service": "Gaura Central Hub", "version": "1.0.0"}
 
 DB_PATH = "hub_registry.db"
+FTS_ENABLED = False
+# Long-lived connections on a dedicated executor, shared by all endpoints
+storage = HubStorage(DB_PATH, pool_size=int(os.getenv("HUB_DB_POOL_SIZE", "4")))
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
 
@@ -36,8 +41,11 @@ if SUPABASE_URL and SUPABASE_KEY:
         print(f"⚠️ Hub: Supabase connection failed: {e}")
 
 def init_db():
+    global FTS_ENABLED
     print(f"🗄️ [Hub] Initializing DB at: {os.path.abspath(DB_PATH)}")
     conn = sqlite3.connect(DB_PATH)
+    # WAL is persistent: set once here so every pooled connection uses it
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
     # Node Registry: Stores where each 'phone' is listening
     cursor.execute('''
@@ -74,32 +82,29 @@ def init_db():
         )
     ''')
     conn.commit()
+    # Full-text index over metadata_index, kept in sync by triggers
+    FTS_ENABLED = search_index.ensure_search_index(conn)
+    if not FTS_ENABLED:
+        print("⚠️ [Hub] SQLite has no FTS5; /search falls back to LIKE scans")
     conn.close()
 
 init_db()
 
+@app.on_event("shutdown")
+def close_storage():
+    storage.close()
+
 @app.post("/register_node")
 async def register_node(node_id: str, callback_url: str):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
+    await storage.execute('''
         INSERT OR REPLACE INTO nodes (node_id, callback_url, status, last_seen)
         VALUES (?, ?, 'online', CURRENT_TIMESTAMP)
     ''', (node_id, callback_url))
-    conn.commit()
-    conn.close()
     return {"message": f"Node {node_id} registered"}
 
 @app.post("/publish_metadata")
 async def publish_metadata(item: PlatformItem):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO metadata_index (id, node_id, name, category, price, ai_generated_image_url)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (item.id, item.node_id, item.name, item.category, item.base_price, item.ai_generated_image_url))
-    conn.commit()
-    conn.close()
+    await storage.execute(search_index.UPSERT_SQL, (item.id, item.node_id, item.name, item.category, item.base_price, item.ai_generated_image_url))
     return {"message": "Metadata indexed"}
 
 from gaura_platform.config.schema import UserAuthRequest, UserProfile
@@ -109,24 +114,19 @@ import uuid
 async def signup(req: UserAuthRequest):
     print(f"📝 [Hub] Signup attempt for: {req.email}")
     user_id = str(uuid.uuid4())
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
     try:
-        cursor.execute('''
+        await storage.execute('''
             INSERT INTO users (id, email, password, name, role, bot_token, upi_id)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (user_id, req.email, req.password, req.name, req.role, req.bot_token, req.upi_id))
-        conn.commit()
-        
-        # Proactively start their bot if token provided
-        if req.bot_token:
-            await trigger_user_bot(user_id, req.bot_token, req.name)
-            
-        return {"status": "success", "user_id": user_id}
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="Email already exists")
-    finally:
-        conn.close()
+
+    # Proactively start their bot if token provided
+    if req.bot_token:
+        await trigger_user_bot(user_id, req.bot_token, req.name)
+
+    return {"status": "success", "user_id": user_id}
 
 async def trigger_user_bot(user_id: str, token: str, name: str):
     """Signals the Bot Factory to spin up this user's instance"""
@@ -157,11 +157,7 @@ async def auto_create_bot(user_id: str, bot_name: str):
             if result["status"] == "success":
                 token = result["token"]
                 # Save to user profile
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE users SET bot_token = ? WHERE id = ?", (token, user_id))
-                conn.commit()
-                conn.close()
+                await storage.execute("UPDATE users SET bot_token = ? WHERE id = ?", (token, user_id))
                 
                 # Signal factory to start
                 await trigger_user_bot(user_id, token, bot_name)
@@ -177,15 +173,10 @@ logging.basicConfig(level=logging.INFO)
 @app.post("/login")
 async def login(req: UserAuthRequest):
     print(f"🔑 [Hub] Login attempt for: {req.email}")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE email = ? AND password = ?", (req.email, req.password))
-    user = cursor.fetchone()
-    conn.close()
-    
+    user = await storage.fetchone("SELECT * FROM users WHERE email = ? AND password = ?", (req.email, req.password))
+
     if user:
-        user_dict = dict(user)
+        user_dict = user
         # Ensure their bot is running if they have a token
         if user_dict.get("bot_token"):
             await trigger_user_bot(user_dict["id"], user_dict["bot_token"], user_dict["name"])
@@ -194,23 +185,14 @@ async def login(req: UserAuthRequest):
 
 @app.post("/link_node")
 async def link_node(user_id: str, node_id: str):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE users SET node_id = ? WHERE id = ?", (node_id, user_id))
-    conn.commit()
-    conn.close()
+    await storage.execute("UPDATE users SET node_id = ? WHERE id = ?", (node_id, user_id))
     return {"status": "success"}
 
 @app.post("/process_payment")
 async def process_payment(order_id: str, vendor_node_id: str, amount: float):
     """Generates a UPI Payment Link for the Buyer"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
     # Find vendor's UPI ID
-    cursor.execute("SELECT upi_id, name FROM users WHERE node_id = ?", (vendor_node_id,))
-    vendor = cursor.fetchone()
-    conn.close()
+    vendor = await storage.fetchone("SELECT upi_id, name FROM users WHERE node_id = ?", (vendor_node_id,))
     
     if not vendor or not vendor['upi_id']:
         return {"status": "error", "message": "Vendor has not set up UPI"}
@@ -249,17 +231,9 @@ async def confirm_upi_payment(order_id: str, vendor_node_id: str):
     return {"status": "success"}
 
 @app.get("/search")
-async def search_items(query: str):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM metadata_index 
-        WHERE name LIKE ? OR category LIKE ?
-    ''', (f'%{query}%', f'%{query}%'))
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+async def search_items(query: str, limit: int = search_index.DEFAULT_LIMIT, offset: int = 0):
+    """BM25-ranked, prefix-matching search; `limit` is capped at MAX_LIMIT."""
+    return await storage.run(search_index.search, query, limit, offset, FTS_ENABLED)
 
 @app.post("/relay_request")
 async def relay_request(relay: HubRelayRequest):
@@ -267,16 +241,12 @@ async def relay_request(relay: HubRelayRequest):
     The core of the architecture. 
     Routes a request to a specific phone and returns its local response.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT callback_url FROM nodes WHERE node_id = ?", (relay.target_node_id,))
-    row = cursor.fetchone()
-    conn.close()
+    row = await storage.fetchone("SELECT callback_url FROM nodes WHERE node_id = ?", (relay.target_node_id,))
 
     if not row:
         raise HTTPException(status_code=404, detail="Target phone not found or offline")
     
-    target_url = row[0]
+    target_url = row["callback_url"]
     
     # We forward the action and payload to the phone
     async with httpx.AsyncClient() as client:
@@ -0,0 +1,139 @@
+"""Full-text search over the Hub's metadata_index.
+
+`metadata_fts` is an external-content FTS5 table over metadata_index(name,
+category). Triggers keep it in sync with every INSERT/UPDATE/DELETE on
+metadata_index, so writers only ever touch metadata_index. Queries are ranked
+with BM25 (name matches weigh more than category matches) and every term is
+prefix-matched, so "alm" finds "Almond Milk".
+
+If the SQLite build has no FTS5, search falls back to the old LIKE scan.
+"""
+
+import re
+import sqlite3
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# BM25 column weights for (name, category).
+NAME_WEIGHT = 10.0
+CATEGORY_WEIGHT = 2.0
+
+_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS metadata_fts USING fts5(
+        name, category,
+        content='metadata_index', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS metadata_index_ai AFTER INSERT ON metadata_index BEGIN
+        INSERT INTO metadata_fts(rowid, name, category) VALUES (new.rowid, new.name, new.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS metadata_index_ad AFTER DELETE ON metadata_index BEGIN
+        INSERT INTO metadata_fts(metadata_fts, rowid, name, category) VALUES ('delete', old.rowid, old.name, old.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS metadata_index_au AFTER UPDATE ON metadata_index BEGIN
+        INSERT INTO metadata_fts(metadata_fts, rowid, name, category) VALUES ('delete', old.rowid, old.name, old.category);
+        INSERT INTO metadata_fts(rowid, name, category) VALUES (new.rowid, new.name, new.category);
+    END
+    ''',
+]
+
+# Upsert instead of INSERT OR REPLACE: REPLACE deletes the old row without
+# firing delete triggers (unless recursive_triggers is on), which would leave
+# stale entries in the FTS index.
+UPSERT_SQL = '''
+    INSERT INTO metadata_index (id, node_id, name, category, price, ai_generated_image_url)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        node_id = excluded.node_id,
+        name = excluded.name,
+        category = excluded.category,
+        price = excluded.price,
+        ai_generated_image_url = excluded.ai_generated_image_url
+'''
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'"
+    ).fetchone() is not None
+
+
+def ensure_search_index(conn: sqlite3.Connection) -> bool:
+    """Create the FTS table and triggers; backfill if newly created.
+
+    Returns whether full-text search is available.
+    """
+    if not fts5_available(conn):
+        return False
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metadata_fts'"
+    ).fetchone()
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    if not exists:
+        conn.execute("INSERT INTO metadata_fts(metadata_fts) VALUES ('rebuild')")
+    conn.commit()
+    return True
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word, prefix-matched, ANDed.
+
+    Words are quoted so user input can never be parsed as FTS5 syntax.
+    """
+    terms = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def clamp_limit(limit: int | None) -> int:
+    if limit is None:
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def search(conn: sqlite3.Connection, query: str, limit: int | None = None, offset: int = 0, use_fts: bool = True) -> list[dict]:
+    """Return one page of matching metadata_index rows, best match first."""
+    limit = clamp_limit(limit)
+    offset = max(0, offset)
+    conn.row_factory = sqlite3.Row
+    match = to_match_query(query or "")
+    if not match:
+        rows = conn.execute(
+            "SELECT * FROM metadata_index ORDER BY name LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+    elif use_fts:
+        rows = conn.execute(
+            '''
+            SELECT m.* FROM metadata_fts
+            JOIN metadata_index AS m ON m.rowid = metadata_fts.rowid
+            WHERE metadata_fts MATCH ?
+            ORDER BY bm25(metadata_fts, ?, ?), m.rowid
+            LIMIT ? OFFSET ?
+            ''',
+            (match, NAME_WEIGHT, CATEGORY_WEIGHT, limit, offset),
+        ).fetchall()
+    else:
+        rows = like_search(conn, query, limit, offset)
+    return [dict(row) for row in rows]
+
+
+def like_search(conn: sqlite3.Connection, query: str, limit: int, offset: int = 0) -> list:
+    """The pre-FTS substring scan, kept as a fallback and for benchmarks."""
+    return conn.execute(
+        '''
+        SELECT * FROM metadata_index
+        WHERE name LIKE ? OR category LIKE ?
+        LIMIT ? OFFSET ?
+        ''',
+        (f'%{query}%', f'%{query}%', limit, offset),
+    ).fetchall()
@@ -0,0 +1,80 @@
+"""Pooled SQLite access for the Hub.
+
+Every Hub endpoint used to open a fresh `sqlite3` connection and run its
+queries on the event loop. `HubStorage` instead keeps a small pool of
+long-lived connections, one per worker thread of a dedicated executor, and
+runs all database work on those threads so the event loop never blocks on
+disk I/O.
+
+Connections run in WAL mode with synchronous=NORMAL (readers never block the
+writer and commits skip an fsync), and reuse prepared statements through the
+sqlite3 statement cache.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class HubStorage:
+    def __init__(self, path: str, pool_size: int = 4, busy_timeout_ms: int = 5000, statement_cache_size: int = 256):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache_size = statement_cache_size
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="hub-db")
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this worker thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close() can run on the caller thread.
+            conn = sqlite3.connect(self.path, cached_statements=self.statement_cache_size, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn: Callable[..., Any], args: tuple) -> Any:
+        conn = self._connection()
+        try:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+        except BaseException:
+            conn.rollback()
+            raise
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run `fn(conn, *args)` on a pooled connection as one transaction."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    async def execute(self, sql: str, params: tuple = ()) -> int:
+        """Run a write statement and return the number of affected rows."""
+        return await self.run(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def fetchone(self, sql: str, params: tuple = ()) -> dict | None:
+        def query(conn):
+            row = conn.execute(sql, params).fetchone()
+            return dict(row) if row is not None else None
+        return await self.run(query)
+
+    async def fetchall(self, sql: str, params: tuple = ()) -> list[dict]:
+        return await self.run(lambda conn: [dict(row) for row in conn.execute(sql, params).fetchall()])
+
+    def close(self):
+        """Stop the workers and close every pooled connection."""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
@@ -10,6 +10,7 @@ from typing import Dict, Optional
 
 # Shared config
 from gaura_platform.config.schema import BotInstanceConfig
+from chat_stream import ProgressiveReply, stream_chat
 
 from dotenv import load_dotenv
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".env"))
@@ -17,6 +18,9 @@ load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds between edits of a streaming reply (Telegram limits edit rate)
+CHAT_EDIT_INTERVAL = float(os.getenv("CHAT_EDIT_INTERVAL", "1.0"))
+
 class GauraBotInstance:
     """A single bot instance belonging to a specific user"""
     def __init__(self, config: BotInstanceConfig, hub_url: str):
@@ -181,6 +185,8 @@ class GauraBotInstance:
             "Keep responses helpful and concise."
         )
 
+        # Stream the answer into one reply that is edited as it grows
+        reply = ProgressiveReply(update.message, min_interval=CHAT_EDIT_INTERVAL)
         try:
             # We call the unified backend's chat endpoint for Gemini processing
             # This keeps the Gemini logic centralized while bots are distributed
@@ -191,15 +197,22 @@ class GauraBotInstance:
                     "user_id": f"bot_{self.config.user_id}_{user_id}",
                     "context": {"bot_name": self.config.bot_name}
                 }
-                resp = await client.post(f"{backend_url}/chat", json=payload)
-                if resp.status_code == 200:
-                    reply = resp.json().get("response", "I'm having trouble processing that.")
-                    await update.message.reply_markdown(reply)
-                else:
-                    await update.message.reply_text("I'm having trouble connecting to my brain. Please try again later.")
+                async for event, data in stream_chat(client, f"{backend_url}/chat/stream", payload):
+                    if event == "status":
+                        await reply.set_status(data["message"])
+                    elif event == "token":
+                        await reply.append(data["text"])
+                    elif event == "error":
+                        logger.error(f"Chat stream error: {data.get('message')}")
+                        await reply.fail("I'm having trouble processing that.")
+                        return
+                await reply.finish("I'm having trouble processing that.")
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Chat backend error: {e.response.status_code}")
+            await reply.fail("I'm having trouble connecting to my brain. Please try again later.")
         except Exception as e:
             logger.error(f"Chat error: {e}")
-            await update.message.reply_text("I'm momentarily disconnected from the network.")
+            await reply.fail("I'm momentarily disconnected from the network.")
 
     async def run(self):
         logger.info(f"🚀 Initializing bot for user {self.config.user_id}...")
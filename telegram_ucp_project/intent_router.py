@@ -0,0 +1,150 @@
+"""Rule-based intent routing for /chat.
+
+The chat endpoint answers most messages ("find honey", "add gaura::n1::p2",
+"checkout") without the LLM. IntentRouter classifies a message in a single
+pass over its tokens:
+
+* keywords are matched as whole tokens (and phrases such as "check out"
+  or "add to cart", longest first), so "leather" never matches "the" and
+  "address" never matches "add";
+* stop words and intent verbs are dropped token by token to build the
+  search query;
+* product IDs (`gaura::...`, `gid://...`) keep their original case, and a
+  bare number is read as the quantity and left out of the query;
+* "add"/"buy" without a product ID but with other words ("buy honey") is
+  a search for those words: adding the first hit of an older search would
+  add the wrong product.
+
+The result is a Route(intent, query, product_id, qty, confident). Only
+confident routes are handled directly; the rest go to the LLM fallback.
+RouterStats counts how much traffic takes the fast path.
+"""
+
+import re
+from dataclasses import dataclass
+
+SEARCH, ADD_TO_CART, CHECKOUT, UNKNOWN = "search", "add_to_cart", "checkout", "unknown"
+
+# Checked in this order when a message names more than one intent.
+INTENT_KEYWORDS = {
+    CHECKOUT: {"checkout", "check out", "place order", "pay"},
+    ADD_TO_CART: {"add", "add to cart", "buy"},
+    SEARCH: {"find", "search", "show", "get", "looking for", "look for"},
+}
+# Catalog words that imply a search on their own ("honey?").
+PRODUCT_KEYWORDS = {"honey", "milk", "lens", "ghee"}
+
+STOP_WORDS = {
+    "a", "an", "the", "me", "my", "some", "any", "please", "for", "i", "i'm", "want", "need",
+    "looking", "look", "can", "could", "you", "to", "of", "and", "is", "are", "there", "do", "have",
+    "it", "this", "that", "one", "cart", "us", "pls", "plz",
+}
+
+_TOKEN = re.compile(r"gaura::\S+|gid://\S+|[\w']+")
+_ID_PREFIXES = ("gaura::", "gid://")
+_MAX_QTY = 99
+
+
+@dataclass
+class Route:
+    intent: str
+    query: str = ""
+    product_id: str | None = None
+    qty: int = 1
+    confident: bool = False
+
+
+class RouterStats:
+    def __init__(self):
+        self.total = 0
+        self.fast_path = 0
+        self.by_intent: dict[str, int] = {}
+
+    def record(self, route: Route, llm_available: bool = True):
+        self.total += 1
+        self.fast_path += route.confident
+        if route.confident:
+            label = route.intent
+        else:
+            # Without an LLM the unconfident guess is used as-is.
+            label = "llm_fallback" if llm_available else "no_llm"
+        self.by_intent[label] = self.by_intent.get(label, 0) + 1
+
+    def snapshot(self) -> dict:
+        return {
+            "total": self.total,
+            "fast_path": self.fast_path,
+            "fast_path_ratio": round(self.fast_path / self.total, 3) if self.total else 0.0,
+            "by_intent": dict(self.by_intent),
+        }
+
+
+class IntentRouter:
+    def __init__(self, intent_keywords: dict = INTENT_KEYWORDS, product_keywords: set = PRODUCT_KEYWORDS, stop_words: set = STOP_WORDS):
+        # Compiled once: one dict lookup per phrase length at each token.
+        self._phrases: dict[tuple, str] = {}
+        for intent, keywords in intent_keywords.items():
+            for keyword in keywords:
+                self._phrases[tuple(keyword.split())] = intent
+        self._phrase_lengths = sorted({len(p) for p in self._phrases if len(p) > 1}, reverse=True)
+        self._precedence = list(intent_keywords)
+        self._product_keywords = frozenset(product_keywords)
+        self._stop_words = frozenset(stop_words)
+        self.stats = RouterStats()
+
+    def route(self, message: str, llm_available: bool = True) -> Route:
+        route = self._classify(message)
+        self.stats.record(route, llm_available)
+        return route
+
+    def _classify(self, message: str) -> Route:
+        tokens = _TOKEN.findall(message)
+        lowered = [t if t.startswith(_ID_PREFIXES) else t.lower() for t in tokens]
+
+        intents = []
+        product_id = None
+        qty = None
+        keep = []
+        i = 0
+        while i < len(lowered):
+            token = lowered[i]
+            phrase = next(
+                (p for n in self._phrase_lengths if (p := tuple(lowered[i:i + n])) in self._phrases),
+                None,
+            )
+            if phrase is not None:
+                intents.append(self._phrases[phrase])
+                i += len(phrase)
+                continue
+            if (token,) in self._phrases:
+                intents.append(self._phrases[(token,)])
+            elif token.startswith(_ID_PREFIXES):
+                product_id = product_id or tokens[i].rstrip(".,!?")
+            elif token.isdigit() and qty is None and 0 < int(token) <= _MAX_QTY:
+                qty = int(token)
+            elif token not in self._stop_words:
+                keep.append(token)
+            i += 1
+
+        distinct = [intent for intent in self._precedence if intent in intents]
+        has_product_word = any(token in self._product_keywords for token in keep)
+        if not distinct:
+            if product_id:
+                distinct = [ADD_TO_CART]
+            elif has_product_word:
+                distinct = [SEARCH]
+            else:
+                return Route(UNKNOWN, query=" ".join(keep))
+
+        intent = distinct[0]
+        # "find honey and add it" names two actions; let the LLM sort it out.
+        confident = len(distinct) == 1
+        if intent == ADD_TO_CART and not product_id and keep:
+            # "buy honey": find it first rather than guess from the last search.
+            intent = SEARCH
+        if intent == ADD_TO_CART:
+            return Route(intent, product_id=product_id, qty=qty or 1, confident=confident)
+        query = " ".join(keep)
+        if intent == SEARCH and not query:
+            confident = False
+        return Route(intent, query=query, product_id=product_id, confident=confident)
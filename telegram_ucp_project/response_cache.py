@@ -0,0 +1,132 @@
+"""Response cache for the /chat LLM fallback.
+
+Messages that reach the Gemini fallback are mostly small talk ("hi", "what
+can you do?"), and the fallback prompt holds nothing but the message, so an
+answer can be reused for anyone who sends the same thing.
+ChatResponseCache looks answers up in two tiers:
+
+1. exact: the message normalized (case, punctuation and whitespace folded);
+2. similar (optional, needs NumPy): each message is embedded as a hashed
+   bag of character trigrams, and the closest cached message is used when
+   its cosine similarity reaches `similarity_threshold`, which catches
+   typos and small rewordings. Keep the threshold high: one changed letter
+   in a short message ("honey" vs "money") still scores about 0.8.
+
+Entries expire after `ttl_seconds` and the least recently used entry is
+evicted beyond `max_entries`. The cache knows nothing about users: a user's
+opt-out is kept in their session (see backend_unified.chat_events), and
+opted-out messages simply never reach `get` or `put`.
+"""
+
+import re
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # The similarity tier is optional.
+    np = None
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize(message: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", message.lower()).split())
+
+
+class ChatResponseCache:
+    def __init__(
+        self,
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 512,
+        similarity: bool = True,
+        similarity_threshold: float = 0.9,
+        ngram: int = 3,
+        dimensions: int = 1024,
+        clock=time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ngram = ngram
+        self.dimensions = dimensions
+        self._clock = clock
+        # normalized message -> (expires_at, response, row in self._vectors)
+        self._entries: OrderedDict = OrderedDict()
+        self.similarity_enabled = similarity and np is not None
+        if self.similarity_enabled:
+            # One row per entry; rows of evicted entries are zeroed and reused.
+            self._vectors = np.zeros((max_entries, dimensions), dtype=np.float32)
+            self._free_rows = list(range(max_entries - 1, -1, -1))
+            self._row_keys: dict[int, str] = {}
+        self.hits = self.similar_hits = self.misses = self.evictions = 0
+
+    def embed(self, text: str):
+        """L2-normalized hashed character n-gram counts."""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        padded = f" {text} "
+        for i in range(max(1, len(padded) - self.ngram + 1)):
+            vector[zlib.crc32(padded[i:i + self.ngram].encode()) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, message: str) -> str | None:
+        key = normalize(message)
+        if not key:
+            return None
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._remove(key)
+
+        if self.similarity_enabled and self._entries:
+            scores = self._vectors @ self.embed(key)
+            row = int(scores.argmax())
+            if scores[row] >= self.similarity_threshold:
+                match = self._row_keys.get(row)
+                if match is not None and self._entries[match][0] > now:
+                    self._entries.move_to_end(match)
+                    self.similar_hits += 1
+                    return self._entries[match][1]
+        self.misses += 1
+        return None
+
+    def put(self, message: str, response: str):
+        key = normalize(message)
+        if not key or not response or self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        elif len(self._entries) >= self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        row = None
+        if self.similarity_enabled:
+            row = self._free_rows.pop()
+            self._vectors[row] = self.embed(key)
+            self._row_keys[row] = key
+        self._entries[key] = (self._clock() + self.ttl_seconds, response, row)
+
+    def _remove(self, key: str):
+        _, _, row = self._entries.pop(key)
+        if row is not None:
+            self._vectors[row] = 0.0
+            del self._row_keys[row]
+            self._free_rows.append(row)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.similar_hits + self.misses
+        return {
+            "hits": self.hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "similarity_enabled": self.similarity_enabled,
+        }
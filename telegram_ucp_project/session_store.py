@@ -0,0 +1,325 @@
+"""Bounded, persistent key-value store for per-user session state.
+
+Carts, orders and chat context used to live in plain module-level dicts:
+they grew with every user and vanished on restart. SessionStore keeps a
+bounded in-memory tier in front of a SQLite table:
+
+* memory: LRU-ordered, at most `max_entries` entries and `max_bytes` of
+  (JSON-encoded) data; entries not changed for `ttl_seconds` expire;
+* persistence: write-behind. A value is encoded to JSON when it is stored
+  (`store[key] = value`, on the caller's thread) and a background thread
+  writes the encoded rows to SQLite every `flush_interval` seconds: it never
+  touches the live values, and it does not hold the store's lock while
+  writing. Storing a value whose JSON did not change writes nothing;
+* re-hydration: a key missing from memory is loaded from SQLite, so a
+  restarted process picks up where the old one stopped. Async code should
+  `await store.load(key)` first, which reads in a worker thread; the dict
+  interface reads synchronously on a miss, which is fine from threads
+  (such as sync FastAPI endpoints).
+
+Values must be JSON-serializable. Reads never schedule a write, so a value
+changed in place must be stored back:
+
+    CARTS = SessionStore("sessions.db", "carts")
+    CARTS[cart_id] = {"items": []}
+    cart = await CARTS.load(cart_id)
+    cart["items"].append(item)
+    CARTS[cart_id] = cart
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS session_store (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    )
+'''
+
+# Lookup result for a key that is neither in memory nor waiting to be written.
+_UNKNOWN = object()
+
+
+class _Entry:
+    __slots__ = ("value", "updated_at", "size", "digest")
+
+    def __init__(self, value, updated_at: float, encoded: str | None = None):
+        self.value = value
+        self.updated_at = updated_at
+        self.size = len(encoded) if encoded else 0        # bytes of the JSON
+        self.digest = hash(encoded) if encoded else None  # to skip no-op stores
+
+
+class SessionStore:
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        max_entries: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600,
+        flush_interval: float = 1.0,
+        clock=time.time,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        # key -> JSON (None for a delete) not yet handed to the writer
+        self._pending: dict[str, str | None] = {}
+        # the batch being written right now, still visible to lookups
+        self._writing: dict[str, str | None] = {}
+        self._bytes = 0
+        self._lock = threading.RLock()      # memory tier and pending rows
+        self._db_lock = threading.Lock()    # the SQLite connection
+        self.hits = self.loads = self.misses = self.evictions = self.writes = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name=f"session-store-{namespace}", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    # ---- dict interface ----
+
+    def get(self, key: str, default=None):
+        entry = self._lookup(key)
+        return default if entry is None else entry.value
+
+    def __getitem__(self, key: str):
+        entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry.value
+
+    def __contains__(self, key: str) -> bool:
+        return self._lookup(key) is not None
+
+    def __setitem__(self, key: str, value):
+        self._store(key, value, json.dumps(value, default=str))
+
+    def __delitem__(self, key: str):
+        if self._lookup(key) is None:
+            raise KeyError(key)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._pending[key] = None
+
+    def setdefault(self, key: str, default):
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry.value
+        self[key] = default
+        return default
+
+    def __len__(self) -> int:
+        """Entries currently held in memory."""
+        return len(self._entries)
+
+    async def load(self, key: str):
+        """Return the value under `key` (or None), reading SQLite off the loop."""
+        with self._lock:
+            entry = self._from_memory(key)
+        if entry is _UNKNOWN:
+            row = await asyncio.to_thread(self._read, key)
+            with self._lock:
+                entry = self._admit_row(key, row)
+        return None if entry is None else entry.value
+
+    # ---- tiers ----
+
+    def _store(self, key: str, value, encoded: str):
+        """Keep `value` in memory and queue its JSON, encoded by the caller."""
+        with self._lock:
+            now = self._clock()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(value, now)
+            else:
+                self._entries.move_to_end(key)
+                entry.value = value
+                if entry.digest == hash(encoded):
+                    return
+            entry.updated_at = now
+            self._bytes += len(encoded) - entry.size
+            entry.size, entry.digest = len(encoded), hash(encoded)
+            self._pending[key] = encoded
+            self._evict()
+            backlog = len(self._pending) > self.max_entries
+        if backlog:
+            # Under heavy churn, write early rather than buffer unboundedly.
+            if self._flusher is not None:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def _lookup(self, key: str) -> _Entry | None:
+        with self._lock:
+            entry = self._from_memory(key)
+        if entry is not _UNKNOWN:
+            return entry
+        row = self._read(key)
+        with self._lock:
+            return self._admit_row(key, row)
+
+    def _from_memory(self, key: str):
+        """Resolve `key` from memory or unwritten rows; _UNKNOWN if neither."""
+        now = self._clock()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry.updated_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self._drop(key)
+            self._pending[key] = None
+            self.misses += 1
+            return None
+        for rows in (self._pending, self._writing):
+            if key in rows:
+                # Evicted before its write landed: the row is still queued.
+                if rows[key] is None:
+                    self.misses += 1
+                    return None
+                return self._admit(key, rows[key], now)
+        return _UNKNOWN
+
+    def _read(self, key: str):
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT value, updated_at FROM session_store WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+
+    def _admit_row(self, key: str, row) -> _Entry | None:
+        # The key may have been stored or loaded while SQLite was read.
+        entry = self._from_memory(key)
+        if entry is not _UNKNOWN:
+            return entry
+        if row is None or self._clock() - row[1] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        return self._admit(key, row[0], row[1])
+
+    def _admit(self, key: str, encoded: str, updated_at: float) -> _Entry:
+        entry = self._entries[key] = _Entry(json.loads(encoded), updated_at, encoded)
+        self._bytes += entry.size
+        self.loads += 1
+        self._evict()
+        return entry
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        # An evicted entry's latest JSON is already queued, so nothing is lost.
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    # ---- write-behind ----
+
+    def flush(self):
+        """Write queued rows to SQLite; the store stays usable meanwhile."""
+        with self._db_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+            now = self._clock()
+            upserts = [(self.namespace, key, encoded, now) for key, encoded in batch.items() if encoded is not None]
+            deletes = [(self.namespace, key) for key, encoded in batch.items() if encoded is None]
+            try:
+                with self._db:
+                    self._db.executemany(
+                        '''
+                        INSERT INTO session_store (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                        ''',
+                        upserts,
+                    )
+                    self._db.executemany("DELETE FROM session_store WHERE namespace = ? AND key = ?", deletes)
+            except Exception:
+                with self._lock:
+                    # Requeue, keeping anything changed during the write.
+                    self._pending = {**batch, **self._pending}
+                raise
+            finally:
+                with self._lock:
+                    self._writing = {}
+            with self._lock:
+                self.writes += len(batch)
+
+    def expire(self):
+        """Drop expired entries from memory and expired rows from SQLite."""
+        with self._lock:
+            now = self._clock()
+            for key in [k for k, e in self._entries.items() if now - e.updated_at > self.ttl_seconds]:
+                self._drop(key)
+        with self._db_lock, self._db:
+            self._db.execute(
+                "DELETE FROM session_store WHERE namespace = ? AND updated_at < ?",
+                (self.namespace, now - self.ttl_seconds),
+            )
+
+    def _flush_loop(self):
+        last_expire = 0.0
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - last_expire > 60:
+                    self.expire()
+                    last_expire = time.monotonic()
+            except Exception as e:
+                logger.error(f"Session store flush failed ({self.namespace}): {e}")
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "loads": self.loads,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "writes": self.writes,
+            }
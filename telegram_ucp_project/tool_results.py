@@ -0,0 +1,123 @@
+"""Compact, size-capped encoding of MCP tool results.
+
+Whatever a tool returns is pasted into the model's context and re-sent on
+every later turn of the conversation. FastMCP serializes dicts and lists as
+indented JSON, so a federated search with 20+ hits costs thousands of tokens
+of braces, repeated keys and long descriptions the model rarely needs.
+
+ResultPages shapes list results instead:
+
+    pages = ResultPages()
+    return pages.first_page("search_products", items)
+
+* projection: only the columns in TOOL_FIELDS[tool] are kept, and long
+  strings are cut to `max_field_chars`;
+* a cap: at most `page_size` rows and roughly `max_chars` characters;
+* a compact table: one header line, then one `|`-separated line per row;
+* continuation: when rows are left over the header names a token, and
+  `pages.next_page(token)` (exposed to the model as `get_more`) returns the
+  next page. Tokens carry their offset, so asking twice is harmless.
+
+Leftover rows are kept in memory for `ttl_seconds`, LRU-bounded.
+"""
+
+import json
+import secrets
+import time
+
+try:
+    from .ttl_cache import TTLCache
+except ImportError:  # Imported as a top-level module (backend_unified).
+    from ttl_cache import TTLCache
+
+DEFAULT_PAGE_SIZE = 8
+DEFAULT_MAX_CHARS = 1500
+DEFAULT_MAX_FIELD_CHARS = 48
+
+# Columns the model actually uses, per tool. Anything else (descriptions,
+# image URLs, timestamps, ...) is dropped from the encoded result.
+TOOL_FIELDS = {
+    "search_products": ("id", "name", "price", "currency", "size", "seller_location", "stock", "source"),
+}
+
+
+def _cell(value, max_chars: int) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = " ".join(str(value).split()).replace("|", "/")
+    if len(text) > max_chars:
+        text = text[:max_chars - 1] + "…"
+    return text
+
+
+def encode_record(record) -> str:
+    """Single objects (a cart, an order, an error) as whitespace-free JSON."""
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ResultPages:
+    def __init__(
+        self,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        max_field_chars: int = DEFAULT_MAX_FIELD_CHARS,
+        ttl_seconds: float = 600.0,
+        max_entries: int = 256,
+        clock=time.monotonic,
+    ):
+        self.page_size = page_size
+        self.max_chars = max_chars
+        self.max_field_chars = max_field_chars
+        # result id -> (tool, columns, items)
+        self._results = TTLCache(ttl_seconds, max_entries, clock=clock)
+
+    def columns_for(self, tool: str, items: list) -> tuple:
+        """TOOL_FIELDS[tool], minus columns that no row has a value for."""
+        fields = TOOL_FIELDS.get(tool)
+        if fields is None:
+            fields = tuple(dict.fromkeys(key for item in items for key in item))
+        return tuple(f for f in fields if any(item.get(f) not in (None, "") for item in items))
+
+    def first_page(self, tool: str, items: list) -> str:
+        """Encode the first page of `items`, keeping the rest for get_more."""
+        if not items:
+            return f"{tool}: no results"
+        return self._render(tool, self.columns_for(tool, items), items, 0, None)
+
+    def next_page(self, token: str) -> str:
+        """Encode the page a continuation token points at."""
+        result_id, _, offset = (token or "").partition(":")
+        entry = self._results.get(result_id)
+        if entry is None or not offset.isdigit():
+            return "Unknown or expired continuation token; repeat the original request."
+        tool, columns, items = entry
+        return self._render(tool, columns, items, min(int(offset), len(items)), result_id)
+
+    def _store(self, tool: str, columns: tuple, items: list) -> str:
+        # 64 bits: a stale or mistyped token will not land on another result.
+        result_id = secrets.token_hex(8)
+        self._results.put(result_id, (tool, columns, items))
+        return result_id
+
+    def _render(self, tool: str, columns: tuple, items: list, offset: int, result_id: str | None) -> str:
+        header = "|".join(columns)
+        lines = []
+        size = len(header)
+        end = offset
+        for item in items[offset:offset + self.page_size]:
+            line = "|".join(_cell(item.get(column), self.max_field_chars) for column in columns)
+            # Always show at least one row, even if it alone is over budget.
+            if lines and size + len(line) + 1 > self.max_chars:
+                break
+            lines.append(line)
+            size += len(line) + 1
+            end += 1
+
+        summary = f"{tool}: rows {offset + 1}-{end} of {len(items)}" if lines else f"{tool}: no more rows"
+        if end < len(items):
+            if result_id is None:
+                result_id = self._store(tool, columns, items)
+            summary += f' (more: get_more(token="{result_id}:{end}"))'
+        return "\n".join([summary, header, *lines])
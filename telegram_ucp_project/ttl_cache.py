@@ -0,0 +1,63 @@
+"""Small LRU cache whose entries expire a fixed time after they are stored.
+
+Used for the MCP server's cached backend responses and for the leftover
+rows behind tool_results continuation tokens:
+
+    cache = TTLCache(ttl_seconds=30, max_entries=256)
+    cache.put(key, value)
+    cache.get(key)  # value, or None once expired or evicted
+
+None is what `get` returns for a miss, so None values should not be stored.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, ttl_seconds: float, max_entries: int, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        # key -> (expires_at, value), least recently used first
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self._clock():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store `value`; a TTL or bound of zero or less disables the cache."""
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        entry = self._entries.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,261 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Cached resolution of agent profiles to webhook URLs.
+
+Checkout requests name the agent's discovery profile in the `UCP-Agent`
+header, and the webhook URL is read from that profile. An agent sends the
+same profile URI with every request, so `ProfileResolver` keeps the
+resolved URL per URI instead of fetching the profile each time:
+- freshness follows the response's `Cache-Control` (`max-age`, `no-cache`,
+  `no-store`), capped at `max_ttl_seconds`, with `default_ttl_seconds` when
+  the header is absent;
+- once stale, an entry with an `ETag` or `Last-Modified` validator is
+  revalidated with a conditional GET, and a 304 keeps the cached URL;
+- failures (network errors, non-200 responses, invalid profiles, profiles
+  without a webhook) are cached as None for `negative_ttl_seconds`;
+- storage, LRU eviction and sharing one fetch between concurrent lookups
+  of a URI come from `cache.StaleWhileRevalidateCache`;
+- every fetch goes through one pooled `httpx.AsyncClient`.
+"""
+
+import collections
+from collections.abc import Callable
+import dataclasses
+import logging
+import re
+import time
+
+import cache
+import httpx
+from pydantic import BaseModel
+from pydantic import HttpUrl
+
+logger = logging.getLogger(__name__)
+
+_MAX_AGE = re.compile(r"max-age\s*=\s*\"?(\d+)")
+
+
+class UcpConfig(BaseModel):
+  """Configuration for UCP."""
+
+  webhook_url: HttpUrl | None = None
+
+
+class Capability(BaseModel):
+  """UCP capability definition."""
+
+  config: UcpConfig | None = None
+
+
+class UcpProfile(BaseModel):
+  """UCP discovery profile."""
+
+  capabilities: list[Capability] = []
+
+
+class AgentProfile(BaseModel):
+  """Agent profile schema."""
+
+  ucp: UcpProfile | None = None
+
+
+@dataclasses.dataclass
+class _Entry:
+  """A resolved profile and the validators needed to revalidate it."""
+
+  webhook_url: str | None
+  # Seconds the result may be reused, None if it must not be stored.
+  lifetime: float | None
+  etag: str | None = None
+  last_modified: str | None = None
+
+
+def freshness_lifetime(
+  headers: httpx.Headers, default: float, maximum: float
+) -> float | None:
+  """Seconds a response may be reused, or None if it must not be stored."""
+  cache_control = headers.get("Cache-Control", "").lower()
+  if "no-store" in cache_control:
+    return None
+  if "no-cache" in cache_control:
+    return 0.0
+  match = _MAX_AGE.search(cache_control)
+  if match:
+    return min(float(match.group(1)), maximum)
+  return default
+
+
+def webhook_url_from_profile(data: object) -> str | None:
+  """Return the first webhook URL configured by any capability."""
+  profile = AgentProfile.model_validate(data)
+  if profile.ucp and profile.ucp.capabilities:
+    for cap in profile.ucp.capabilities:
+      if cap.config and cap.config.webhook_url:
+        return str(cap.config.webhook_url)
+  return None
+
+
+class ProfileResolver:
+  """Bounded cache of agent profile URI -> webhook URL.
+
+  Storage, LRU eviction, coalescing of concurrent lookups and the hit/miss
+  counters come from `cache.StaleWhileRevalidateCache`; each entry's
+  freshness is taken from the profile response. Stale profiles are never
+  served: a lookup past an entry's lifetime waits for its revalidation.
+  """
+
+  def __init__(
+    self,
+    max_entries: int = 1024,
+    default_ttl_seconds: float = 300.0,
+    max_ttl_seconds: float = 3600.0,
+    negative_ttl_seconds: float = 30.0,
+    timeout: float = 5.0,
+    client: httpx.AsyncClient | None = None,
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    """Initialize ProfileResolver.
+
+    Args:
+      max_entries: Maximum number of cached profiles.
+      default_ttl_seconds: Lifetime of a profile served without
+        `Cache-Control` freshness information.
+      max_ttl_seconds: Upper bound on any lifetime taken from `max-age`.
+      negative_ttl_seconds: Lifetime of a failed resolution.
+      timeout: Deadline in seconds of one profile fetch.
+      client: Optional preconfigured client (mainly for tests).
+      clock: Monotonic time source, injectable for tests.
+
+    """
+    self.default_ttl_seconds = default_ttl_seconds
+    self.max_ttl_seconds = max_ttl_seconds
+    self.negative_ttl_seconds = negative_ttl_seconds
+    self.timeout = timeout
+    self._client = client
+    self._cache = cache.StaleWhileRevalidateCache(
+      max_entries=max_entries,
+      stale_seconds=0.0,
+      lifetime=lambda entry: entry.lifetime,
+      clock=clock,
+    )
+    self._counters: collections.Counter = collections.Counter()
+
+  def configure(
+    self,
+    max_entries: int | None = None,
+    default_ttl_seconds: float | None = None,
+    negative_ttl_seconds: float | None = None,
+  ) -> None:
+    """Update the size bound and lifetimes, evicting if now over bound."""
+    if default_ttl_seconds is not None:
+      self.default_ttl_seconds = default_ttl_seconds
+    if negative_ttl_seconds is not None:
+      self.negative_ttl_seconds = negative_ttl_seconds
+    self._cache.configure(max_entries=max_entries)
+
+  async def resolve(self, profile_uri: str) -> str | None:
+    """Return the webhook URL of the profile at `profile_uri`, or None."""
+    # An expired entry still carries the validators for a conditional GET.
+    stale = self._cache.peek(profile_uri)
+    entry = await self._cache.get_or_fetch(
+      profile_uri, lambda: self._load(profile_uri, stale)
+    )
+    return entry.webhook_url
+
+  def invalidate(self, profile_uri: str | None = None) -> None:
+    """Drop one entry, or every entry if no URI is given."""
+    self._cache.invalidate(profile_uri)
+
+  async def aclose(self) -> None:
+    """Close the shared client and its pooled connections."""
+    if self._client is not None:
+      await self._client.aclose()
+      self._client = None
+
+  def stats(self) -> dict[str, int]:
+    """Return hit, miss, revalidation, coalescing and eviction counters."""
+    cached = self._cache.stats()
+    return {
+      "hits": cached["hits"],
+      "misses": cached["misses"],
+      "revalidated": self._counters["revalidated"],
+      "coalesced": cached["coalesced"],
+      "negative": self._counters["negative"],
+      "evictions": cached["evictions"],
+      "size": cached["size"],
+    }
+
+  def _get_client(self) -> httpx.AsyncClient:
+    """Return the shared client, opening it if needed."""
+    if self._client is None or self._client.is_closed:
+      self._client = httpx.AsyncClient(timeout=self.timeout)
+    return self._client
+
+  async def _load(self, profile_uri: str, stale: _Entry | None) -> _Entry:
+    """Fetch or revalidate `profile_uri` and return the resolved entry."""
+    headers = {}
+    if stale is not None and stale.etag:
+      headers["If-None-Match"] = stale.etag
+    if stale is not None and stale.last_modified:
+      headers["If-Modified-Since"] = stale.last_modified
+
+    try:
+      response = await self._get_client().get(profile_uri, headers=headers)
+    except httpx.HTTPError as e:
+      logger.error("Network error fetching profile from %s: %s", profile_uri, e)
+      return self._negative()
+
+    lifetime = freshness_lifetime(
+      response.headers, self.default_ttl_seconds, self.max_ttl_seconds
+    )
+    if response.status_code == 304 and stale is not None:
+      self._counters["revalidated"] += 1
+      return dataclasses.replace(stale, lifetime=lifetime)
+
+    if response.status_code != 200:
+      logger.error(
+        "Failed to fetch profile from %s: Status %d",
+        profile_uri,
+        response.status_code,
+      )
+      return self._negative()
+
+    try:
+      webhook_url = webhook_url_from_profile(response.json())
+    except (ValueError, TypeError) as e:
+      logger.error(
+        "Failed to validate Agent Profile from %s: %s", profile_uri, e
+      )
+      return self._negative()
+    if webhook_url is None:
+      logger.warning("No webhook_url found in profile from %s", profile_uri)
+      return self._negative()
+    return _Entry(
+      webhook_url,
+      lifetime,
+      etag=response.headers.get("ETag"),
+      last_modified=response.headers.get("Last-Modified"),
+    )
+
+  def _negative(self) -> _Entry:
+    """Return an entry remembering a failed resolution for a short while."""
+    self._counters["negative"] += 1
+    lifetime = self.negative_ttl_seconds
+    return _Entry(None, lifetime if lifetime > 0 else None)
+
+
+# The resolver behind every `UCP-Agent` webhook lookup; config.lifespan sizes
+# it and closes its client.
+resolver = ProfileResolver()
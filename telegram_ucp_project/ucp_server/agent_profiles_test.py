@@ -0,0 +1,214 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for the cached agent profile resolver."""
+
+import asyncio
+
+from absl.testing import absltest
+import agent_profiles
+import httpx
+
+PROFILE_URI = "https://agent.test/profile.json"
+WEBHOOK = "https://agent.test/webhooks/orders"
+PROFILE = {"ucp": {"capabilities": [{"config": {"webhook_url": WEBHOOK}}]}}
+
+
+class ProfileResolverTest(absltest.TestCase):
+  """Tests for freshness, revalidation, negative caching and coalescing."""
+
+  def setUp(self) -> None:
+    """Serve scripted responses from a mock transport with a fake clock."""
+    super().setUp()
+    self.now = 0.0
+    self.responses = []
+    self.requests = []
+
+  def _resolver(self, **options) -> agent_profiles.ProfileResolver:
+    async def handler(request: httpx.Request) -> httpx.Response:
+      self.requests.append(request)
+      await asyncio.sleep(0)
+      return self.responses.pop(0)
+
+    return agent_profiles.ProfileResolver(
+      client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+      clock=lambda: self.now,
+      **options,
+    )
+
+  def _run(self, coro_fn, **options):
+    """Run `coro_fn(resolver)` and close the resolver afterwards."""
+
+    async def run():
+      resolver = self._resolver(**options)
+      try:
+        return await coro_fn(resolver)
+      finally:
+        await resolver.aclose()
+
+    return asyncio.run(run())
+
+  def test_fresh_profile_is_served_from_cache(self) -> None:
+    """Tests that max-age bounds how long the profile is reused."""
+    self.responses = [
+      httpx.Response(
+        200, json=PROFILE, headers={"Cache-Control": "max-age=60"}
+      ),
+      httpx.Response(200, json=PROFILE),
+    ]
+
+    async def scenario(resolver):
+      first = await resolver.resolve(PROFILE_URI)
+      self.now = 59
+      second = await resolver.resolve(PROFILE_URI)
+      self.now = 61
+      third = await resolver.resolve(PROFILE_URI)
+      return [first, second, third], resolver.stats()
+
+    urls, stats = self._run(scenario)
+    self.assertEqual(urls, [WEBHOOK] * 3)
+    self.assertLen(self.requests, 2)
+    self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+  def test_stale_profile_is_revalidated_with_etag(self) -> None:
+    """Tests that a 304 keeps the cached webhook URL."""
+    self.responses = [
+      httpx.Response(
+        200,
+        json=PROFILE,
+        headers={"Cache-Control": "max-age=10", "ETag": '"v1"'},
+      ),
+      httpx.Response(304, headers={"Cache-Control": "max-age=10"}),
+    ]
+
+    async def scenario(resolver):
+      await resolver.resolve(PROFILE_URI)
+      self.now = 11
+      revalidated = await resolver.resolve(PROFILE_URI)
+      self.now = 20
+      cached = await resolver.resolve(PROFILE_URI)
+      return revalidated, cached, resolver.stats()
+
+    revalidated, cached, stats = self._run(scenario)
+    self.assertEqual((revalidated, cached), (WEBHOOK, WEBHOOK))
+    self.assertEqual(self.requests[1].headers["If-None-Match"], '"v1"')
+    self.assertEqual(stats["revalidated"], 1)
+    self.assertLen(self.requests, 2)
+
+  def test_no_store_is_not_cached(self) -> None:
+    """Tests that `no-store` profiles are fetched on every request."""
+    self.responses = [
+      httpx.Response(200, json=PROFILE, headers={"Cache-Control": "no-store"}),
+      httpx.Response(200, json=PROFILE, headers={"Cache-Control": "no-store"}),
+    ]
+
+    async def scenario(resolver):
+      return [await resolver.resolve(PROFILE_URI) for _ in range(2)]
+
+    self.assertEqual(self._run(scenario), [WEBHOOK, WEBHOOK])
+    self.assertLen(self.requests, 2)
+
+  def test_failures_are_cached_briefly(self) -> None:
+    """Tests the negative cache for errors and profiles without a webhook."""
+    self.responses = [
+      httpx.Response(500),
+      httpx.Response(200, json={"ucp": {"capabilities": []}}),
+      httpx.Response(200, json=PROFILE),
+    ]
+
+    async def scenario(resolver):
+      results = [await resolver.resolve(PROFILE_URI)]
+      self.now = 5
+      results.append(await resolver.resolve(PROFILE_URI))
+      self.now = 11
+      results.append(await resolver.resolve(PROFILE_URI))
+      self.now = 22
+      results.append(await resolver.resolve(PROFILE_URI))
+      return results, resolver.stats()
+
+    results, stats = self._run(scenario, negative_ttl_seconds=10)
+    self.assertEqual(results, [None, None, None, WEBHOOK])
+    self.assertLen(self.requests, 3)
+    self.assertEqual(stats["negative"], 2)
+
+  def test_network_error_is_a_negative_result(self) -> None:
+    """Tests that an unreachable profile resolves to None."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+      raise httpx.ConnectError("refused", request=request)
+
+    async def scenario():
+      resolver = agent_profiles.ProfileResolver(
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+      )
+      try:
+        return await resolver.resolve(PROFILE_URI), resolver.stats()
+      finally:
+        await resolver.aclose()
+
+    url, stats = asyncio.run(scenario())
+    self.assertIsNone(url)
+    self.assertEqual(stats["size"], 1)
+
+  def test_concurrent_lookups_share_one_fetch(self) -> None:
+    """Tests that simultaneous requests for one URI are coalesced."""
+    self.responses = [httpx.Response(200, json=PROFILE)]
+
+    async def scenario(resolver):
+      urls = await asyncio.gather(
+        *[resolver.resolve(PROFILE_URI) for _ in range(5)]
+      )
+      return urls, resolver.stats()
+
+    urls, stats = self._run(scenario)
+    self.assertEqual(urls, [WEBHOOK] * 5)
+    self.assertLen(self.requests, 1)
+    self.assertEqual(stats["coalesced"], 4)
+
+  def test_least_recently_used_profile_is_evicted(self) -> None:
+    """Tests the `max_entries` bound."""
+    self.responses = [httpx.Response(200, json=PROFILE) for _ in range(3)]
+
+    async def scenario(resolver):
+      for uri in ("https://a.test/p", "https://b.test/p", "https://c.test/p"):
+        await resolver.resolve(uri)
+      return resolver.stats()
+
+    stats = self._run(scenario, max_entries=2)
+    self.assertEqual((stats["size"], stats["evictions"]), (2, 1))
+
+  def test_freshness_lifetime(self) -> None:
+    """Tests Cache-Control parsing."""
+    lifetime = agent_profiles.freshness_lifetime
+    self.assertEqual(lifetime(httpx.Headers({}), 300, 3600), 300)
+    self.assertEqual(
+      lifetime(
+        httpx.Headers({"Cache-Control": "public, max-age=42"}), 300, 3600
+      ),
+      42,
+    )
+    self.assertEqual(
+      lifetime(httpx.Headers({"Cache-Control": "max-age=86400"}), 300, 3600),
+      3600,
+    )
+    self.assertEqual(
+      lifetime(httpx.Headers({"Cache-Control": "no-cache"}), 300, 3600), 0
+    )
+    self.assertIsNone(
+      lifetime(httpx.Headers({"Cache-Control": "no-store"}), 300, 3600)
+    )
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,154 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Benchmark for checkout latency as a function of cart size.
+
+For each cart size this script seeds a temporary catalog and measures:
+- `per_item`: resolving every line item with `db.get_product` (N queries).
+- `batched`: resolving the whole cart with `db.get_products` (1 query).
+- `create`: a full `CheckoutService.create_checkout` request.
+
+The two lookup columns run against a cold reference cache so that they time
+the database path; `create` runs with the cache warm, as in production.
+
+Usage:
+  uv run benchmark_checkout.py [--cart_sizes=1,10,40,80] [--iterations=50]
+"""
+
+import asyncio
+from pathlib import Path
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from absl import app as absl_app
+from absl import flags
+from absl import logging as absl_logging
+import db
+from models import UnifiedCheckoutCreateRequest
+from services.checkout_service import CheckoutService
+from services.fulfillment_service import FulfillmentService
+
+FLAGS = flags.FLAGS
+flags.DEFINE_list(
+  "cart_sizes", ["1", "5", "10", "20", "40", "80"], "Cart sizes to measure"
+)
+flags.DEFINE_integer("iterations", 50, "Requests to time per cart size")
+
+
+def _fmt(samples: list[float]) -> str:
+  """Format latency samples as 'p50 / p99' in milliseconds."""
+  ordered = sorted(samples)
+  p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+  return f"{statistics.median(ordered) * 1000:7.2f} / {p99 * 1000:7.2f}"
+
+
+async def _seed(product_count: int) -> list[str]:
+  """Populate the catalog and inventory with synthetic products."""
+  ids = [f"sku_{i}" for i in range(product_count)]
+  async with db.manager.products_session_factory() as session:
+    session.add_all(
+      [
+        db.Product(id=pid, title=pid, price=100 + i)
+        for i, pid in enumerate(ids)
+      ]
+    )
+    await session.commit()
+  async with db.manager.transactions_session_factory() as session:
+    session.add_all(
+      [db.Inventory(product_id=pid, quantity=10**6) for pid in ids]
+    )
+    await session.commit()
+  return ids
+
+
+def _create_request(ids: list[str]) -> UnifiedCheckoutCreateRequest:
+  """Build a create-checkout request containing one line per product ID."""
+  return UnifiedCheckoutCreateRequest.model_validate(
+    {
+      "currency": "USD",
+      "line_items": [
+        {"item": {"id": pid, "title": pid, "price": 0}, "quantity": 1}
+        for pid in ids
+      ],
+      "payment": {"handlers": [], "instruments": []},
+    }
+  )
+
+
+async def run_benchmark() -> None:
+  """Time catalog lookups and checkout creation for each cart size."""
+  cart_sizes = [int(size) for size in FLAGS.cart_sizes]
+  test_dir = Path(tempfile.mkdtemp())
+  await db.manager.init_dbs(
+    str(test_dir / "products.db"), str(test_dir / "transactions.db")
+  )
+  try:
+    ids = await _seed(max(cart_sizes))
+    print(  # noqa: T201
+      f"{'cart':>5}  {'per_item p50/p99 ms':>20}  {'batched p50/p99 ms':>20}"
+      f"  {'create p50/p99 ms':>20}"
+    )
+    for size in cart_sizes:
+      cart = ids[:size]
+      per_item, batched, create = [], [], []
+      for _ in range(FLAGS.iterations):
+        db.reference_cache.invalidate(db.PRODUCTS_CACHE)
+        async with db.manager.products_session_factory() as session:
+          start = time.perf_counter()
+          for pid in cart:
+            await db.get_product(session, pid)
+          per_item.append(time.perf_counter() - start)
+
+        db.reference_cache.invalidate(db.PRODUCTS_CACHE)
+        async with db.manager.products_session_factory() as session:
+          start = time.perf_counter()
+          await db.get_products(session, cart)
+          batched.append(time.perf_counter() - start)
+
+        request = _create_request(cart)
+        async with (
+          db.manager.products_session_factory() as products_session,
+          db.manager.transactions_session_factory() as transactions_session,
+        ):
+          service = CheckoutService(
+            FulfillmentService(),
+            products_session,
+            transactions_session,
+            "http://localhost",
+          )
+          start = time.perf_counter()
+          await service.create_checkout(request, str(uuid.uuid4()))
+          create.append(time.perf_counter() - start)
+
+      print(  # noqa: T201
+        f"{size:>5}  {_fmt(per_item):>20}  {_fmt(batched):>20}"
+        f"  {_fmt(create):>20}"
+      )
+  finally:
+    await db.manager.close()
+    shutil.rmtree(test_dir)
+
+
+def main(argv):
+  """Run the checkout benchmark."""
+  del argv
+  absl_logging.set_verbosity(absl_logging.WARNING)
+  asyncio.run(run_benchmark())
+
+
+if __name__ == "__main__":
+  absl_app.run(main)
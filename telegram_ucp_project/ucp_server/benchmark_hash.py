@@ -0,0 +1,176 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Micro-benchmark for hashing checkout request bodies.
+
+Every create/update/complete/cancel hashes its request body for the
+Idempotency-Key check. For a create request of `--cart_size` line items
+(with a payment handler and a card instrument) and for a complete request,
+this script times:
+- `model_dump`: converting the request model to JSON values, common to all;
+- `legacy`: the previous `json.dumps(sort_keys=True)` + SHA-256;
+- `legacy_stream`: the same bytes fed to SHA-256 chunk by chunk from
+  `JSONEncoder.iterencode`, without building the whole string;
+- `sha256_json` / `sha256` / `blake2b`: canonical_hash with the json module
+  and, if installed, orjson.
+
+Times exclude `model_dump` except for `total_*`, which is what a request
+pays under the legacy and the configured algorithm.
+
+Usage:
+  uv run benchmark_hash.py [--cart_size=10] [--iterations=2000]
+"""
+
+import hashlib
+import json
+import timeit
+from unittest import mock
+
+from absl import app as absl_app
+from absl import flags
+import canonical_hash
+from models import UnifiedCheckoutCreateRequest
+
+FLAGS = flags.FLAGS
+flags.DEFINE_integer("cart_size", 10, "Line items per checkout")
+flags.DEFINE_integer("iterations", 2000, "Hashes per timing run")
+
+_ADDRESS = {
+  "first_name": "Ada",
+  "last_name": "Lovelace",
+  "street_address": "1600 Amphitheatre Pkwy",
+  "address_locality": "Mountain View",
+  "address_region": "CA",
+  "postal_code": "94043",
+  "address_country": "US",
+}
+
+_PAYMENT = {
+  "handlers": [
+    {
+      "id": "google_pay",
+      "name": "google.pay",
+      "version": "2026-01-11",
+      "spec": "https://example.com/spec",
+      "config_schema": "https://example.com/schema",
+      "instrument_schemas": ["https://example.com/schema"],
+      "config": {"merchant_id": "merchant_123", "environment": "TEST"},
+    }
+  ],
+  "instruments": [
+    {
+      "id": "instr_1",
+      "handler_id": "google_pay",
+      "handler_name": "google.pay",
+      "type": "card",
+      "brand": "Visa",
+      "last_digits": "1234",
+      "expiry_month": 12,
+      "expiry_year": 2030,
+      "billing_address": _ADDRESS,
+      "credential": {"type": "token", "token": "tok_" + "x" * 256},
+    }
+  ],
+}
+
+
+def _create_request(cart_size: int) -> UnifiedCheckoutCreateRequest:
+  """Build a create-checkout request with `cart_size` line items."""
+  return UnifiedCheckoutCreateRequest.model_validate(
+    {
+      "currency": "USD",
+      "buyer": {"email": "ada@example.com", "first_name": "Ada"},
+      "line_items": [
+        {
+          "item": {"id": f"sku_{i}", "title": f"Bouquet nº{i}", "price": 0},
+          "quantity": 1 + i % 3,
+        }
+        for i in range(cart_size)
+      ],
+      "payment": _PAYMENT,
+    }
+  )
+
+
+def _complete_data() -> dict:
+  """Build the data hashed for a complete-checkout request."""
+  request = _create_request(1)
+  return {
+    "payment": request.payment.model_dump(mode="json"),
+    "risk_signals": {"ip": "203.0.113.7", "user_agent": "Mozilla/5.0"},
+    "ap2": None,
+  }
+
+
+def _legacy_stream(data) -> str:
+  h = hashlib.sha256()
+  for chunk in json.JSONEncoder(sort_keys=True).iterencode(data):
+    h.update(chunk.encode("utf-8"))
+  return h.hexdigest()
+
+
+def _time_us(func, *args, **kwargs) -> float:
+  """Return the best per-call time of `func(*args, **kwargs)` in us."""
+  runs = timeit.repeat(
+    lambda: func(*args, **kwargs), number=FLAGS.iterations, repeat=5
+  )
+  return min(runs) / FLAGS.iterations * 1e6
+
+
+def _bench(name: str, request, data: dict) -> None:
+  """Print timings for one payload; `data` is `request` dumped to JSON."""
+  assert _legacy_stream(data) == canonical_hash.legacy_digest(data)
+  sha256 = canonical_hash.RequestHasher("sha256")
+  blake2b = canonical_hash.RequestHasher("blake2b")
+  size = len(canonical_hash.canonical_json(data))
+  print(f"\n{name} ({size} bytes canonical)")  # noqa: T201
+
+  rows = []
+  if request is not None:
+    rows.append(("model_dump", _time_us(request.model_dump, mode="json")))
+  rows.append(("legacy", _time_us(canonical_hash.legacy_digest, data)))
+  rows.append(("legacy_stream", _time_us(_legacy_stream, data)))
+  with mock.patch.object(canonical_hash, "orjson", None):
+    rows.append(("sha256_json", _time_us(sha256.digest, data)))
+  if canonical_hash.orjson is not None:
+    rows.append(("sha256", _time_us(sha256.digest, data)))
+    rows.append(("blake2b", _time_us(blake2b.digest, data)))
+  if request is not None:
+    rows.append(
+      ("total_legacy", _time_us(canonical_hash.legacy_digest, request))
+    )
+    rows.append(
+      (
+        f"total_{canonical_hash.hasher.algorithm}",
+        _time_us(canonical_hash.hasher.digest, request),
+      )
+    )
+  for label, micros in rows:
+    print(f"{label:>16}  {micros:9.2f} us")  # noqa: T201
+
+
+def main(argv):
+  """Run the request hashing benchmark."""
+  del argv
+  print(  # noqa: T201
+    "orjson:", "installed" if canonical_hash.orjson else "not installed"
+  )
+  request = _create_request(FLAGS.cart_size)
+  data = request.model_dump(mode="json")
+  _bench(f"create, {FLAGS.cart_size} items", request, data)
+  _bench("complete", None, _complete_data())
+
+
+if __name__ == "__main__":
+  absl_app.run(main)
@@ -0,0 +1,171 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Benchmark for replaying an Idempotency-Key.
+
+A client retrying a create-checkout request with the same Idempotency-Key
+gets the stored response back. This script times:
+- `first`: the original request, which does the work;
+- `replay_db`: a retry answered from SQLite (in-memory tier cleared);
+- `replay_memory`: a retry answered from the in-memory LRU;
+- `concurrent`: `--retries` simultaneous requests with one new key, under
+  the per-key lock, reporting how many of them created a checkout.
+
+Usage:
+  uv run benchmark_idempotency.py [--cart_size=10] [--iterations=200]
+"""
+
+import asyncio
+from pathlib import Path
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from absl import app as absl_app
+from absl import flags
+from absl import logging as absl_logging
+import db
+import idempotency
+from models import UnifiedCheckoutCreateRequest
+from services.checkout_service import CheckoutService
+from services.fulfillment_service import FulfillmentService
+from sqlalchemy import func
+from sqlalchemy import select
+
+FLAGS = flags.FLAGS
+flags.DEFINE_integer("cart_size", 10, "Line items per checkout")
+flags.DEFINE_integer("iterations", 200, "Requests to time per scenario")
+flags.DEFINE_integer("retries", 8, "Simultaneous requests per key")
+
+
+def _fmt(samples: list[float]) -> str:
+  """Format latency samples as 'p50 / p99' in milliseconds."""
+  ordered = sorted(samples)
+  p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+  return f"{statistics.median(ordered) * 1000:7.3f} / {p99 * 1000:7.3f}"
+
+
+async def _seed(product_count: int) -> list[str]:
+  """Populate the catalog and inventory with synthetic products."""
+  ids = [f"sku_{i}" for i in range(product_count)]
+  async with db.manager.products_session_factory() as session:
+    session.add_all(
+      [
+        db.Product(id=pid, title=pid, price=100 + i)
+        for i, pid in enumerate(ids)
+      ]
+    )
+    await session.commit()
+  async with db.manager.transactions_session_factory() as session:
+    session.add_all(
+      [db.Inventory(product_id=pid, quantity=10**6) for pid in ids]
+    )
+    await session.commit()
+  return ids
+
+
+def _create_request(ids: list[str]) -> UnifiedCheckoutCreateRequest:
+  """Build a create-checkout request containing one line per product ID."""
+  return UnifiedCheckoutCreateRequest.model_validate(
+    {
+      "currency": "USD",
+      "line_items": [
+        {"item": {"id": pid, "title": pid, "price": 0}, "quantity": 1}
+        for pid in ids
+      ],
+      "payment": {"handlers": [], "instruments": []},
+    }
+  )
+
+
+async def _create(request: UnifiedCheckoutCreateRequest, key: str) -> float:
+  """Send one create-checkout request as the route does; returns seconds."""
+  async with (
+    db.manager.products_session_factory() as products_session,
+    db.manager.transactions_session_factory() as transactions_session,
+  ):
+    service = CheckoutService(
+      FulfillmentService(),
+      products_session,
+      transactions_session,
+      "http://localhost",
+    )
+    start = time.perf_counter()
+    async with idempotency.store.lock(key):
+      await service.create_checkout(request, key)
+    return time.perf_counter() - start
+
+
+async def _checkout_count() -> int:
+  async with db.manager.transactions_session_factory() as session:
+    result = await session.execute(
+      select(func.count()).select_from(db.CheckoutSession)
+    )
+    return result.scalar_one()
+
+
+async def run_benchmark() -> None:
+  """Time original requests, replays and concurrent retries."""
+  test_dir = Path(tempfile.mkdtemp())
+  await db.manager.init_dbs(
+    str(test_dir / "products.db"), str(test_dir / "transactions.db")
+  )
+  try:
+    request = _create_request(await _seed(FLAGS.cart_size))
+    first, replay_db, replay_memory, concurrent = [], [], [], []
+    for _ in range(FLAGS.iterations):
+      key = str(uuid.uuid4())
+      first.append(await _create(request, key))
+      idempotency.store.clear()
+      replay_db.append(await _create(request, key))
+      replay_memory.append(await _create(request, key))
+
+    before = await _checkout_count()
+    for _ in range(FLAGS.iterations // FLAGS.retries or 1):
+      key = str(uuid.uuid4())
+      start = time.perf_counter()
+      await asyncio.gather(
+        *[_create(request, key) for _ in range(FLAGS.retries)]
+      )
+      concurrent.append(time.perf_counter() - start)
+    created = await _checkout_count() - before
+
+    print(f"{'scenario':>14}  {'p50/p99 ms':>18}")  # noqa: T201
+    for name, samples in (
+      ("first", first),
+      ("replay_db", replay_db),
+      ("replay_memory", replay_memory),
+      ("concurrent", concurrent),
+    ):
+      print(f"{name:>14}  {_fmt(samples):>18}")  # noqa: T201
+    print(  # noqa: T201
+      f"concurrent: {len(concurrent)} keys x {FLAGS.retries} requests"
+      f" created {created} checkouts"
+    )
+  finally:
+    await db.manager.close()
+    shutil.rmtree(test_dir)
+
+
+def main(argv):
+  """Run the idempotency benchmark."""
+  del argv
+  absl_logging.set_verbosity(absl_logging.WARNING)
+  asyncio.run(run_benchmark())
+
+
+if __name__ == "__main__":
+  absl_app.run(main)
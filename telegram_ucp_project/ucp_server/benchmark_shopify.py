@@ -0,0 +1,211 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Benchmark for Shopify Storefront GraphQL client latency.
+
+Starts a local fake GraphQL server (HTTPS with a throwaway self-signed
+certificate when `openssl` is available) and times product searches with:
+- `per_call`: a new `httpx.AsyncClient` per request (the previous behaviour),
+  paying TCP and TLS setup every time.
+- `pooled`: the shared keep-alive client in `shopify_client`.
+
+Usage:
+  uv run benchmark_shopify.py [--requests=200] [--concurrency=1,10]
+"""
+
+import asyncio
+import http.server
+import json
+import os
+from pathlib import Path
+import shutil
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+from absl import app as absl_app
+from absl import flags
+from absl import logging as absl_logging
+import httpx
+import shopify_client
+
+FLAGS = flags.FLAGS
+flags.DEFINE_integer("requests", 200, "Requests to time per configuration")
+flags.DEFINE_list("concurrency", ["1", "10"], "Concurrent requests in flight")
+flags.DEFINE_float(
+  "server_latency_ms", 0.0, "Artificial processing delay in the fake server"
+)
+flags.DEFINE_bool("tls", True, "Serve over HTTPS (needs the openssl CLI)")
+
+SEARCH_QUERY = "query searchProducts($query: String!) { products { edges } }"
+_RESPONSE = json.dumps(
+  {
+    "data": {
+      "products": {
+        "edges": [
+          {
+            "node": {
+              "id": f"gid://shopify/Product/{i}",
+              "title": f"Product {i}",
+              "description": "",
+              "variants": {
+                "edges": [
+                  {"node": {"price": {"amount": "9.5", "currencyCode": "USD"}}}
+                ]
+              },
+            }
+          }
+          for i in range(10)
+        ]
+      }
+    }
+  }
+).encode()
+
+
+class FakeGraphqlHandler(http.server.BaseHTTPRequestHandler):
+  """Answers every POST with a fixed ten-product search result."""
+
+  protocol_version = "HTTP/1.1"
+  # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls.
+  disable_nagle_algorithm = True
+
+  def log_message(self, *args) -> None:  # noqa: D102
+    del args
+
+  def do_POST(self) -> None:  # noqa: N802, D102
+    self.rfile.read(int(self.headers.get("Content-Length", 0)))
+    if FLAGS.server_latency_ms:
+      time.sleep(FLAGS.server_latency_ms / 1000)
+    self.send_response(200)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(_RESPONSE)))
+    self.end_headers()
+    self.wfile.write(_RESPONSE)
+
+
+def _fmt(samples: list[float]) -> str:
+  """Format latency samples as 'p50 / p99' in milliseconds."""
+  ordered = sorted(samples)
+  p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+  return f"{statistics.median(ordered) * 1000:7.2f} / {p99 * 1000:7.2f}"
+
+
+def _self_signed_context(cert_dir: Path) -> tuple[ssl.SSLContext, str] | None:
+  """Create a localhost certificate; return (server context, CA file)."""
+  cert, key = cert_dir / "cert.pem", cert_dir / "key.pem"
+  try:
+    subprocess.run(
+      [
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+        "-days", "1", "-subj", "/CN=127.0.0.1",
+        "-addext", "subjectAltName=IP:127.0.0.1",
+        "-keyout", str(key), "-out", str(cert),
+      ],
+      check=True,
+      capture_output=True,
+    )  # fmt: skip
+  except (OSError, subprocess.CalledProcessError):
+    return None
+  context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+  context.load_cert_chain(cert, key)
+  return context, str(cert)
+
+
+async def _old_graphql(url: str, verify, query: str, variables: dict):
+  """Send a query the old way, with a new client per request."""
+  async with httpx.AsyncClient(timeout=10.0, verify=verify) as client:
+    resp = await client.post(
+      url,
+      json={"query": query, "variables": variables},
+      headers={"X-Shopify-Storefront-Access-Token": "token"},
+    )
+    return resp.json()
+
+
+async def _time_calls(call, concurrency: int) -> list[float]:
+  """Time FLAGS.requests calls of `call()` with `concurrency` in flight."""
+  samples = []
+  semaphore = asyncio.Semaphore(concurrency)
+
+  async def one() -> None:
+    async with semaphore:
+      start = time.perf_counter()
+      await call()
+      samples.append(time.perf_counter() - start)
+
+  await asyncio.gather(*[one() for _ in range(FLAGS.requests)])
+  return samples
+
+
+async def run_benchmark(url: str, verify) -> None:
+  """Compare the per-call and pooled clients at each concurrency."""
+  variables = {"query": "cake"}
+  print(  # noqa: T201
+    f"{'conc':>5}  {'per_call p50/p99 ms':>20}  {'pooled p50/p99 ms':>20}"
+  )
+  for concurrency in [int(c) for c in FLAGS.concurrency]:
+    per_call = await _time_calls(
+      lambda: _old_graphql(url, verify, SEARCH_QUERY, variables), concurrency
+    )
+    shopify_client.open_client(verify=verify)
+    try:
+      pooled = await _time_calls(
+        lambda: shopify_client.shopify_graphql(SEARCH_QUERY, variables),
+        concurrency,
+      )
+    finally:
+      await shopify_client.close_client()
+    print(  # noqa: T201
+      f"{concurrency:>5}  {_fmt(per_call):>20}  {_fmt(pooled):>20}"
+    )
+
+
+def main(argv):
+  """Run the Shopify client benchmark."""
+  del argv
+  absl_logging.set_verbosity(absl_logging.WARNING)
+  cert_dir = Path(tempfile.mkdtemp())
+  server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FakeGraphqlHandler)
+  scheme, verify = "http", True
+  tls = _self_signed_context(cert_dir) if FLAGS.tls else None
+  if tls:
+    server_context, ca_file = tls
+    server.socket = server_context.wrap_socket(server.socket, server_side=True)
+    scheme, verify = "https", ssl.create_default_context(cafile=ca_file)
+  elif FLAGS.tls:
+    print("openssl not available; benchmarking over plain HTTP")  # noqa: T201
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+
+  os.environ["SHOPIFY_STORE_DOMAIN"] = "127.0.0.1"
+  os.environ["SHOPIFY_STOREFRONT_TOKEN"] = "token"
+  url = f"{scheme}://127.0.0.1:{server.server_address[1]}/graphql.json"
+  os.environ["SHOPIFY_STOREFRONT_URL"] = url
+  print(  # noqa: T201
+    f"fake server: {url} (http2 client support: "
+    f"{shopify_client.HTTP2_AVAILABLE})"
+  )
+  try:
+    asyncio.run(run_benchmark(url, verify))
+  finally:
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(cert_dir)
+
+
+if __name__ == "__main__":
+  absl_app.run(main)
@@ -0,0 +1,413 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""In-process read-through cache for slowly changing reference data.
+
+Products, promotions, shipping rates and discounts are read on every checkout
+create and update but change rarely (typically on a CSV import). This module
+provides `ReferenceCache`, a bounded LRU cache with per-entry TTL that the
+helpers in `db.py` consult before querying SQLite or Supabase.
+
+Entries are grouped into namespaces (e.g. "products"). Each namespace carries
+a version number; `invalidate()` bumps it so that every entry written under an
+older version is treated as a miss and lazily evicted. Writers in other
+processes (such as `import_csv.py`) bump a shared version row instead; a
+watcher started with `start_version_watcher()` polls those rows and
+invalidates the namespaces whose version moved.
+
+`StaleWhileRevalidateCache` covers upstream responses (e.g. Shopify searches)
+that are slow to fetch and fine to serve slightly stale: entries past their
+fresh period are still returned while a single background task refreshes
+them, and concurrent misses for the same key share one upstream call. A
+`lifetime` callback lets the fetched value decide its own freshness (e.g. from
+HTTP `Cache-Control`, see `agent_profiles`).
+"""
+
+import asyncio
+import collections
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterator
+import logging
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedLru:
+  """Mapping that evicts its least recently used keys beyond `max_entries`.
+
+  The storage shared by the caches in this module and by
+  `idempotency.IdempotencyStore`; expiry and statistics stay with them.
+  """
+
+  def __init__(
+    self,
+    max_entries: int,
+    on_evict: Callable[[Any], None] | None = None,
+  ) -> None:
+    """Initialize BoundedLru.
+
+    Args:
+      max_entries: Maximum number of keys. Zero or less stores nothing.
+      on_evict: Optional callback receiving each key evicted for space.
+
+    """
+    self.max_entries = max_entries
+    self._on_evict = on_evict
+    self._data: collections.OrderedDict[Any, Any] = collections.OrderedDict()
+
+  def __len__(self) -> int:
+    """Return the number of stored keys."""
+    return len(self._data)
+
+  def __iter__(self) -> Iterator[Any]:
+    """Iterate over the keys, least recently used first."""
+    return iter(self._data)
+
+  def peek(self, key: Any) -> Any | None:
+    """Return the value of `key` (or None) without marking it used."""
+    return self._data.get(key)
+
+  def touch(self, key: Any) -> None:
+    """Mark `key` as the most recently used."""
+    self._data.move_to_end(key)
+
+  def put(self, key: Any, value: Any) -> None:
+    """Store `value` as the most recently used key, evicting if over bound."""
+    if self.max_entries <= 0:
+      return
+    self._data[key] = value
+    self._data.move_to_end(key)
+    self.resize(self.max_entries)
+
+  def pop(self, key: Any) -> Any | None:
+    """Remove `key` and return its value, or None if absent."""
+    return self._data.pop(key, None)
+
+  def resize(self, max_entries: int) -> None:
+    """Set the bound and evict least recently used keys until within it."""
+    self.max_entries = max_entries
+    while len(self._data) > max(max_entries, 0):
+      key, _ = self._data.popitem(last=False)
+      if self._on_evict is not None:
+        self._on_evict(key)
+
+  def clear(self) -> None:
+    """Remove every key."""
+    self._data.clear()
+
+
+class ReferenceCache:
+  """Bounded LRU cache with TTL and per-namespace versioning."""
+
+  def __init__(
+    self,
+    max_entries: int = 4096,
+    ttl_seconds: float = 300.0,
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    """Initialize ReferenceCache.
+
+    Args:
+      max_entries: Maximum number of entries kept across all namespaces.
+      ttl_seconds: Lifetime of an entry. Zero or less disables caching.
+      clock: Monotonic time source, injectable for tests.
+
+    """
+    self.ttl_seconds = ttl_seconds
+    self._clock = clock
+    # (namespace, key) -> (version, expires_at, value).
+    self._entries = BoundedLru(max_entries, on_evict=self._count_eviction)
+    self._versions: dict[str, int] = collections.defaultdict(int)
+    # Last seen shared version per namespace, see sync_versions().
+    self._shared_versions: dict[str, int] = {}
+    self._watcher: asyncio.Task | None = None
+    self._counters: dict[str, collections.Counter] = collections.defaultdict(
+      collections.Counter
+    )
+
+  def configure(
+    self, max_entries: int | None = None, ttl_seconds: float | None = None
+  ) -> None:
+    """Update the size bound and TTL, evicting entries if now over bound."""
+    if max_entries is not None:
+      self._entries.resize(max_entries)
+    if ttl_seconds is not None:
+      self.ttl_seconds = ttl_seconds
+
+  @property
+  def max_entries(self) -> int:
+    """Maximum number of entries kept across all namespaces."""
+    return self._entries.max_entries
+
+  def get(self, namespace: str, key: Any) -> Any | None:
+    """Return the cached value, or None on a miss.
+
+    Expired entries and entries from an older namespace version count as
+    misses and are removed.
+    """
+    entry = self._entries.peek((namespace, key))
+    if entry is not None:
+      version, expires_at, value = entry
+      if version == self._versions[namespace] and expires_at > self._clock():
+        self._entries.touch((namespace, key))
+        self._counters[namespace]["hits"] += 1
+        return value
+      self._entries.pop((namespace, key))
+    self._counters[namespace]["misses"] += 1
+    return None
+
+  def version(self, namespace: str) -> int:
+    """Return the current version of `namespace`, to pass to `put()`."""
+    return self._versions[namespace]
+
+  def put(
+    self, namespace: str, key: Any, value: Any, version: int | None = None
+  ) -> None:
+    """Store a value under the namespace version it was read at.
+
+    `version` should be taken with `version()` before the read that produced
+    `value`; if the namespace was invalidated since, the value may predate
+    the change and is not stored. Without it, the current version is used.
+    None is never cached so that it can signal a miss from `get()`.
+    """
+    if value is None or self.ttl_seconds <= 0:
+      return
+    current = self._versions[namespace]
+    if version is not None and version != current:
+      self._counters[namespace]["stale_puts"] += 1
+      return
+    self._entries.put(
+      (namespace, key), (current, self._clock() + self.ttl_seconds, value)
+    )
+
+  def invalidate(self, *namespaces: str) -> None:
+    """Invalidate the given namespaces, or every namespace if none given."""
+    if not namespaces:
+      namespaces = tuple({ns for ns, _ in self._entries} | set(self._versions))
+    for namespace in namespaces:
+      self._versions[namespace] += 1
+      self._counters[namespace]["invalidations"] += 1
+
+  def sync_versions(self, shared_versions: dict[str, int]) -> None:
+    """Invalidate namespaces whose shared version changed since last seen."""
+    changed = [
+      namespace
+      for namespace, version in shared_versions.items()
+      if self._shared_versions.get(namespace) != version
+    ]
+    self._shared_versions.update(shared_versions)
+    if changed:
+      self.invalidate(*changed)
+
+  def start_version_watcher(
+    self,
+    load_versions: Callable[[], Awaitable[dict[str, int]]],
+    interval: float,
+  ) -> None:
+    """Poll `load_versions()` every `interval` seconds and sync versions."""
+
+    async def run() -> None:
+      while True:
+        try:
+          self.sync_versions(await load_versions())
+        except Exception as e:  # pylint: disable=broad-exception-caught
+          logger.warning("Reference version check failed: %s", e)
+        await asyncio.sleep(interval)
+
+    self._watcher = asyncio.create_task(run())
+
+  async def stop_version_watcher(self) -> None:
+    """Stop the version watcher, if running."""
+    if self._watcher is not None:
+      self._watcher.cancel()
+      await asyncio.gather(self._watcher, return_exceptions=True)
+      self._watcher = None
+
+  def clear(self) -> None:
+    """Drop every entry and reset the counters."""
+    self._entries.clear()
+    self._shared_versions.clear()
+    self._counters.clear()
+
+  def stats(self) -> dict[str, dict[str, int]]:
+    """Return hit, miss, eviction and size counters per namespace."""
+    sizes = collections.Counter(ns for ns, _ in self._entries)
+    report = {}
+    for namespace in sorted(set(self._counters) | set(sizes)):
+      counters = self._counters[namespace]
+      report[namespace] = {
+        "hits": counters["hits"],
+        "misses": counters["misses"],
+        "evictions": counters["evictions"],
+        "invalidations": counters["invalidations"],
+        "stale_puts": counters["stale_puts"],
+        "version": self._versions[namespace],
+        "size": sizes[namespace],
+      }
+    return report
+
+  def _count_eviction(self, key: tuple[str, Any]) -> None:
+    self._counters[key[0]]["evictions"] += 1
+
+
+class StaleWhileRevalidateCache:
+  """Bounded async LRU cache with stale-while-revalidate and coalescing."""
+
+  def __init__(
+    self,
+    max_entries: int = 1024,
+    fresh_seconds: float = 60.0,
+    stale_seconds: float = 600.0,
+    lifetime: Callable[[Any], float | None] | None = None,
+    clock: Callable[[], float] = time.monotonic,
+  ) -> None:
+    """Initialize StaleWhileRevalidateCache.
+
+    Args:
+      max_entries: Maximum number of cached responses.
+      fresh_seconds: Age below which an entry is served without refreshing.
+        Zero or less disables caching (requests are still coalesced).
+      stale_seconds: Extra time after the fresh period during which an entry
+        is served while being refreshed in the background.
+      lifetime: Optional function returning the fresh period of a fetched
+        value, or None if it must not be cached. Overrides `fresh_seconds`.
+      clock: Monotonic time source, injectable for tests.
+
+    """
+    self.fresh_seconds = fresh_seconds
+    self.stale_seconds = stale_seconds
+    self._lifetime = lifetime
+    self._clock = clock
+    self._counters: collections.Counter = collections.Counter()
+    # key -> (fetched_at, fresh period or None for fresh_seconds, value).
+    self._entries = BoundedLru(
+      max_entries, on_evict=lambda _: self._counters.update(["evictions"])
+    )
+    self._inflight: dict[Any, asyncio.Task] = {}
+
+  def configure(
+    self,
+    max_entries: int | None = None,
+    fresh_seconds: float | None = None,
+    stale_seconds: float | None = None,
+  ) -> None:
+    """Update the size bound and lifetimes, evicting if now over bound."""
+    if max_entries is not None:
+      self._entries.resize(max_entries)
+    if fresh_seconds is not None:
+      self.fresh_seconds = fresh_seconds
+    if stale_seconds is not None:
+      self.stale_seconds = stale_seconds
+
+  @property
+  def max_entries(self) -> int:
+    """Maximum number of cached responses."""
+    return self._entries.max_entries
+
+  async def get_or_fetch(
+    self, key: Any, fetch: Callable[[], Awaitable[Any]]
+  ) -> Any:
+    """Return the value for `key`, calling `fetch()` on a miss.
+
+    Fresh entries are returned directly. Stale entries are returned at once
+    and refreshed by one background task. Misses wait for a fetch shared by
+    every concurrent caller of the same key. A None result is returned but
+    not cached, so upstream failures are retried on the next call.
+    """
+    entry = self._entries.peek(key)
+    if entry is not None:
+      fetched_at, fresh_for, value = entry
+      if fresh_for is None:
+        fresh_for = self.fresh_seconds
+      age = self._clock() - fetched_at
+      if age < fresh_for:
+        self._entries.touch(key)
+        self._counters["hits"] += 1
+        return value
+      if age < fresh_for + self.stale_seconds:
+        self._entries.touch(key)
+        self._counters["stale_hits"] += 1
+        if key not in self._inflight:
+          self._start_fetch(key, fetch)
+        return value
+      self._entries.pop(key)
+
+    if key in self._inflight:
+      self._counters["coalesced"] += 1
+    else:
+      self._counters["misses"] += 1
+      self._start_fetch(key, fetch)
+    # Shield the shared fetch from cancellation of any single waiter.
+    return await asyncio.shield(self._inflight[key])
+
+  def peek(self, key: Any) -> Any | None:
+    """Return the cached value even if expired, without counting a lookup."""
+    entry = self._entries.peek(key)
+    return None if entry is None else entry[2]
+
+  def invalidate(self, key: Any | None = None) -> None:
+    """Drop one entry, or every entry if no key is given."""
+    if key is None:
+      self._entries.clear()
+    else:
+      self._entries.pop(key)
+
+  def stats(self) -> dict[str, int]:
+    """Return hit, stale hit, miss, coalescing and eviction counters."""
+    return {
+      "hits": self._counters["hits"],
+      "stale_hits": self._counters["stale_hits"],
+      "misses": self._counters["misses"],
+      "coalesced": self._counters["coalesced"],
+      "refresh_errors": self._counters["refresh_errors"],
+      "evictions": self._counters["evictions"],
+      "size": len(self._entries),
+    }
+
+  def _start_fetch(self, key: Any, fetch: Callable[[], Awaitable[Any]]) -> None:
+    """Run `fetch()` as the single in-flight task for `key`."""
+
+    async def run() -> Any:
+      try:
+        value = await fetch()
+      except Exception:
+        self._counters["refresh_errors"] += 1
+        raise
+      finally:
+        del self._inflight[key]
+      if self._lifetime is not None:
+        fresh_for = self._lifetime(value)
+        if fresh_for is None:
+          # The value itself forbids caching: drop any older copy too.
+          self._entries.pop(key)
+          return value
+      elif value is None or self.fresh_seconds <= 0:
+        return value
+      else:
+        fresh_for = None
+      self._entries.put(key, (self._clock(), fresh_for, value))
+      return value
+
+    task = asyncio.ensure_future(run())
+    task.add_done_callback(self._log_background_error)
+    self._inflight[key] = task
+
+  @staticmethod
+  def _log_background_error(task: asyncio.Task) -> None:
+    """Retrieve task errors so failed fetches are logged, not leaked."""
+    if not task.cancelled() and task.exception() is not None:
+      logger.warning("Cache fetch failed: %s", task.exception())
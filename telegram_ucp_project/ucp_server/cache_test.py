@@ -0,0 +1,288 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Unit tests for the reference data and response caches."""
+
+import asyncio
+
+from absl.testing import absltest
+import cache
+
+
+class FakeClock:
+  """Manually advanced time source."""
+
+  def __init__(self) -> None:
+    """Initialize FakeClock at t=0."""
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    """Return the current fake time."""
+    return self.now
+
+
+class ReferenceCacheTest(absltest.TestCase):
+  """Tests for ReferenceCache."""
+
+  def setUp(self) -> None:
+    """Create a small cache driven by a fake clock."""
+    super().setUp()
+    self.clock = FakeClock()
+    self.cache = cache.ReferenceCache(
+      max_entries=2, ttl_seconds=10, clock=self.clock
+    )
+
+  def test_hit_and_miss_counters(self) -> None:
+    """Tests that lookups are counted per namespace."""
+    self.assertIsNone(self.cache.get("products", "rose"))
+    self.cache.put("products", "rose", "Red Rose")
+    self.assertEqual(self.cache.get("products", "rose"), "Red Rose")
+
+    stats = self.cache.stats()["products"]
+    self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+  def test_entries_expire_after_ttl(self) -> None:
+    """Tests that an entry older than the TTL is a miss."""
+    self.cache.put("products", "rose", "Red Rose")
+    self.clock.now = 9.9
+    self.assertEqual(self.cache.get("products", "rose"), "Red Rose")
+    self.clock.now = 10.0
+    self.assertIsNone(self.cache.get("products", "rose"))
+    self.assertEqual(self.cache.stats()["products"]["size"], 0)
+
+  def test_least_recently_used_entry_is_evicted(self) -> None:
+    """Tests that the bound evicts the least recently read entry."""
+    self.cache.put("products", "rose", 1)
+    self.cache.put("products", "tulip", 2)
+    self.cache.get("products", "rose")
+    self.cache.put("discounts", "10OFF", 3)
+
+    self.assertEqual(self.cache.get("products", "rose"), 1)
+    self.assertIsNone(self.cache.get("products", "tulip"))
+    self.assertEqual(self.cache.stats()["products"]["evictions"], 1)
+
+  def test_invalidate_is_scoped_to_namespace(self) -> None:
+    """Tests that invalidating one namespace leaves the others cached."""
+    self.cache.put("products", "rose", 1)
+    self.cache.put("discounts", "10OFF", 2)
+    self.cache.invalidate("products")
+
+    self.assertIsNone(self.cache.get("products", "rose"))
+    self.assertEqual(self.cache.get("discounts", "10OFF"), 2)
+    self.assertEqual(self.cache.stats()["products"]["version"], 1)
+
+  def test_invalidate_all(self) -> None:
+    """Tests that invalidate() without arguments drops every namespace."""
+    self.cache.put("products", "rose", 1)
+    self.cache.put("discounts", "10OFF", 2)
+    self.cache.invalidate()
+
+    self.assertIsNone(self.cache.get("products", "rose"))
+    self.assertIsNone(self.cache.get("discounts", "10OFF"))
+
+  def test_put_read_before_invalidate_is_not_stored(self) -> None:
+    """Tests that a row read before an invalidation is not cached as new."""
+    version = self.cache.version("products")
+    self.cache.invalidate("products")
+    self.cache.put("products", "rose", "Old Rose", version=version)
+
+    self.assertIsNone(self.cache.get("products", "rose"))
+    self.assertEqual(self.cache.stats()["products"]["stale_puts"], 1)
+
+    self.cache.put(
+      "products", "rose", "New Rose", version=self.cache.version("products")
+    )
+    self.assertEqual(self.cache.get("products", "rose"), "New Rose")
+
+  def test_version_watcher_invalidates_changed_namespaces(self) -> None:
+    """Tests that only namespaces whose shared version moved are dropped."""
+    shared = {"products": 1, "discounts": 1}
+
+    async def load_versions() -> dict[str, int]:
+      return dict(shared)
+
+    async def scenario() -> None:
+      self.cache.start_version_watcher(load_versions, interval=0.01)
+      await asyncio.sleep(0.02)
+      self.cache.put("products", "rose", 1)
+      self.cache.put("discounts", "10OFF", 2)
+      shared["products"] = 2  # Another process changed the catalog.
+      await asyncio.sleep(0.03)
+      await self.cache.stop_version_watcher()
+
+    asyncio.run(scenario())
+    self.assertIsNone(self.cache.get("products", "rose"))
+    self.assertEqual(self.cache.get("discounts", "10OFF"), 2)
+
+  def test_zero_ttl_disables_caching(self) -> None:
+    """Tests that a non-positive TTL turns put() into a no-op."""
+    self.cache.configure(ttl_seconds=0)
+    self.cache.put("products", "rose", 1)
+    self.assertIsNone(self.cache.get("products", "rose"))
+
+
+class Upstream:
+  """Counting fetcher whose responses can be held back."""
+
+  def __init__(self) -> None:
+    """Initialize Upstream with no calls made."""
+    self.calls = 0
+    self.release: asyncio.Event | None = None
+    self.value = "v1"
+
+  async def fetch(self) -> str | None:
+    """Return the current value, waiting for `release` if set."""
+    self.calls += 1
+    if self.release is not None:
+      await self.release.wait()
+    return self.value
+
+
+class StaleWhileRevalidateCacheTest(absltest.TestCase):
+  """Tests for StaleWhileRevalidateCache."""
+
+  def setUp(self) -> None:
+    """Create a small cache driven by a fake clock."""
+    super().setUp()
+    self.clock = FakeClock()
+    self.cache = cache.StaleWhileRevalidateCache(
+      max_entries=2, fresh_seconds=10, stale_seconds=50, clock=self.clock
+    )
+    self.upstream = Upstream()
+
+  def test_fresh_entries_are_served_from_memory(self) -> None:
+    """Tests that a fresh entry does not call upstream again."""
+
+    async def run() -> list[str]:
+      return [
+        await self.cache.get_or_fetch("honey", self.upstream.fetch)
+        for _ in range(3)
+      ]
+
+    self.assertEqual(asyncio.run(run()), ["v1"] * 3)
+    self.assertEqual(self.upstream.calls, 1)
+    self.assertEqual(self.cache.stats()["hits"], 2)
+
+  def test_stale_entry_is_served_while_refreshing(self) -> None:
+    """Tests that a stale hit returns at once and refreshes once."""
+
+    async def run() -> tuple[str, str, str]:
+      await self.cache.get_or_fetch("honey", self.upstream.fetch)
+      self.clock.now = 20
+      self.upstream.value = "v2"
+      self.upstream.release = asyncio.Event()
+      first = await self.cache.get_or_fetch("honey", self.upstream.fetch)
+      second = await self.cache.get_or_fetch("honey", self.upstream.fetch)
+      self.upstream.release.set()
+      await asyncio.sleep(0)
+      await asyncio.sleep(0)
+      return first, second, await self.cache.get_or_fetch("honey", None)
+
+    self.assertEqual(asyncio.run(run()), ("v1", "v1", "v2"))
+    self.assertEqual(self.upstream.calls, 2)
+    self.assertEqual(self.cache.stats()["stale_hits"], 2)
+
+  def test_expired_entry_is_refetched(self) -> None:
+    """Tests that an entry past its stale window is a blocking miss."""
+
+    async def run() -> str:
+      await self.cache.get_or_fetch("honey", self.upstream.fetch)
+      self.clock.now = 60
+      self.upstream.value = "v2"
+      return await self.cache.get_or_fetch("honey", self.upstream.fetch)
+
+    self.assertEqual(asyncio.run(run()), "v2")
+    self.assertEqual(self.cache.stats()["misses"], 2)
+
+  def test_concurrent_misses_are_coalesced(self) -> None:
+    """Tests that N identical concurrent misses make one upstream call."""
+
+    async def run() -> list[str]:
+      self.upstream.release = asyncio.Event()
+      waiters = [
+        asyncio.ensure_future(
+          self.cache.get_or_fetch("ghee", self.upstream.fetch)
+        )
+        for _ in range(10)
+      ]
+      await asyncio.sleep(0)
+      self.upstream.release.set()
+      return await asyncio.gather(*waiters)
+
+    self.assertEqual(asyncio.run(run()), ["v1"] * 10)
+    self.assertEqual(self.upstream.calls, 1)
+    self.assertEqual(self.cache.stats()["coalesced"], 9)
+
+  def test_none_is_not_cached(self) -> None:
+    """Tests that a None response is retried on the next call."""
+    self.upstream.value = None
+
+    async def run() -> None:
+      await self.cache.get_or_fetch("honey", self.upstream.fetch)
+      await self.cache.get_or_fetch("honey", self.upstream.fetch)
+
+    asyncio.run(run())
+    self.assertEqual(self.upstream.calls, 2)
+
+  def test_fetch_errors_reach_every_waiter(self) -> None:
+    """Tests that a failing fetch raises and leaves nothing cached."""
+
+    async def fail() -> str:
+      raise ValueError("upstream down")
+
+    async def run() -> None:
+      with self.assertRaises(ValueError):
+        await self.cache.get_or_fetch("honey", fail)
+      self.assertEqual(
+        await self.cache.get_or_fetch("honey", self.upstream.fetch), "v1"
+      )
+
+    asyncio.run(run())
+    self.assertEqual(self.cache.stats()["refresh_errors"], 1)
+
+  def test_least_recently_used_entry_is_evicted(self) -> None:
+    """Tests that the bound evicts the least recently read entry."""
+
+    async def run() -> None:
+      for key in ["honey", "ghee", "honey", "jam"]:
+        await self.cache.get_or_fetch(key, self.upstream.fetch)
+      await self.cache.get_or_fetch("ghee", self.upstream.fetch)
+
+    asyncio.run(run())
+    self.assertEqual(self.upstream.calls, 4)
+    self.assertEqual(self.cache.stats()["evictions"], 2)
+
+  def test_lifetime_is_taken_from_the_value(self) -> None:
+    """Tests per-value freshness, and that None lifetimes are not cached."""
+    lifetimes = {"v1": 30, "v2": None}
+    self.cache = cache.StaleWhileRevalidateCache(
+      stale_seconds=0, lifetime=lifetimes.get, clock=self.clock
+    )
+
+    async def run() -> list[str]:
+      values = [await self.cache.get_or_fetch("honey", self.upstream.fetch)]
+      self.clock.now = 29
+      values.append(await self.cache.get_or_fetch("honey", self.upstream.fetch))
+      self.clock.now = 31
+      self.upstream.value = "v2"
+      values.append(await self.cache.get_or_fetch("honey", self.upstream.fetch))
+      return values
+
+    self.assertEqual(asyncio.run(run()), ["v1", "v1", "v2"])
+    self.assertEqual(self.upstream.calls, 2)
+    self.assertIsNone(self.cache.peek("honey"))
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,224 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Canonical hashing of request bodies for Idempotency-Key checks.
+
+A request hash is the digest of the request's canonical JSON: keys sorted,
+no whitespace, UTF-8, floats as orjson writes them (`1e16`, `0.00001`, NaN
+and infinities as `null`). With orjson installed (`OPT_SORT_KEYS`) these
+bytes come straight out of the encoder, with no intermediate `str` to build
+and encode; otherwise the json module produces them, and the rare output
+with a float `json` formats differently is re-encoded to match. Servers
+with and without orjson therefore agree on every hash. New hashes carry
+their algorithm as a prefix, e.g. `sha256:9f86...` or `blake2b:1d3c...`.
+
+Hashes stored by earlier versions have no prefix: they are the SHA-256 of
+`json.dumps(data, sort_keys=True)`. `RequestHasher.matches()` recognizes
+them and recomputes that form, so a retry of a request recorded before the
+upgrade still replays instead of conflicting. The `legacy` algorithm keeps
+writing that form, for deployments still running older servers.
+"""
+
+import collections
+from collections.abc import Callable
+import hashlib
+import json
+import math
+import re
+from typing import Any
+
+from pydantic import BaseModel
+
+try:
+  import orjson
+except ImportError:  # Optional; speeds up canonical_json().
+  orjson = None
+
+ALGORITHMS = ("sha256", "blake2b", "legacy")
+
+_HASHES: dict[str, Callable[[], Any]] = {
+  "sha256": hashlib.sha256,
+  "blake2b": lambda: hashlib.blake2b(digest_size=32),
+}
+
+# A float that json writes with an exponent (`1e+16`, `1e-05`); orjson does
+# not. May also match inside a string, which only costs a slower encode.
+_EXPONENT = re.compile(r"\de[+-]")
+
+
+def _jsonable(data: Any) -> Any:
+  """Convert a Pydantic model to JSON-compatible Python values."""
+  if isinstance(data, BaseModel):
+    # model_dump_json() cannot sort keys, so dump to dicts and sort below.
+    return data.model_dump(mode="json")
+  return data
+
+
+def _float_json(value: float) -> str:
+  """Format a float the way orjson does."""
+  if not math.isfinite(value):
+    return "null"
+  text = float.__repr__(value)
+  mantissa, _, exponent = text.partition("e")
+  if not exponent:
+    return text
+  if int(exponent) == -5:
+    # orjson writes exponents down to -5 in full, repr() from -4 only.
+    sign = "-" if mantissa.startswith("-") else ""
+    return f"{sign}0.0000{mantissa.lstrip('-').replace('.', '')}"
+  return f"{mantissa}e{int(exponent)}"
+
+
+def _key_json(key: Any) -> str:
+  """Convert a dict key to a string, as `json.dumps` does."""
+  if isinstance(key, str):
+    return key
+  if key is None or isinstance(key, bool):
+    return json.dumps(key)
+  if isinstance(key, int):
+    return int.__repr__(key)
+  if isinstance(key, float):
+    return _float_json(key)
+  raise TypeError(f"keys must be str, int, float, bool or None, not {key!r}")
+
+
+def _encode(value: Any, parts: list[str]) -> None:
+  """Append the canonical JSON of `value` to `parts`."""
+  if isinstance(value, str):
+    parts.append(json.dumps(value, ensure_ascii=False))
+  elif value is None or isinstance(value, bool):
+    parts.append(json.dumps(value))
+  elif isinstance(value, int):
+    parts.append(int.__repr__(value))
+  elif isinstance(value, float):
+    parts.append(_float_json(value))
+  elif isinstance(value, dict):
+    parts.append("{")
+    items = sorted((_key_json(k), v) for k, v in value.items())
+    for i, (key, item) in enumerate(items):
+      parts.append("," if i else "")
+      parts.append(json.dumps(key, ensure_ascii=False))
+      parts.append(":")
+      _encode(item, parts)
+    parts.append("}")
+  elif isinstance(value, (list, tuple)):
+    parts.append("[")
+    for i, item in enumerate(value):
+      parts.append("," if i else "")
+      _encode(item, parts)
+    parts.append("]")
+  else:
+    raise TypeError(
+      f"Object of type {type(value).__name__} is not JSON serializable"
+    )
+
+
+def _json_module_canonical(data: Any) -> bytes:
+  """Canonical JSON from the json module, floats formatted like orjson."""
+  try:
+    text = json.dumps(
+      data,
+      sort_keys=True,
+      separators=(",", ":"),
+      ensure_ascii=False,
+      allow_nan=False,
+    )
+  except ValueError:  # NaN or an infinity.
+    text = None
+  if text is None or _EXPONENT.search(text):
+    parts = []
+    _encode(data, parts)
+    text = "".join(parts)
+  return text.encode("utf-8")
+
+
+def canonical_json(data: Any) -> bytes:
+  """Serialize `data` (a Pydantic model or JSON values) canonically."""
+  data = _jsonable(data)
+  if orjson is not None:
+    try:
+      return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    except orjson.JSONEncodeError:
+      pass  # E.g. integers beyond 64 bits, which json handles.
+  return _json_module_canonical(data)
+
+
+def legacy_digest(data: Any) -> str:
+  """Return the unprefixed SHA-256 hash written by earlier versions."""
+  json_str = json.dumps(_jsonable(data), sort_keys=True)
+  return hashlib.sha256(json_str.encode("utf-8")).hexdigest()
+
+
+class RequestHasher:
+  """Computes and verifies request hashes with a configurable algorithm."""
+
+  def __init__(self, algorithm: str = "sha256") -> None:
+    """Initialize RequestHasher.
+
+    Args:
+      algorithm: One of `ALGORITHMS`, used for new hashes.
+
+    """
+    self.algorithm = "sha256"
+    self._counters: collections.Counter = collections.Counter()
+    self.configure(algorithm)
+
+  def configure(self, algorithm: str | None = None) -> None:
+    """Change the algorithm used for new hashes."""
+    if algorithm is None:
+      return
+    if algorithm not in ALGORITHMS:
+      raise ValueError(f"Unknown request hash algorithm: {algorithm}")
+    self.algorithm = algorithm
+
+  def digest(self, data: Any) -> str:
+    """Return the hash of `data` under the configured algorithm."""
+    self._counters["digests"] += 1
+    return self._digest(self.algorithm, data)
+
+  def matches(self, stored_hash: str, data: Any) -> bool:
+    """Tell whether `stored_hash`, in any known format, is the hash of `data`.
+
+    Callers should compare against `digest(data)` first: this recomputes the
+    hash in the stored format, which only differs from the configured one
+    for records written before an upgrade or an algorithm change.
+    """
+    algorithm, sep, _ = stored_hash.partition(":")
+    if not sep:
+      algorithm = "legacy"
+    elif algorithm not in _HASHES:
+      return False
+    self._counters[f"{algorithm}_rechecks"] += 1
+    return self._digest(algorithm, data) == stored_hash
+
+  def stats(self) -> dict[str, int]:
+    """Return digest and recheck counters."""
+    return {
+      "digests": self._counters["digests"],
+      "legacy_rechecks": self._counters["legacy_rechecks"],
+      "sha256_rechecks": self._counters["sha256_rechecks"],
+      "blake2b_rechecks": self._counters["blake2b_rechecks"],
+    }
+
+  @staticmethod
+  def _digest(algorithm: str, data: Any) -> str:
+    if algorithm == "legacy":
+      return legacy_digest(data)
+    h = _HASHES[algorithm]()
+    h.update(canonical_json(data))
+    return f"{algorithm}:{h.hexdigest()}"
+
+
+# The algorithm checkout_service hashes with; set from a flag at startup.
+hasher = RequestHasher()
@@ -0,0 +1,115 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for canonical request hashing."""
+
+import hashlib
+import json
+from unittest import mock
+
+from absl.testing import absltest
+import canonical_hash
+from models import UnifiedCheckoutCreateRequest
+
+_PAYLOAD = {
+  "currency": "USD",
+  "line_items": [
+    {"item": {"id": "rose", "title": "Rosé ✿", "price": 1000}, "quantity": 2}
+  ],
+  "payment": {"handlers": [], "instruments": []},
+}
+
+
+class CanonicalHashTest(absltest.TestCase):
+  """Tests for canonical_json and RequestHasher."""
+
+  def test_canonical_json_is_sorted_compact_utf8(self) -> None:
+    """Tests the canonical form, with and without orjson."""
+    data = {"b": [1, None, True], "a": {"d": "é", "c": 1.5}}
+    expected = '{"a":{"c":1.5,"d":"é"},"b":[1,null,true]}'.encode()
+    self.assertEqual(canonical_hash.canonical_json(data), expected)
+    with mock.patch.object(canonical_hash, "orjson", None):
+      self.assertEqual(canonical_hash.canonical_json(data), expected)
+
+  def test_floats_hash_alike_with_and_without_orjson(self) -> None:
+    """Tests that both encoders agree on exponents, NaN and infinities."""
+    data = {
+      "big": 1e16,
+      "small": [1e-5, -2.5e-5, 1e-7, 1e-4, 5e-324],
+      "odd": [float("nan"), float("inf"), -0.0],
+      "huge_int": 2**70,
+      "text": "1e+16",
+    }
+    expected = (
+      b'{"big":1e16,"huge_int":1180591620717411303424,'
+      b'"odd":[null,null,-0.0],'
+      b'"small":[0.00001,-0.000025,1e-7,0.0001,5e-324],"text":"1e+16"}'
+    )
+    hasher = canonical_hash.RequestHasher()
+    digest = hasher.digest(data)
+    self.assertEqual(canonical_hash.canonical_json(data), expected)
+    with mock.patch.object(canonical_hash, "orjson", None):
+      self.assertEqual(canonical_hash.canonical_json(data), expected)
+      self.assertEqual(hasher.digest(data), digest)
+    del data["huge_int"]  # Beyond 64 bits, orjson defers to json anyway.
+    if canonical_hash.orjson is not None:
+      self.assertEqual(
+        canonical_hash.canonical_json(data),
+        canonical_hash.orjson.dumps(
+          data, option=canonical_hash.orjson.OPT_SORT_KEYS
+        ),
+      )
+
+  def test_model_and_dict_hash_alike(self) -> None:
+    """Tests that a request model hashes like its JSON dump."""
+    request = UnifiedCheckoutCreateRequest.model_validate(_PAYLOAD)
+    hasher = canonical_hash.RequestHasher()
+    self.assertEqual(
+      hasher.digest(request), hasher.digest(request.model_dump(mode="json"))
+    )
+
+  def test_algorithms(self) -> None:
+    """Tests the prefix and digest of each algorithm."""
+    body = canonical_hash.canonical_json(_PAYLOAD)
+    sha256 = canonical_hash.RequestHasher("sha256").digest(_PAYLOAD)
+    blake2b = canonical_hash.RequestHasher("blake2b").digest(_PAYLOAD)
+    self.assertEqual(sha256, "sha256:" + hashlib.sha256(body).hexdigest())
+    self.assertEqual(
+      blake2b,
+      "blake2b:" + hashlib.blake2b(body, digest_size=32).hexdigest(),
+    )
+    with self.assertRaises(ValueError):
+      canonical_hash.RequestHasher("md5")
+
+  def test_hashes_stored_by_earlier_versions_still_match(self) -> None:
+    """Tests that unprefixed SHA-256 hashes of json.dumps() are verified."""
+    request = UnifiedCheckoutCreateRequest.model_validate(_PAYLOAD)
+    stored = hashlib.sha256(
+      json.dumps(request.model_dump(mode="json"), sort_keys=True).encode()
+    ).hexdigest()
+    hasher = canonical_hash.RequestHasher("blake2b")
+
+    self.assertEqual(canonical_hash.legacy_digest(request), stored)
+    self.assertTrue(hasher.matches(stored, request))
+    self.assertTrue(hasher.matches(hasher.digest(request), request))
+    self.assertTrue(
+      hasher.matches(canonical_hash.RequestHasher().digest({}), {})
+    )
+    self.assertFalse(hasher.matches(stored, {}))
+    self.assertFalse(hasher.matches("md5:abc", request))
+    self.assertEqual(hasher.stats()["legacy_rechecks"], 2)
+
+
+if __name__ == "__main__":
+  absltest.main()
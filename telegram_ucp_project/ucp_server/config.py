@@ -16,14 +16,25 @@
 
 import contextlib
 import json
+import logging
+import os
 from pathlib import Path
+from typing import Any
 import uuid
 from absl import flags
+import agent_profiles
+import canonical_hash
 import db
 from fastapi import FastAPI
+import idempotency
+import request_log
+import shopify_client
+import supabase_adapter
 import sys
+import webhook_outbox
 
 FLAGS = flags.FLAGS
+logger = logging.getLogger(__name__)
 
 _SERVER_VERSION_CACHE = None
 
@@ -54,37 +65,242 @@ try:
     "Secret key for simulation endpoints",
   )
   flags.DEFINE_integer("port", 8182, "Port to run the server on")
+  flags.DEFINE_integer(
+    "reference_cache_max_entries",
+    4096,
+    "Max cached products/promotions/shipping rates/discounts",
+  )
+  flags.DEFINE_float(
+    "reference_cache_ttl_seconds",
+    300.0,
+    "TTL of cached reference data (0 disables the cache)",
+  )
+  flags.DEFINE_float(
+    "reference_cache_poll_seconds",
+    1.0,
+    "Seconds between checks for reference data changed by other processes",
+  )
+  flags.DEFINE_float(
+    "supabase_timeout_seconds", 5.0, "Deadline for each Supabase call"
+  )
+  flags.DEFINE_integer(
+    "supabase_max_concurrency", 10, "Max in-flight Supabase calls"
+  )
+  flags.DEFINE_integer(
+    "shopify_cache_max_entries", 1024, "Max cached Shopify responses"
+  )
+  flags.DEFINE_float(
+    "shopify_cache_fresh_seconds",
+    60.0,
+    "Age until a cached Shopify response is refreshed (0 disables caching)",
+  )
+  flags.DEFINE_float(
+    "shopify_cache_stale_seconds",
+    600.0,
+    "How long a stale Shopify response may be served while refreshing",
+  )
+  flags.DEFINE_integer(
+    "idempotency_cache_max_entries",
+    1024,
+    "Max idempotent responses cached in memory",
+  )
+  flags.DEFINE_float(
+    "idempotency_ttl_seconds",
+    86400.0,
+    "Lifetime of idempotency records (0 keeps them forever)",
+  )
+  flags.DEFINE_float(
+    "idempotency_sweep_interval_seconds",
+    300.0,
+    "Seconds between deletions of expired idempotency records",
+  )
+  flags.DEFINE_enum(
+    "idempotency_hash_algorithm",
+    "sha256",
+    ["sha256", "blake2b", "legacy"],
+    "Hash of request bodies stored with idempotency keys",
+  )
+  flags.DEFINE_integer(
+    "profile_cache_max_entries", 1024, "Max cached agent profiles"
+  )
+  flags.DEFINE_float(
+    "profile_cache_ttl_seconds",
+    300.0,
+    "Lifetime of an agent profile sent without Cache-Control max-age",
+  )
+  flags.DEFINE_float(
+    "profile_negative_ttl_seconds",
+    30.0,
+    "How long a failed agent profile lookup is remembered",
+  )
+  flags.DEFINE_string(
+    "request_log_db_path",
+    "",
+    "Separate SQLite DB for request logs (default: transactions DB)",
+  )
+  flags.DEFINE_string(
+    "request_log_ndjson_path",
+    "",
+    "Write request logs to this NDJSON file instead of a database",
+  )
+  flags.DEFINE_integer(
+    "request_log_buffer_size", 10000, "Max request logs awaiting a write"
+  )
+  flags.DEFINE_float(
+    "request_log_sample_rate",
+    1.0,
+    "Fraction of requests whose payload is logged",
+  )
+  flags.DEFINE_integer(
+    "request_log_max_payload_chars",
+    4096,
+    "Logged payloads longer than this are truncated (0: no limit)",
+  )
+  flags.DEFINE_float(
+    "request_log_retention_days",
+    0.0,
+    "Delete logged requests older than this (0 keeps them)",
+  )
+  flags.DEFINE_integer(
+    "webhook_workers", 4, "Concurrent webhook deliveries (URL groups)"
+  )
+  flags.DEFINE_integer(
+    "webhook_max_per_endpoint", 2, "Max in-flight deliveries per webhook URL"
+  )
+  flags.DEFINE_integer(
+    "webhook_max_attempts", 8, "Delivery attempts before a webhook fails"
+  )
+  flags.DEFINE_float(
+    "webhook_timeout_seconds", 5.0, "Deadline of one webhook delivery"
+  )
 except flags.DuplicateFlagError:
   pass
 
 
+def _flag(name: str, default: Any) -> Any:
+  """Return a flag value, or `default` if flags are unparsed or unset."""
+  try:
+    value = getattr(FLAGS, name)
+  except flags.UnparsedFlagAccessError:
+    return default
+  return default if value is None else value
+
+
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
   """Shared lifespan manager for initializing databases."""
   del app  # Unused.
   
-  # Handle UnparsedFlagAccessError by manually parsing if needed or using defaults
-  try:
-      # If running via absl.app.run, this works. 
-      # If via uvicorn, it might raise UnparsedFlagAccessError.
-      p_path = FLAGS.products_db_path
-      t_path = FLAGS.transactions_db_path
-  except Exception:
-      # If flags aren't parsed, just use the defaults we know we want
-      # Or try to parse with empty args to satisfy absl
-      try:
-          print("Parsing flags manually for uvicorn...")
-          FLAGS(sys.argv[:1]) # Check if this works
-          p_path = FLAGS.products_db_path
-          t_path = FLAGS.transactions_db_path
-      except:
-          # Fallback to hardcoded defaults
-          p_path = "products.db"
-          t_path = "transactions.db"
-
-  if p_path is None: p_path = "products.db"
-  if t_path is None: t_path = "transactions.db"
+  # Under uvicorn absl.app.run never parses flags; parse the defaults so
+  # that flags read directly see them. _flag() covers a failed parse.
+  if not FLAGS.is_parsed():
+    try:
+      logger.info("Parsing flags manually for uvicorn...")
+      FLAGS(sys.argv[:1])
+    except flags.Error as e:
+      logger.warning("Could not parse flags, using defaults: %s", e)
+
+  p_path = _flag("products_db_path", "products.db")
+  t_path = _flag("transactions_db_path", "transactions.db")
 
   await db.manager.init_dbs(p_path, t_path)
+  db.reference_cache.clear()
+  db.reference_cache.configure(
+    max_entries=_flag("reference_cache_max_entries", None),
+    ttl_seconds=_flag("reference_cache_ttl_seconds", None),
+  )
+  db.reference_cache.start_version_watcher(
+    lambda: db.load_reference_versions(db.manager.products_session_factory),
+    _flag("reference_cache_poll_seconds", 1.0),
+  )
+
+  # Supabase mirrors the catalog only when explicitly configured.
+  supabase_url = os.environ.get("SUPABASE_URL")
+  if supabase_url:
+    db.supabase = supabase_adapter.SupabaseAdapter(
+      supabase_url,
+      os.environ.get("SUPABASE_KEY", ""),
+      timeout=_flag("supabase_timeout_seconds", 5.0),
+      max_concurrency=_flag("supabase_max_concurrency", 10),
+    )
+
+  # One pooled Shopify client for the lifetime of the server.
+  shopify_client.open_client()
+  # Imported here: routes.products depends on this module via dependencies.
+  from routes.products import shopify_cache
+
+  shopify_cache.invalidate()
+  shopify_cache.configure(
+    max_entries=_flag("shopify_cache_max_entries", None),
+    fresh_seconds=_flag("shopify_cache_fresh_seconds", None),
+    stale_seconds=_flag("shopify_cache_stale_seconds", None),
+  )
+
+  canonical_hash.hasher.configure(
+    _flag("idempotency_hash_algorithm", None)
+  )
+  idempotency.store.clear()
+  idempotency.store.configure(
+    max_entries=_flag("idempotency_cache_max_entries", None),
+    ttl_seconds=_flag("idempotency_ttl_seconds", None),
+  )
+  idempotency.store.sweep_interval = _flag(
+    "idempotency_sweep_interval_seconds", 300.0
+  )
+  idempotency.store.start_sweeper(db.manager.transactions_session_factory)
+
+  agent_profiles.resolver.invalidate()
+  agent_profiles.resolver.configure(
+    max_entries=_flag("profile_cache_max_entries", None),
+    default_ttl_seconds=_flag("profile_cache_ttl_seconds", None),
+    negative_ttl_seconds=_flag("profile_negative_ttl_seconds", None),
+  )
+
+  # Request logs are written behind, away from the checkout transaction.
+  request_log.sink.configure(
+    capacity=_flag("request_log_buffer_size", None),
+    sample_rate=_flag("request_log_sample_rate", None),
+    max_payload_chars=_flag("request_log_max_payload_chars", None),
+  )
+  retention_seconds = _flag("request_log_retention_days", 0.0) * 86400
+  ndjson_path = _flag("request_log_ndjson_path", "")
+  log_db_path = _flag("request_log_db_path", "")
+  if ndjson_path:
+    log_writer = request_log.NdjsonLogWriter(ndjson_path)
+  elif log_db_path:
+    log_writer = await request_log.open_log_database(
+      log_db_path, retention_seconds=retention_seconds
+    )
+  else:
+    log_writer = request_log.SqlLogWriter(
+      db.manager.transactions_session_factory,
+      retention_seconds=retention_seconds,
+    )
+  request_log.sink.start(log_writer)
+
+  # Delivers webhook events committed to the transactions DB outbox.
+  webhook_outbox.start_dispatcher(
+    db.manager.transactions_session_factory,
+    workers=_flag("webhook_workers", 4),
+    max_per_endpoint=_flag("webhook_max_per_endpoint", 2),
+    max_attempts=_flag("webhook_max_attempts", 8),
+    timeout=_flag("webhook_timeout_seconds", 5.0),
+  )
+
   yield
+  await db.reference_cache.stop_version_watcher()
+  await webhook_outbox.stop_dispatcher()
+  await request_log.sink.aclose()
+  await idempotency.store.stop_sweeper()
+  logger.info("Idempotency stats: %s", idempotency.store.stats())
+  logger.info("Request hash stats: %s", canonical_hash.hasher.stats())
+  logger.info("Request log stats: %s", request_log.sink.stats())
+  logger.info("Reference cache stats: %s", db.reference_cache.stats())
+  logger.info("Shopify cache stats: %s", shopify_cache.stats())
+  logger.info("Agent profile stats: %s", agent_profiles.resolver.stats())
+  await agent_profiles.resolver.aclose()
+  await shopify_client.close_client()
+  if db.supabase is not None:
+    await db.supabase.aclose()
+    db.supabase = None
   await db.manager.close()
@@ -30,6 +30,12 @@ concurrent
   orders, request logging, and idempotency tracking.
 - Data Access Helpers: A suite of asynchronous functions for CRUD operations on
   the database models.
+- Webhook Outbox: Webhook events are written to `webhook_outbox` in the same
+  transaction as the order they describe and delivered later by
+  `webhook_outbox.WebhookDispatcher`.
+- Supabase Mirror: When `supabase` is set, catalog and inventory helpers go
+  through the non-blocking `supabase_adapter.SupabaseAdapter` first and fall
+  back to SQLite on errors.
 """
 
 import datetime
@@ -37,23 +43,38 @@ import logging
 from typing import Any
 import uuid
 
+import cache
+from sqlalchemy import case
 from sqlalchemy import Column
+from sqlalchemy import delete
+from sqlalchemy import Float
 from sqlalchemy import ForeignKey
+from sqlalchemy import func
 from sqlalchemy import Integer
 from sqlalchemy import JSON
 from sqlalchemy import select
 from sqlalchemy import String
 from sqlalchemy import text
 from sqlalchemy import update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import sessionmaker
+import supabase_adapter
+from supabase_adapter import eq
+from supabase_adapter import in_
 
 logger = logging.getLogger(__name__)
 
+# Optional async Supabase adapter mirroring the catalog and inventory, set by
+# the server lifespan when SUPABASE_URL is configured. When unset, every helper
+# below reads and writes the local SQLite databases only.
+supabase: supabase_adapter.SupabaseAdapter | None = None
+
 ProductBase = declarative_base()
 TransactionBase = declarative_base()
 
@@ -99,6 +120,19 @@ class DatabaseManager:
 
     async with self.transactions_engine.begin() as conn:
       await conn.run_sync(TransactionBase.metadata.create_all)
+      # create_all does not add indexes to tables created by older versions.
+      await conn.execute(
+        text(
+          "CREATE INDEX IF NOT EXISTS ix_request_logs_checkout_id"
+          " ON request_logs (checkout_id)"
+        )
+      )
+      await conn.execute(
+        text(
+          "CREATE INDEX IF NOT EXISTS ix_idempotency_records_created_at"
+          " ON idempotency_records (created_at)"
+        )
+      )
 
   async def close(self) -> None:
     """Close all database engines."""
@@ -111,6 +145,22 @@ class DatabaseManager:
 # Global manager instance (to be initialized via lifespan)
 manager = DatabaseManager()
 
+# Read-through cache for reference data (products, promotions, shipping rates
+# and discounts). Writers must call `bump_reference_versions()` for the tables
+# they changed; servers pick the new versions up via the cache's watcher.
+reference_cache = cache.ReferenceCache()
+
+PRODUCTS_CACHE = "products"
+PROMOTIONS_CACHE = "promotions"
+SHIPPING_RATES_CACHE = "shipping_rates"
+DISCOUNTS_CACHE = "discounts"
+REFERENCE_NAMESPACES = (
+  PRODUCTS_CACHE,
+  PROMOTIONS_CACHE,
+  SHIPPING_RATES_CACHE,
+  DISCOUNTS_CACHE,
+)
+
 
 class Product(ProductBase):
   """Product database model."""
@@ -135,6 +185,15 @@ class Promotion(ProductBase):
   description = Column(String)
 
 
+class ReferenceVersion(ProductBase):
+  """Change counter of one reference data namespace, shared by processes."""
+
+  __tablename__ = "reference_versions"
+
+  namespace = Column(String, primary_key=True)
+  version = Column(Integer, nullable=False, default=0)
+
+
 class Inventory(TransactionBase):
   """Inventory database model."""
 
@@ -201,7 +260,7 @@ class RequestLog(TransactionBase):
   timestamp = Column(String)
   method = Column(String)
   url = Column(String)
-  checkout_id = Column(String, nullable=True)
+  checkout_id = Column(String, nullable=True, index=True)
   payload = Column(JSON, nullable=True)
 
 
@@ -214,6 +273,29 @@ class IdempotencyRecord(TransactionBase):
   request_hash = Column(String)
   response_status = Column(Integer)
   response_body = Column(JSON)
+  created_at = Column(String, index=True)
+
+
+class WebhookEvent(TransactionBase):
+  """Webhook outbox database model.
+
+  A row is `pending` until delivered (`delivered`) or given up on (`failed`).
+  `next_attempt_at` (epoch seconds) schedules retries; a dispatcher claiming a
+  row pushes it forward by a lease and stamps `claim_token`, so a row whose
+  dispatcher died is picked up again once the lease runs out.
+  """
+
+  __tablename__ = "webhook_outbox"
+
+  id = Column(Integer, primary_key=True, autoincrement=True)
+  url = Column(String)
+  event_type = Column(String)
+  payload = Column(JSON)
+  status = Column(String, default="pending")
+  attempts = Column(Integer, default=0)
+  next_attempt_at = Column(Float, index=True)
+  claim_token = Column(String, nullable=True, index=True)
+  last_error = Column(String, nullable=True)
   created_at = Column(String)
 
 
@@ -256,6 +338,48 @@ class ShippingRate(TransactionBase):
 # --- Data Access Helpers ---
 
 
+def _detach(session: AsyncSession, objs: list[Any]) -> list[Any]:
+  """Detach loaded rows from `session` so they can be shared via the cache.
+
+  A detached instance keeps its loaded attributes and is no longer expired
+  by a later commit or rollback of the session that loaded it.
+  """
+  for obj in objs:
+    if obj in session:
+      session.expunge(obj)
+  return objs
+
+
+async def bump_reference_versions(
+  session: AsyncSession, *namespaces: str
+) -> None:
+  """Record a change to reference data so every server drops its cache.
+
+  `session` must be on the Products DB; the bump takes effect when it
+  commits, so write it in the same transaction as the change when possible.
+  """
+  for namespace in namespaces or REFERENCE_NAMESPACES:
+    await session.execute(
+      sqlite_insert(ReferenceVersion)
+      .values(namespace=namespace, version=1)
+      .on_conflict_do_update(
+        index_elements=[ReferenceVersion.namespace],
+        set_={"version": ReferenceVersion.version + 1},
+      )
+    )
+
+
+async def load_reference_versions(
+  session_factory: sessionmaker,
+) -> dict[str, int]:
+  """Return the shared version of every reference data namespace."""
+  async with session_factory() as session:
+    result = await session.execute(
+      select(ReferenceVersion.namespace, ReferenceVersion.version)
+    )
+    return dict(result.all())
+
+
 async def get_shipping_rates(
   session: AsyncSession, country_code: str
 ) -> list[ShippingRate]:
@@ -269,12 +393,21 @@ async def get_shipping_rates(
     A list of ShippingRate objects matching the country or 'default'.
 
   """
+  cached = reference_cache.get(SHIPPING_RATES_CACHE, country_code)
+  if cached is not None:
+    return list(cached)
+
+  version = reference_cache.version(SHIPPING_RATES_CACHE)
   result = await session.execute(
     select(ShippingRate).where(
       ShippingRate.country_code.in_([country_code, "default"])
     )
   )
-  return list(result.scalars().all())
+  rates = _detach(session, list(result.scalars().all()))
+  reference_cache.put(
+    SHIPPING_RATES_CACHE, country_code, tuple(rates), version=version
+  )
+  return rates
 
 
 async def get_discount(session: AsyncSession, code: str) -> Discount | None:
@@ -288,7 +421,8 @@ async def get_discount(session: AsyncSession, code: str) -> Discount | None:
     The Discount object if found, otherwise None.
 
   """
-  return await session.get(Discount, code)
+  discounts = await get_discounts_by_codes(session, [code])
+  return discounts[0] if discounts else None
 
 
 async def get_discounts_by_codes(
@@ -304,46 +438,139 @@ async def get_discounts_by_codes(
     A list of matching Discount objects.
 
   """
-  result = await session.execute(
-    select(Discount).where(Discount.code.in_(codes))
-  )
-  return list(result.scalars().all())
+  found: dict[str, Discount] = {}
+  missing = []
+  for code in dict.fromkeys(codes):
+    cached = reference_cache.get(DISCOUNTS_CACHE, code)
+    if cached is not None:
+      found[code] = cached
+    else:
+      missing.append(code)
+
+  if missing:
+    version = reference_cache.version(DISCOUNTS_CACHE)
+    result = await session.execute(
+      select(Discount).where(Discount.code.in_(missing))
+    )
+    for discount in _detach(session, list(result.scalars().all())):
+      reference_cache.put(
+        DISCOUNTS_CACHE, discount.code, discount, version=version
+      )
+      found[discount.code] = discount
+
+  return list(found.values())
 
 
 async def get_active_promotions(session: AsyncSession) -> list[Promotion]:
   """Retrieve all active promotions."""
-  result = await session.execute(select(Promotion))
-  return list(result.scalars().all())
+  cached = reference_cache.get(PROMOTIONS_CACHE, "active")
+  if cached is not None:
+    return list(cached)
 
+  version = reference_cache.version(PROMOTIONS_CACHE)
+  result = await session.execute(select(Promotion))
+  promotions = _detach(session, list(result.scalars().all()))
+  reference_cache.put(
+    PROMOTIONS_CACHE, "active", tuple(promotions), version=version
+  )
+  return promotions
 
 
+def _product_from_supabase(row: dict[str, Any]) -> Product:
+  """Map a Supabase `products` row onto the local Product model."""
+  return Product(
+    id=row["id"],
+    title=row["name"],
+    price=int(row["price"] * 100),
+    image_url=None,
+  )
 
 
+async def get_product(session: AsyncSession, product_id: str) -> Product | None:
   """Retrieve a product by ID from Supabase."""
+  cached = reference_cache.get(PRODUCTS_CACHE, product_id)
+  if cached is not None:
+    return cached
+
+  # Taken before reading: a change meanwhile must not be cached as current.
+  version = reference_cache.version(PRODUCTS_CACHE)
+  product = None
   try:
       if supabase:
-          resp = supabase.table("products").select("*").eq("id", product_id).execute()
-          if resp.data:
-              d = resp.data[0]
-              return Product(
-                  id=d["id"],
-                  title=d["name"],
-                  price=int(d["price"] * 100), 
-                  image_url=None
-              )
+          rows = await supabase.select("products", id=eq(product_id))
+          if rows:
+              product = _product_from_supabase(rows[0])
+  except Exception as e:
+      logger.error(f"Supabase error: {e}")
+
+  if product is None:
+    product = await session.get(Product, product_id)
+    if product is not None:
+      _detach(session, [product])
+  reference_cache.put(PRODUCTS_CACHE, product_id, product, version=version)
+  return product
+
+
+async def get_products(
+  session: AsyncSession, product_ids: list[str]
+) -> list[Product]:
+  """Retrieve multiple products by ID in a single round trip per source.
+
+  Supabase is queried first with one `in_` filter; any IDs it does not return
+  are resolved from the local Products DB with one `IN` query.
+
+  Args:
+    session: The database session to use.
+    product_ids: The product IDs to look up. Duplicates are ignored.
+
+  Returns:
+    A list of matching Product objects. Unknown IDs are omitted.
+
+  """
+  ids = list(dict.fromkeys(product_ids))
+  if not ids:
+    return []
+
+  cached: dict[str, Product] = {}
+  for product_id in ids:
+    product = reference_cache.get(PRODUCTS_CACHE, product_id)
+    if product is not None:
+      cached[product_id] = product
+  uncached = [product_id for product_id in ids if product_id not in cached]
+
+  version = reference_cache.version(PRODUCTS_CACHE)
+  found: dict[str, Product] = {}
+  try:
+      if supabase and uncached:
+          rows = await supabase.select("products", id=in_(uncached))
+          for row in rows or []:
+              found[row["id"]] = _product_from_supabase(row)
   except Exception as e:
       logger.error(f"Supabase error: {e}")
-  
-  return await session.get(Product, product_id)
+
+  missing = [product_id for product_id in uncached if product_id not in found]
+  if missing:
+    result = await session.execute(
+      select(Product).where(Product.id.in_(missing))
+    )
+    for product in _detach(session, list(result.scalars().all())):
+      found[product.id] = product
+
+  for product_id, product in found.items():
+    reference_cache.put(PRODUCTS_CACHE, product_id, product, version=version)
+  found.update(cached)
+  return [found[product_id] for product_id in ids if product_id in found]
 
 
 async def get_inventory(session: AsyncSession, product_id: str) -> int | None:
   """Retrieve the inventory quantity from Supabase."""
   try:
       if supabase:
-          resp = supabase.table("products").select("stock").eq("id", product_id).execute()
-          if resp.data:
-              return resp.data[0]["stock"]
+          rows = await supabase.select(
+              "products", columns="stock", id=eq(product_id)
+          )
+          if rows:
+              return rows[0]["stock"]
   except Exception as e:
       logger.error(f"Supabase error: {e}")
 
@@ -422,13 +649,12 @@ async def reserve_stock(
   """Atomically decrements inventory in Supabase."""
   try:
       if supabase:
-          current = await get_inventory(session, product_id)
-          if current is None or current < quantity:
-              return False
-          
-          new_qty = current - quantity
-          supabase.table("products").update({"stock": new_qty}).eq("id", product_id).execute()
-          return True
+          return bool(
+              await supabase.rpc(
+                  "reserve_stock_bulk",
+                  {"items": [{"product_id": product_id, "quantity": quantity}]},
+              )
+          )
   except Exception as e:
       logger.error(f"Supabase reserve stock error: {e}")
 
@@ -442,6 +668,69 @@ async def reserve_stock(
   return result.rowcount > 0
 
 
+async def reserve_stock_bulk(
+  session: AsyncSession, items: list[tuple[str, int]]
+) -> bool:
+  """Atomically decrement inventory for a whole cart.
+
+  Either every line is reserved or nothing is. On Supabase this is a single
+  call to the `reserve_stock_bulk` stored procedure (see
+  `sql/reserve_stock_bulk.sql`). Locally it is a single conditional UPDATE
+  that only applies if every product has enough stock, so concurrent
+  checkouts can neither oversell nor leave a cart partially reserved.
+
+  Args:
+    session: The transactions database session to use.
+    items: (product_id, quantity) pairs. Repeated product IDs are summed.
+
+  Returns:
+    True if the whole cart was reserved, otherwise False.
+
+  """
+  quantities: dict[str, int] = {}
+  for product_id, quantity in items:
+    quantities[product_id] = quantities.get(product_id, 0) + quantity
+  if not quantities:
+    return True
+
+  try:
+      if supabase:
+          reserved = await supabase.rpc(
+              "reserve_stock_bulk",
+              {
+                  "items": [
+                      {"product_id": pid, "quantity": qty}
+                      for pid, qty in quantities.items()
+                  ]
+              },
+          )
+          return bool(reserved)
+  except Exception as e:
+      logger.error(f"Supabase bulk reserve stock error: {e}")
+
+  product_ids = list(quantities)
+  requested = case(quantities, value=Inventory.product_id)
+  # The count is computed once, before any row changes, so the UPDATE either
+  # touches every requested row or none of them.
+  stocked = aliased(Inventory)
+  satisfied = (
+    select(func.count())
+    .select_from(stocked)
+    .where(stocked.product_id.in_(product_ids))
+    .where(stocked.quantity >= case(quantities, value=stocked.product_id))
+    .scalar_subquery()
+  )
+  stmt = (
+    update(Inventory)
+    .where(Inventory.product_id.in_(product_ids))
+    .where(satisfied == len(product_ids))
+    .values(quantity=Inventory.quantity - requested)
+    .execution_options(synchronize_session=False)
+  )
+  result = await session.execute(stmt)
+  return result.rowcount == len(product_ids)
+
+
 async def save_checkout(
   session: AsyncSession,
   checkout_id: str,
@@ -492,7 +781,7 @@ async def save_order(
                 "created_at": datetime.datetime.now().isoformat()
            }
            # Assuming table exists and matches schema 
-           supabase.table("orders").insert(db_order).execute()
+           await supabase.insert("orders", db_order)
       except Exception as e:
           logger.error(f"Supabase save order error: {e}")
 
@@ -514,7 +803,10 @@ async def log_request(
   checkout_id: str | None = None,
   payload: dict[str, Any] | None = None,
 ) -> None:
-  """Log an HTTP request to the database."""
+  """Log an HTTP request to the database, in the caller's transaction.
+
+  Request handlers use the write-behind `request_log.sink` instead.
+  """
   log_entry = RequestLog(
     timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
     method=method,
@@ -539,7 +831,7 @@ async def save_idempotency_record(
   response_status: int,
   response_body: dict[str, Any],
 ) -> None:
-  """Save a new idempotency record."""
+  """Save an idempotency record, replacing an expired one with the same key."""
   record = IdempotencyRecord(
     key=key,
     request_hash=request_hash,
@@ -547,4 +839,108 @@ async def save_idempotency_record(
     response_body=response_body,
     created_at=datetime.datetime.now(datetime.timezone.utc).isoformat(),
   )
-  session.add(record)
+  await session.merge(record)
+
+
+async def delete_expired_idempotency_records(
+  session: AsyncSession, cutoff: str, limit: int
+) -> int:
+  """Delete up to `limit` idempotency records created before `cutoff`.
+
+  Args:
+    session: The transactions database session to use.
+    cutoff: ISO-8601 UTC timestamp; older records are deleted.
+    limit: Maximum number of records to delete.
+
+  Returns:
+    The number of deleted records.
+
+  """
+  expired = (
+    select(IdempotencyRecord.key)
+    .where(IdempotencyRecord.created_at < cutoff)
+    .limit(limit)
+    .scalar_subquery()
+  )
+  result = await session.execute(
+    delete(IdempotencyRecord)
+    .where(IdempotencyRecord.key.in_(expired))
+    .execution_options(synchronize_session=False)
+  )
+  return result.rowcount
+
+
+async def enqueue_webhook_event(
+  session: AsyncSession,
+  url: str,
+  event_type: str,
+  payload: dict[str, Any],
+) -> None:
+  """Add a webhook event to the outbox, committed with the caller's changes."""
+  now = datetime.datetime.now(datetime.timezone.utc)
+  session.add(
+    WebhookEvent(
+      url=url,
+      event_type=event_type,
+      payload=payload,
+      status="pending",
+      attempts=0,
+      next_attempt_at=now.timestamp(),
+      created_at=now.isoformat(),
+    )
+  )
+
+
+async def claim_webhook_events(
+  session: AsyncSession, now: float, lease_seconds: float, limit: int
+) -> list[WebhookEvent]:
+  """Claim up to `limit` due outbox events, oldest first.
+
+  The claim is a conditional UPDATE, so two dispatchers (e.g. the main server
+  and the webhook server) sharing a database never claim the same row. The
+  caller commits the session to make the claim visible.
+
+  Args:
+    session: The transactions database session to use.
+    now: Current time in epoch seconds.
+    lease_seconds: How long the claimed events stay invisible to others.
+    limit: Maximum number of events to claim.
+
+  Returns:
+    The claimed events, detached from `session`, in creation order.
+
+  """
+  due = (
+    select(WebhookEvent.id)
+    .where(WebhookEvent.status == "pending")
+    .where(WebhookEvent.next_attempt_at <= now)
+    .order_by(WebhookEvent.id)
+    .limit(limit)
+    .scalar_subquery()
+  )
+  token = str(uuid.uuid4())
+  await session.execute(
+    update(WebhookEvent)
+    .where(WebhookEvent.id.in_(due))
+    .where(WebhookEvent.next_attempt_at <= now)
+    .values(next_attempt_at=now + lease_seconds, claim_token=token)
+    .execution_options(synchronize_session=False)
+  )
+  result = await session.execute(
+    select(WebhookEvent)
+    .where(WebhookEvent.claim_token == token)
+    .order_by(WebhookEvent.id)
+  )
+  return _detach(session, list(result.scalars().all()))
+
+
+async def update_webhook_event(
+  session: AsyncSession, event_id: int, **values: Any
+) -> None:
+  """Record the outcome of a delivery attempt on an outbox event."""
+  await session.execute(
+    update(WebhookEvent)
+    .where(WebhookEvent.id == event_id)
+    .values(claim_token=None, **values)
+    .execution_options(synchronize_session=False)
+  )
@@ -0,0 +1,229 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Unit tests for the data access helpers in db.py."""
+
+import asyncio
+from pathlib import Path
+import shutil
+import tempfile
+
+from absl.testing import absltest
+import db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class DbHelpersTest(absltest.TestCase):
+  """Tests for the database helpers against temporary SQLite files."""
+
+  def setUp(self) -> None:
+    """Create temporary Products and Transactions databases."""
+    super().setUp()
+    db.reference_cache.clear()
+    self.test_dir = Path(tempfile.mkdtemp())
+
+    self.products_engine = create_async_engine(
+      f"sqlite+aiosqlite:///{self.test_dir / 'products.db'}", echo=False
+    )
+    self.products_session_factory = sessionmaker(
+      self.products_engine, expire_on_commit=False, class_=AsyncSession
+    )
+    self.transactions_engine = create_async_engine(
+      f"sqlite+aiosqlite:///{self.test_dir / 'transactions.db'}", echo=False
+    )
+    self.transactions_session_factory = sessionmaker(
+      self.transactions_engine, expire_on_commit=False, class_=AsyncSession
+    )
+
+    async def init_schemas() -> None:
+      async with self.products_engine.begin() as conn:
+        await conn.run_sync(db.ProductBase.metadata.create_all)
+      async with self.transactions_engine.begin() as conn:
+        await conn.run_sync(db.TransactionBase.metadata.create_all)
+
+      async with self.products_session_factory() as session:
+        session.add_all(
+          [
+            db.Product(id="rose", title="Red Rose", price=1000),
+            db.Product(id="tulip", title="White Tulip", price=800),
+            db.Product(id="lily", title="Lily", price=1200),
+          ]
+        )
+        await session.commit()
+
+      async with self.transactions_session_factory() as session:
+        session.add_all(
+          [
+            db.Inventory(product_id="rose", quantity=5),
+            db.Inventory(product_id="tulip", quantity=2),
+          ]
+        )
+        await session.commit()
+
+    asyncio.run(init_schemas())
+
+  def tearDown(self) -> None:
+    """Dispose engines and remove the temporary databases."""
+
+    async def dispose_engines() -> None:
+      await self.products_engine.dispose()
+      await self.transactions_engine.dispose()
+
+    asyncio.run(dispose_engines())
+    shutil.rmtree(self.test_dir)
+    super().tearDown()
+
+  def test_get_products_resolves_known_ids(self) -> None:
+    """Tests that get_products returns every known ID in one call."""
+
+    async def run() -> list[db.Product]:
+      async with self.products_session_factory() as session:
+        return await db.get_products(
+          session, ["rose", "tulip", "rose", "missing"]
+        )
+
+    products = asyncio.run(run())
+    self.assertCountEqual([p.id for p in products], ["rose", "tulip"])
+    prices = {p.id: p.price for p in products}
+    self.assertEqual(prices, {"rose": 1000, "tulip": 800})
+
+  def test_get_products_empty(self) -> None:
+    """Tests that an empty ID list short-circuits without querying."""
+
+    async def run() -> list[db.Product]:
+      async with self.products_session_factory() as session:
+        return await db.get_products(session, [])
+
+    self.assertEqual(asyncio.run(run()), [])
+
+  def test_get_products_reads_through_cache(self) -> None:
+    """Tests that cached products survive DB changes until invalidated."""
+
+    async def lookup() -> dict[str, int]:
+      async with self.products_session_factory() as session:
+        products = await db.get_products(session, ["rose", "tulip"])
+        return {p.id: p.price for p in products}
+
+    async def reprice() -> None:
+      async with self.products_session_factory() as session:
+        product = await session.get(db.Product, "rose")
+        product.price = 1500
+        await session.commit()
+
+    self.assertEqual(asyncio.run(lookup()), {"rose": 1000, "tulip": 800})
+    asyncio.run(reprice())
+    self.assertEqual(asyncio.run(lookup()), {"rose": 1000, "tulip": 800})
+    self.assertEqual(db.reference_cache.stats()["products"]["hits"], 2)
+
+    db.reference_cache.invalidate(db.PRODUCTS_CACHE)
+    self.assertEqual(asyncio.run(lookup()), {"rose": 1500, "tulip": 800})
+
+  def test_write_from_another_process_invalidates_cache(self) -> None:
+    """Tests that a bumped shared version drops the server's cached rows."""
+
+    async def lookup() -> int:
+      async with self.products_session_factory() as session:
+        return (await db.get_product(session, "rose")).price
+
+    async def sync() -> None:
+      db.reference_cache.sync_versions(
+        await db.load_reference_versions(self.products_session_factory)
+      )
+
+    async def import_elsewhere() -> None:
+      # A separate engine stands in for import_csv.py's own process.
+      engine = create_async_engine(
+        f"sqlite+aiosqlite:///{self.test_dir / 'products.db'}"
+      )
+      session_factory = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+      )
+      async with session_factory() as session:
+        product = await session.get(db.Product, "rose")
+        product.price = 1500
+        await db.bump_reference_versions(session, db.PRODUCTS_CACHE)
+        await session.commit()
+      await engine.dispose()
+
+    asyncio.run(sync())
+    self.assertEqual(asyncio.run(lookup()), 1000)
+    asyncio.run(import_elsewhere())
+    self.assertEqual(asyncio.run(lookup()), 1000)  # Not yet polled.
+    asyncio.run(sync())
+    self.assertEqual(asyncio.run(lookup()), 1500)
+    asyncio.run(sync())  # Unchanged versions keep the cache.
+    self.assertEqual(asyncio.run(lookup()), 1500)
+    self.assertEqual(db.reference_cache.stats()["products"]["hits"], 2)
+
+  def test_cached_promotions_outlive_session(self) -> None:
+    """Tests that cached rows stay readable after their session rolls back."""
+
+    async def run() -> list[str]:
+      async with self.products_session_factory() as session:
+        session.add(db.Promotion(id="free", type="free_shipping"))
+        await session.commit()
+        await db.get_active_promotions(session)
+        await session.rollback()
+      async with self.products_session_factory() as session:
+        return [p.type for p in await db.get_active_promotions(session)]
+
+    self.assertEqual(asyncio.run(run()), ["free_shipping"])
+
+  def test_reserve_stock_bulk_all_or_nothing(self) -> None:
+    """Tests that a short line leaves every other line untouched."""
+
+    async def run() -> tuple[bool, int | None, int | None]:
+      async with self.transactions_session_factory() as session:
+        ok = await db.reserve_stock_bulk(session, [("rose", 1), ("tulip", 3)])
+        await session.commit()
+        return (
+          ok,
+          await db.get_inventory(session, "rose"),
+          await db.get_inventory(session, "tulip"),
+        )
+
+    self.assertEqual(asyncio.run(run()), (False, 5, 2))
+
+  def test_reserve_stock_bulk_sums_repeated_lines(self) -> None:
+    """Tests that repeated product IDs are reserved as one total."""
+
+    async def run() -> tuple[bool, bool, int | None]:
+      async with self.transactions_session_factory() as session:
+        first = await db.reserve_stock_bulk(
+          session, [("rose", 2), ("tulip", 1), ("rose", 2)]
+        )
+        second = await db.reserve_stock_bulk(
+          session, [("rose", 1), ("rose", 1)]
+        )
+        await session.commit()
+        return first, second, await db.get_inventory(session, "rose")
+
+    self.assertEqual(asyncio.run(run()), (True, False, 1))
+
+  def test_reserve_stock_bulk_unknown_product(self) -> None:
+    """Tests that a product without an inventory row fails the whole cart."""
+
+    async def run() -> tuple[bool, int | None]:
+      async with self.transactions_session_factory() as session:
+        ok = await db.reserve_stock_bulk(session, [("rose", 1), ("lily", 1)])
+        await session.commit()
+        return ok, await db.get_inventory(session, "rose")
+
+    self.assertEqual(asyncio.run(run()), (False, 5))
+
+
+if __name__ == "__main__":
+  absltest.main()
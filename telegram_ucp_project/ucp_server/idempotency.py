@@ -0,0 +1,230 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Idempotency-Key handling for the checkout endpoints.
+
+`IdempotencyStore` sits in front of the `idempotency_records` table:
+- `lock(key)` serializes requests that share an Idempotency-Key, so a retry
+  sent while the first request is still running waits for it and then
+  replays its response instead of doing the work a second time;
+- `get()` looks a key up in a `cache.BoundedLru` of recent responses before
+  SQLite, and `remember()` adds a response once it is committed;
+- records expire after `ttl_seconds`: expired records are ignored on
+  lookup and deleted in batches by a background sweeper.
+
+The lock only covers requests served by this process; requests racing in
+another process still collide on the table's primary key.
+"""
+
+import asyncio
+import collections
+from collections.abc import AsyncIterator
+from collections.abc import Callable
+import contextlib
+import dataclasses
+import datetime
+import logging
+import time
+from typing import Any
+
+import cache
+import db
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class StoredResponse:
+  """A response recorded under an Idempotency-Key."""
+
+  request_hash: str
+  response_status: int
+  response_body: dict[str, Any]
+  created_at: float  # Epoch seconds.
+
+
+def _epoch(timestamp: str | None) -> float:
+  """Parse an ISO-8601 `created_at`; unparsable values count as expired."""
+  try:
+    return datetime.datetime.fromisoformat(timestamp).timestamp()
+  except (TypeError, ValueError):
+    return 0.0
+
+
+class IdempotencyStore:
+  """Per-key in-flight locks and an LRU of recent idempotent responses."""
+
+  def __init__(
+    self,
+    max_entries: int = 1024,
+    ttl_seconds: float = 24 * 3600.0,
+    sweep_interval: float = 300.0,
+    sweep_batch_size: int = 500,
+    clock: Callable[[], float] = time.time,
+  ) -> None:
+    """Initialize IdempotencyStore.
+
+    Args:
+      max_entries: Maximum number of responses kept in memory.
+      ttl_seconds: Lifetime of a record. Zero or less never expires records.
+      sweep_interval: Seconds between sweeps of expired records.
+      sweep_batch_size: Records deleted per sweeper transaction.
+      clock: Wall-clock time source (epoch seconds), injectable for tests.
+
+    """
+    self.ttl_seconds = ttl_seconds
+    self.sweep_interval = sweep_interval
+    self.sweep_batch_size = sweep_batch_size
+    self._clock = clock
+    self._counters: collections.Counter = collections.Counter()
+    self._entries = cache.BoundedLru(
+      max_entries, on_evict=lambda _: self._counters.update(["evictions"])
+    )
+    # key -> (lock, number of requests holding or waiting for it)
+    self._locks: dict[str, list] = {}
+    self._sweeper: asyncio.Task | None = None
+
+  def configure(
+    self, max_entries: int | None = None, ttl_seconds: float | None = None
+  ) -> None:
+    """Resize the response LRU and change how long records stay valid."""
+    if max_entries is not None:
+      self._entries.resize(max_entries)
+    if ttl_seconds is not None:
+      self.ttl_seconds = ttl_seconds
+
+  @contextlib.asynccontextmanager
+  async def lock(self, key: str) -> AsyncIterator[None]:
+    """Hold the in-flight lock of `key` for the duration of a request."""
+    slot = self._locks.setdefault(key, [asyncio.Lock(), 0])
+    slot[1] += 1
+    if slot[0].locked():
+      self._counters["waited"] += 1
+    try:
+      async with slot[0]:
+        yield
+    finally:
+      slot[1] -= 1
+      if not slot[1]:
+        del self._locks[key]
+
+  async def get(self, session: AsyncSession, key: str) -> StoredResponse | None:
+    """Return the unexpired response stored under `key`, if any."""
+    now = self._clock()
+    entry = self._entries.peek(key)
+    if entry is not None:
+      if not self._expired(entry, now):
+        self._entries.touch(key)
+        self._counters["hits"] += 1
+        return entry
+      self._entries.pop(key)
+
+    record = await db.get_idempotency_record(session, key)
+    if record is not None:
+      entry = StoredResponse(
+        record.request_hash,
+        record.response_status,
+        record.response_body,
+        _epoch(record.created_at),
+      )
+      if not self._expired(entry, now):
+        self._counters["db_hits"] += 1
+        self._entries.put(key, entry)
+        return entry
+    self._counters["misses"] += 1
+    return None
+
+  def remember(
+    self,
+    key: str,
+    request_hash: str,
+    response_status: int,
+    response_body: dict[str, Any],
+  ) -> None:
+    """Cache a response after the transaction saving its record committed."""
+    self._entries.put(
+      key,
+      StoredResponse(
+        request_hash, response_status, response_body, self._clock()
+      ),
+    )
+
+  def clear(self) -> None:
+    """Drop every cached response and reset the counters."""
+    self._entries.clear()
+    self._counters.clear()
+
+  async def sweep(self, session_factory: Callable[[], AsyncSession]) -> int:
+    """Delete expired records in batches; returns how many were deleted."""
+    if self.ttl_seconds <= 0:
+      return 0
+    cutoff = datetime.datetime.fromtimestamp(
+      self._clock() - self.ttl_seconds, datetime.timezone.utc
+    ).isoformat()
+    total = 0
+    while True:
+      async with session_factory() as session:
+        deleted = await db.delete_expired_idempotency_records(
+          session, cutoff, self.sweep_batch_size
+        )
+        await session.commit()
+      total += deleted
+      if deleted < self.sweep_batch_size:
+        break
+      # Let checkouts waiting for the write lock go between batches.
+      await asyncio.sleep(0)
+    self._counters["swept"] += total
+    return total
+
+  def start_sweeper(self, session_factory: Callable[[], AsyncSession]) -> None:
+    """Sweep expired records every `sweep_interval` seconds."""
+
+    async def run() -> None:
+      while True:
+        try:
+          await self.sweep(session_factory)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+          logger.error("Idempotency sweep failed: %s", e)
+        await asyncio.sleep(self.sweep_interval)
+
+    self._sweeper = asyncio.create_task(run())
+
+  async def stop_sweeper(self) -> None:
+    """Stop the background sweeper, if running."""
+    if self._sweeper is not None:
+      self._sweeper.cancel()
+      await asyncio.gather(self._sweeper, return_exceptions=True)
+      self._sweeper = None
+
+  def stats(self) -> dict[str, int]:
+    """Return memory and database hits, lock waits and swept records."""
+    return {
+      "hits": self._counters["hits"],
+      "db_hits": self._counters["db_hits"],
+      "misses": self._counters["misses"],
+      "waited": self._counters["waited"],
+      "swept": self._counters["swept"],
+      "evictions": self._counters["evictions"],
+      "in_flight": len(self._locks),
+      "size": len(self._entries),
+    }
+
+  def _expired(self, entry: StoredResponse, now: float) -> bool:
+    return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+
+# One store per process, so its locks see every retry this process serves;
+# its sweeper runs for the lifetime of the app (see config.lifespan).
+store = IdempotencyStore()
@@ -0,0 +1,163 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for the idempotency store: locking, caching and expiry."""
+
+import asyncio
+import datetime
+from pathlib import Path
+import shutil
+import tempfile
+
+from absl.testing import absltest
+import db
+import idempotency
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class IdempotencyStoreTest(absltest.TestCase):
+  """Tests for IdempotencyStore against a temporary Transactions DB."""
+
+  def setUp(self) -> None:
+    """Create a temporary Transactions DB and a store with a fake clock."""
+    super().setUp()
+    self.test_dir = Path(tempfile.mkdtemp())
+    self.engine = create_async_engine(
+      f"sqlite+aiosqlite:///{self.test_dir / 'transactions.db'}", echo=False
+    )
+    self.session_factory = sessionmaker(
+      self.engine, expire_on_commit=False, class_=AsyncSession
+    )
+
+    async def init_schema() -> None:
+      async with self.engine.begin() as conn:
+        await conn.run_sync(db.TransactionBase.metadata.create_all)
+
+    asyncio.run(init_schema())
+    self.now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+    self.store = idempotency.IdempotencyStore(
+      max_entries=2, ttl_seconds=3600, clock=lambda: self.now
+    )
+
+  def tearDown(self) -> None:
+    """Dispose the engine and remove the temporary DB."""
+    asyncio.run(self.engine.dispose())
+    shutil.rmtree(self.test_dir)
+    super().tearDown()
+
+  async def _save(self, key: str, created_at: float | None = None) -> None:
+    async with self.session_factory() as session:
+      await db.save_idempotency_record(session, key, "hash", 200, {"k": key})
+      if created_at is not None:
+        record = await session.get(db.IdempotencyRecord, key)
+        record.created_at = datetime.datetime.fromtimestamp(
+          created_at, datetime.timezone.utc
+        ).isoformat()
+      await session.commit()
+
+  async def _get(self, key: str) -> idempotency.StoredResponse | None:
+    async with self.session_factory() as session:
+      return await self.store.get(session, key)
+
+  def test_same_key_waits_for_first_request(self) -> None:
+    """Tests that a concurrent retry replays instead of redoing the work."""
+    work_done = []
+
+    async def handle(key: str) -> dict:
+      async with self.store.lock(key):
+        stored = await self._get(key)
+        if stored is not None:
+          return stored.response_body
+        work_done.append(key)
+        await asyncio.sleep(0.05)  # The first request is still running.
+        await self._save(key)
+        self.store.remember(key, "hash", 200, {"k": key})
+        return {"k": key}
+
+    async def scenario():
+      return await asyncio.gather(
+        handle("a"), handle("a"), handle("a"), handle("b")
+      )
+
+    responses = asyncio.run(scenario())
+    self.assertEqual(responses, [{"k": "a"}] * 3 + [{"k": "b"}])
+    self.assertEqual(work_done, ["a", "b"])
+    stats = self.store.stats()
+    self.assertEqual((stats["waited"], stats["hits"]), (2, 2))
+    self.assertEqual(stats["in_flight"], 0)
+
+  def test_lookup_falls_back_to_database(self) -> None:
+    """Tests the memory tier and the SQLite tier of get()."""
+
+    async def scenario():
+      await self._save("a")
+      from_db = await self._get("a")
+      from_memory = await self._get("a")
+      missing = await self._get("nope")
+      return from_db, from_memory, missing
+
+    from_db, from_memory, missing = asyncio.run(scenario())
+    self.assertEqual(from_db.response_body, {"k": "a"})
+    self.assertEqual(from_memory, from_db)
+    self.assertIsNone(missing)
+    stats = self.store.stats()
+    self.assertEqual(
+      (stats["db_hits"], stats["hits"], stats["misses"]), (1, 1, 1)
+    )
+
+  def test_memory_tier_is_bounded(self) -> None:
+    """Tests that the least recently used response is evicted."""
+    for key in ("a", "b", "c"):
+      self.store.remember(key, "hash", 200, {})
+    self.assertEqual(self.store.stats()["size"], 2)
+    self.assertEqual(self.store.stats()["evictions"], 1)
+
+  def test_expired_record_is_ignored_and_replaced(self) -> None:
+    """Tests that an expired key misses and can be saved again."""
+
+    async def scenario():
+      await self._save("a", created_at=self.now - 7200)
+      expired = await self._get("a")
+      await self._save("a")
+      return expired, await self._get("a")
+
+    expired, fresh = asyncio.run(scenario())
+    self.assertIsNone(expired)
+    self.assertIsNotNone(fresh)
+
+  def test_sweep_deletes_expired_records_in_batches(self) -> None:
+    """Tests that the sweeper removes only expired records."""
+    self.store.sweep_batch_size = 2
+
+    async def scenario():
+      for i in range(5):
+        await self._save(f"old_{i}", created_at=self.now - 7200)
+      await self._save("new")
+      deleted = await self.store.sweep(self.session_factory)
+      async with self.session_factory() as session:
+        result = await session.execute(
+          select(func.count()).select_from(db.IdempotencyRecord)
+        )
+        return deleted, result.scalar_one()
+
+    self.assertEqual(asyncio.run(scenario()), (5, 1))
+    self.assertEqual(self.store.stats()["swept"], 5)
+
+
+if __name__ == "__main__":
+  absltest.main()
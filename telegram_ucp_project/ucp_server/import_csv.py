@@ -112,6 +112,9 @@ async def import_csv_data() -> None:
             )
         session.add_all(promotions)
 
+      await db.bump_reference_versions(
+        session, db.PRODUCTS_CACHE, db.PROMOTIONS_CACHE
+      )
       await session.commit()
 
     # Import Inventory and Customers to Transactions DB
@@ -239,6 +242,14 @@ async def import_csv_data() -> None:
         session.add_all(rates)
         await session.commit()
 
+    # Discounts and shipping rates live in the Transactions DB; the shared
+    # versions of every reference namespace live in the Products DB.
+    async with db.manager.products_session_factory() as session:
+      await db.bump_reference_versions(
+        session, db.SHIPPING_RATES_CACHE, db.DISCOUNTS_CACHE
+      )
+      await session.commit()
+
     logger.info("Database populated from CSVs.")
   finally:
     await db.manager.close()
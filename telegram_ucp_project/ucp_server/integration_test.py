@@ -26,7 +26,9 @@ from absl.testing import absltest
 import db
 import dependencies
 from fastapi.testclient import TestClient
+import httpx
 from server import app
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -406,6 +408,98 @@ class IntegrationTest(absltest.TestCase):
       # 2 - 2 = 0
       self.assertEqual(qty_tulip, 0, "Tulip inventory should be 0 (2 - 2)")
 
+  def test_concurrent_complete_never_oversells(self) -> None:
+    """Tests that simultaneous completes against one SKU never oversell."""
+    buyers = 25
+    with self.client:
+      for i in range(buyers):
+        payload = self._create_checkout_payload(
+          f"flash_sale_{i}", [("rose", "Red Rose", 1000, 1)]
+        )
+        response = self.client.post(
+          "/checkout-sessions",
+          headers=self._get_headers(idempotency_key=f"flash_create_{i}"),
+          json=payload.model_dump(mode="json", exclude_none=True),
+        )
+        self.assertEqual(response.status_code, 201, response.text)
+
+    payment_json = self._create_payment_payload().model_dump(
+      mode="json", exclude_none=True
+    )
+
+    async def complete_all() -> list[int]:
+      transport = httpx.ASGITransport(app=app)
+      async with httpx.AsyncClient(
+        transport=transport, base_url="http://testserver"
+      ) as client:
+        responses = await asyncio.gather(
+          *[
+            client.post(
+              f"/checkout-sessions/flash_sale_{i}/complete",
+              headers=self._get_headers(idempotency_key=f"flash_done_{i}"),
+              json=payment_json,
+            )
+            for i in range(buyers)
+          ]
+        )
+      return [r.status_code for r in responses]
+
+    statuses = asyncio.run(complete_all())
+
+    async def remaining_stock() -> int | None:
+      async with self.transactions_session_factory() as session:
+        return await db.get_inventory(session, "rose")
+
+    # Only the 5 roses in stock can be sold; everyone else gets a conflict.
+    self.assertEqual(statuses.count(200), 5, statuses)
+    self.assertEqual(statuses.count(409), buyers - 5, statuses)
+    self.assertEqual(asyncio.run(remaining_stock()), 0)
+
+  def test_concurrent_retries_complete_once(self) -> None:
+    """Tests that simultaneous retries of one complete share its result."""
+    with self.client:
+      payload = self._create_checkout_payload(
+        "retried_checkout", [("rose", "Red Rose", 1000, 2)]
+      )
+      response = self.client.post(
+        "/checkout-sessions",
+        headers=self._get_headers(idempotency_key="retry_create"),
+        json=payload.model_dump(mode="json", exclude_none=True),
+      )
+      self.assertEqual(response.status_code, 201, response.text)
+
+    payment_json = self._create_payment_payload().model_dump(
+      mode="json", exclude_none=True
+    )
+
+    async def complete_concurrently() -> list[httpx.Response]:
+      transport = httpx.ASGITransport(app=app)
+      async with httpx.AsyncClient(
+        transport=transport, base_url="http://testserver"
+      ) as client:
+        return await asyncio.gather(
+          *[
+            client.post(
+              "/checkout-sessions/retried_checkout/complete",
+              headers=self._get_headers(idempotency_key="retry_complete"),
+              json=payment_json,
+            )
+            for _ in range(5)
+          ]
+        )
+
+    responses = asyncio.run(complete_concurrently())
+
+    async def remaining_stock() -> int | None:
+      async with self.transactions_session_factory() as session:
+        return await db.get_inventory(session, "rose")
+
+    self.assertEqual([r.status_code for r in responses], [200] * 5)
+    order_ids = {r.json()["order"]["id"] for r in responses}
+    self.assertLen(order_ids, 1)
+    # Stock was reserved once, not once per retry.
+    self.assertEqual(asyncio.run(remaining_stock()), 3)
+
   def test_missing_ucp_agent_header(self) -> None:
     """Tests that requests missing mandatory headers are rejected."""
     with self.client:
@@ -494,6 +588,37 @@ class IntegrationTest(absltest.TestCase):
       self.assertEqual(response.status_code, 409)
       self.assertIn("Cannot cancel checkout", response.json()["detail"])
 
+  def test_ship_order_without_checkout(self) -> None:
+    """Tests that shipping commits even if the checkout is gone."""
+
+    async def save_order() -> None:
+      async with self.transactions_session_factory() as session:
+        await db.save_order(
+          session, "order_orphan", {"id": "order_orphan", "checkout_id": "gone"}
+        )
+        await session.commit()
+
+    async def load() -> tuple[dict, int]:
+      async with self.transactions_session_factory() as session:
+        order = await db.get_order(session, "order_orphan")
+        webhooks = await session.execute(select(db.WebhookEvent))
+        return order, len(webhooks.scalars().all())
+
+    with self.client:
+      asyncio.run(save_order())
+      headers = self._get_headers()
+      headers["Simulation-Secret"] = FLAGS.simulation_secret
+      response = self.client.post(
+        "/testing/simulate-shipping/order_orphan", headers=headers
+      )
+      self.assertEqual(response.status_code, 200)
+
+    order, webhooks = asyncio.run(load())
+    self.assertEqual(
+      [e["type"] for e in order["fulfillment"]["events"]], ["shipped"]
+    )
+    self.assertEqual(webhooks, 0)
+
 
 if __name__ == "__main__":
   absltest.main()
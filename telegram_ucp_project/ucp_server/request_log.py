@@ -0,0 +1,304 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Write-behind sink for the HTTP request log.
+
+Request logging used to add a `RequestLog` row to the checkout's own
+transaction, so every checkout wrote its full payload to the transactions
+DB while holding its write lock. `RequestLogSink.record()` only appends to
+an in-memory ring buffer; a background task drains it in batches,
+truncates large payloads and hands them to a writer:
+- `SqlLogWriter`: one multi-row INSERT per batch into `request_logs`,
+  either in the transactions DB or in a separate log database
+  (`open_log_database`), optionally pruning rows older than a retention;
+- `NdjsonLogWriter`: one JSON object per line appended to a file.
+
+When the buffer is full the oldest entries are dropped (and counted)
+rather than slowing requests down. Payloads are kept for a `sample_rate`
+fraction of requests and truncated beyond `max_payload_chars`. Truncation
+needs the encoded size, so it happens when a batch is written and a request
+never pays for encoding its payload; callers must therefore not mutate a
+payload after recording it.
+
+The server lifespan starts the shared `sink` and flushes it on shutdown.
+"""
+
+import asyncio
+import collections
+from collections.abc import Callable
+import contextlib
+import datetime
+import json
+import logging
+from pathlib import Path
+import random
+import time
+from typing import Any
+
+import db
+from sqlalchemy import delete
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+class SqlLogWriter:
+  """Writes log batches to the `request_logs` table."""
+
+  def __init__(
+    self,
+    session_factory: Callable[[], AsyncSession],
+    *,
+    retention_seconds: float = 0.0,
+    engine: AsyncEngine | None = None,
+    clock: Callable[[], float] = time.time,
+  ) -> None:
+    """Initialize SqlLogWriter.
+
+    Args:
+      session_factory: Factory for sessions on the log database.
+      retention_seconds: Age after which rows are deleted; 0 keeps them all.
+      engine: Engine owned by this writer, disposed by `aclose()`.
+      clock: Wall-clock time source (epoch seconds), injectable for tests.
+
+    """
+    self._session_factory = session_factory
+    self.retention_seconds = retention_seconds
+    self._engine = engine
+    self._clock = clock
+    self._last_prune = 0.0
+
+  async def write(self, rows: list[dict[str, Any]]) -> None:
+    """Insert `rows` in one statement and prune old rows hourly."""
+    async with self._session_factory() as session:
+      await session.execute(insert(db.RequestLog), rows)
+      now = self._clock()
+      if self.retention_seconds > 0 and now - self._last_prune > 3600:
+        cutoff = datetime.datetime.fromtimestamp(
+          now - self.retention_seconds, datetime.timezone.utc
+        ).isoformat()
+        await session.execute(
+          delete(db.RequestLog).where(db.RequestLog.timestamp < cutoff)
+        )
+        self._last_prune = now
+      await session.commit()
+
+  async def aclose(self) -> None:
+    """Dispose the engine if this writer owns it."""
+    if self._engine is not None:
+      await self._engine.dispose()
+
+
+async def open_log_database(path: str, **options: Any) -> SqlLogWriter:
+  """Open (creating if needed) a log database separate from transactions."""
+  engine = create_async_engine(f"sqlite+aiosqlite:///{path}", echo=False)
+  async with engine.begin() as conn:
+    await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    await conn.run_sync(db.RequestLog.__table__.create, checkfirst=True)
+  session_factory = sessionmaker(
+    engine, expire_on_commit=False, class_=AsyncSession
+  )
+  return SqlLogWriter(session_factory, engine=engine, **options)
+
+
+class NdjsonLogWriter:
+  """Appends log batches to a newline-delimited JSON file."""
+
+  def __init__(self, path: str) -> None:
+    """Initialize NdjsonLogWriter."""
+    self.path = Path(path)
+
+  async def write(self, rows: list[dict[str, Any]]) -> None:
+    """Append one line per row, off the event loop."""
+    lines = "".join(json.dumps(row, default=str) + "\n" for row in rows)
+    await asyncio.to_thread(self._append, lines)
+
+  def _append(self, lines: str) -> None:
+    with self.path.open("a", encoding="utf-8") as f:
+      f.write(lines)
+
+  async def aclose(self) -> None:
+    """Nothing to release; every batch closes the file."""
+
+
+class RequestLogSink:
+  """Bounded ring buffer of request log rows drained by a background task."""
+
+  def __init__(
+    self,
+    capacity: int = 10_000,
+    batch_size: int = 500,
+    flush_interval: float = 1.0,
+    sample_rate: float = 1.0,
+    max_payload_chars: int = 4096,
+  ) -> None:
+    """Initialize RequestLogSink.
+
+    Args:
+      capacity: Maximum buffered rows; the oldest are dropped beyond it.
+      batch_size: Maximum rows per write.
+      flush_interval: Seconds between flushes while the buffer is small.
+      sample_rate: Fraction of requests whose payload is logged (0 to 1).
+      max_payload_chars: Serialized payloads longer than this are truncated.
+
+    """
+    self.batch_size = batch_size
+    self.flush_interval = flush_interval
+    self.sample_rate = sample_rate
+    self.max_payload_chars = max_payload_chars
+    self._buffer: collections.deque[dict[str, Any]] = collections.deque(
+      maxlen=capacity
+    )
+    self._writer: SqlLogWriter | NdjsonLogWriter | None = None
+    self._task: asyncio.Task | None = None
+    self._wakeup = asyncio.Event()
+    self._flush_lock = asyncio.Lock()
+    self._counters: collections.Counter = collections.Counter()
+
+  def configure(
+    self,
+    capacity: int | None = None,
+    sample_rate: float | None = None,
+    max_payload_chars: int | None = None,
+  ) -> None:
+    """Update the buffer size and payload options."""
+    if capacity is not None:
+      self._buffer = collections.deque(self._buffer, maxlen=capacity)
+    if sample_rate is not None:
+      self.sample_rate = sample_rate
+    if max_payload_chars is not None:
+      self.max_payload_chars = max_payload_chars
+
+  def record(
+    self,
+    method: str,
+    url: str,
+    checkout_id: str | None = None,
+    payload: dict[str, Any] | None = None,
+  ) -> None:
+    """Buffer one request log row. Never blocks or raises."""
+    if len(self._buffer) == self._buffer.maxlen:
+      self._counters["dropped"] += 1
+    self._buffer.append(
+      {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "method": method,
+        "url": url,
+        "checkout_id": checkout_id,
+        "payload": self._sample_payload(payload),
+      }
+    )
+    self._counters["recorded"] += 1
+    if len(self._buffer) >= self.batch_size:
+      self._wakeup.set()
+
+  def _sample_payload(
+    self, payload: dict[str, Any] | None
+  ) -> dict[str, Any] | None:
+    """Return `payload`, or None if this request is not sampled."""
+    if payload is None:
+      return None
+    if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+      self._counters["payloads_skipped"] += 1
+      return None
+    return payload
+
+  def _prepare_payload(
+    self, payload: dict[str, Any] | None
+  ) -> dict[str, Any] | None:
+    """Truncate a payload about to be written beyond `max_payload_chars`."""
+    if payload is None or self.max_payload_chars <= 0:
+      return payload
+    encoded = json.dumps(payload, default=str)
+    if len(encoded) <= self.max_payload_chars:
+      return payload
+    self._counters["payloads_truncated"] += 1
+    return {
+      "truncated": True,
+      "size": len(encoded),
+      "preview": encoded[: self.max_payload_chars],
+    }
+
+  def start(self, writer: SqlLogWriter | NdjsonLogWriter) -> None:
+    """Start draining the buffer to `writer` on the running event loop."""
+    self._writer = writer
+    self._task = asyncio.create_task(self._flush_loop())
+
+  async def flush(self) -> None:
+    """Write every buffered row now, in batches."""
+    if self._writer is None:
+      return
+    async with self._flush_lock:
+      while self._buffer:
+        batch = [
+          self._buffer.popleft()
+          for _ in range(min(self.batch_size, len(self._buffer)))
+        ]
+        rows = [
+          {**row, "payload": self._prepare_payload(row["payload"])}
+          for row in batch
+        ]
+        try:
+          await self._writer.write(rows)
+        except asyncio.CancelledError:
+          # Shutting down mid-write: keep the batch for the final flush.
+          self._buffer.extendleft(reversed(batch))
+          raise
+        except Exception as e:  # pylint: disable=broad-exception-caught
+          self._counters["write_errors"] += 1
+          self._counters["dropped"] += len(batch)
+          logger.error("Failed to write %d request logs: %s", len(batch), e)
+          return
+        self._counters["written"] += len(batch)
+        self._counters["batches"] += 1
+
+  async def _flush_loop(self) -> None:
+    while True:
+      with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+      self._wakeup.clear()
+      await self.flush()
+
+  async def aclose(self) -> None:
+    """Stop the background task, write what is left and close the writer."""
+    if self._task is not None:
+      self._task.cancel()
+      await asyncio.gather(self._task, return_exceptions=True)
+      self._task = None
+    await self.flush()
+    if self._writer is not None:
+      await self._writer.aclose()
+      self._writer = None
+
+  def stats(self) -> dict[str, int]:
+    """Return buffer and write counters."""
+    return {
+      "recorded": self._counters["recorded"],
+      "written": self._counters["written"],
+      "batches": self._counters["batches"],
+      "dropped": self._counters["dropped"],
+      "write_errors": self._counters["write_errors"],
+      "payloads_skipped": self._counters["payloads_skipped"],
+      "payloads_truncated": self._counters["payloads_truncated"],
+      "buffered": len(self._buffer),
+    }
+
+
+# Every route logs through this sink; config.lifespan picks its writer and
+# drains it on shutdown.
+sink = RequestLogSink()
@@ -0,0 +1,176 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for the write-behind request log sink and its writers."""
+
+import asyncio
+import json
+from pathlib import Path
+import shutil
+import tempfile
+
+from absl.testing import absltest
+import db
+import request_log
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+
+class RecordingWriter:
+  """Keeps every batch it is given."""
+
+  def __init__(self) -> None:
+    """Initialize RecordingWriter."""
+    self.batches = []
+
+  async def write(self, rows) -> None:
+    """Record one batch."""
+    self.batches.append(rows)
+
+  async def aclose(self) -> None:
+    """Nothing to release."""
+
+
+class RequestLogTest(absltest.TestCase):
+  """Tests for buffering, batching, sampling and the writers."""
+
+  def setUp(self) -> None:
+    """Create a temporary directory for log databases and files."""
+    super().setUp()
+    self.test_dir = Path(tempfile.mkdtemp())
+
+  def tearDown(self) -> None:
+    """Remove the temporary directory."""
+    shutil.rmtree(self.test_dir)
+    super().tearDown()
+
+  def _drain(self, sink: request_log.RequestLogSink, writer) -> None:
+    async def run():
+      sink.start(writer)
+      await sink.aclose()
+
+    asyncio.run(run())
+
+  def test_rows_are_written_in_batches(self) -> None:
+    """Tests that buffered rows are drained `batch_size` at a time."""
+    sink = request_log.RequestLogSink(batch_size=2)
+    for i in range(5):
+      sink.record("GET", f"/checkout-sessions/{i}", checkout_id=str(i))
+    writer = RecordingWriter()
+    self._drain(sink, writer)
+
+    self.assertEqual([len(b) for b in writer.batches], [2, 2, 1])
+    self.assertEqual(writer.batches[0][0]["checkout_id"], "0")
+    self.assertEqual(sink.stats()["written"], 5)
+    self.assertEqual(sink.stats()["buffered"], 0)
+
+  def test_full_buffer_drops_oldest(self) -> None:
+    """Tests that recording never blocks once the ring buffer is full."""
+    sink = request_log.RequestLogSink(capacity=3)
+    for i in range(5):
+      sink.record("GET", f"/{i}")
+    writer = RecordingWriter()
+    self._drain(sink, writer)
+
+    urls = [row["url"] for batch in writer.batches for row in batch]
+    self.assertEqual(urls, ["/2", "/3", "/4"])
+    self.assertEqual(sink.stats()["dropped"], 2)
+
+  def test_payload_truncation_and_sampling(self) -> None:
+    """Tests that large payloads are truncated and unsampled ones dropped."""
+    sink = request_log.RequestLogSink(max_payload_chars=20)
+    sink.record("PUT", "/a", payload={"k": "v"})
+    sink.record("PUT", "/b", payload={"note": "x" * 100})
+    sink.configure(sample_rate=0.0)
+    sink.record("PUT", "/c", payload={"k": "v"})
+    # Payloads are only encoded (and truncated) when written.
+    self.assertEqual(sink.stats()["payloads_truncated"], 0)
+    writer = RecordingWriter()
+    self._drain(sink, writer)
+
+    payloads = [row["payload"] for row in writer.batches[0]]
+    self.assertEqual(payloads[0], {"k": "v"})
+    self.assertTrue(payloads[1]["truncated"])
+    self.assertLen(payloads[1]["preview"], 20)
+    self.assertIsNone(payloads[2])
+    stats = sink.stats()
+    self.assertEqual(stats["payloads_truncated"], 1)
+    self.assertEqual(stats["payloads_skipped"], 1)
+
+  def test_separate_log_database(self) -> None:
+    """Tests that open_log_database creates and fills its own table."""
+    path = self.test_dir / "logs.db"
+    sink = request_log.RequestLogSink()
+    sink.record("POST", "/complete", checkout_id="c1", payload={"a": 1})
+
+    async def run():
+      sink.start(await request_log.open_log_database(str(path)))
+      await sink.aclose()
+
+      engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+      session_factory = sessionmaker(
+        engine, expire_on_commit=False, class_=AsyncSession
+      )
+      async with session_factory() as session:
+        result = await session.execute(select(db.RequestLog))
+        rows = list(result.scalars().all())
+      await engine.dispose()
+      return rows
+
+    rows = asyncio.run(run())
+    self.assertLen(rows, 1)
+    self.assertEqual(
+      (rows[0].method, rows[0].checkout_id, rows[0].payload),
+      ("POST", "c1", {"a": 1}),
+    )
+
+  def test_retention_prunes_old_rows(self) -> None:
+    """Tests that rows older than the retention are deleted."""
+    path = self.test_dir / "logs.db"
+
+    async def run():
+      writer = await request_log.open_log_database(
+        str(path), retention_seconds=60
+      )
+      await writer.write(
+        [
+          {"timestamp": "2000-01-01T00:00:00+00:00", "url": "/old"},
+          {"timestamp": "2999-01-01T00:00:00+00:00", "url": "/new"},
+        ]
+      )
+      async with writer._session_factory() as session:
+        result = await session.execute(select(db.RequestLog.url))
+        urls = list(result.scalars().all())
+      await writer.aclose()
+      return urls
+
+    self.assertEqual(asyncio.run(run()), ["/new"])
+
+  def test_ndjson_writer(self) -> None:
+    """Tests that the NDJSON writer appends one object per line."""
+    path = self.test_dir / "requests.ndjson"
+    sink = request_log.RequestLogSink()
+    sink.record("GET", "/a")
+    sink.record("GET", "/b", payload={"x": 1})
+    self._drain(sink, request_log.NdjsonLogWriter(str(path)))
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    self.assertEqual([line["url"] for line in lines], ["/a", "/b"])
+    self.assertEqual(lines[1]["payload"], {"x": 1})
+
+
+if __name__ == "__main__":
+  absltest.main()
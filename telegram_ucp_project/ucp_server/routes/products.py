@@ -6,6 +6,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
+import cache
 import db
 from dependencies import get_products_db
 from supabase_client import supabase
@@ -13,6 +14,32 @@ from shopify_client import search_products_in_shopify, get_product_in_shopify, S
 
 router = APIRouter()
 
+# Shopify responses keyed by ("search", normalized query) or ("product", id).
+# Configured from flags by config.lifespan.
+shopify_cache = cache.StaleWhileRevalidateCache()
+
+
+def _normalize_query(q: str | None) -> str:
+    return " ".join((q or "").lower().split())
+
+
+async def cached_shopify_search(q: str | None):
+    """Shopify search through the cache; identical searches share one call."""
+    query = _normalize_query(q)
+
+    async def fetch():
+        # Empty results are not cached so the Supabase fallback stays live.
+        return await search_products_in_shopify(query) or None
+
+    return await shopify_cache.get_or_fetch(("search", query), fetch) or []
+
+
+async def cached_shopify_product(product_id: str):
+    """Shopify product detail through the cache."""
+    return await shopify_cache.get_or_fetch(
+        ("product", product_id), lambda: get_product_in_shopify(product_id)
+    )
+
 @router.get("/products")
 async def search_products(q: str = None, session: AsyncSession = Depends(get_products_db)):
     """
@@ -26,7 +53,7 @@ async def search_products(q: str = None, session: AsyncSession = Depends(get_pro
     # This is the main workflow as requested.
     if SHOPIFY_STOREFRONT_TOKEN and SHOPIFY_STORE_DOMAIN:
         try:
-            shopify_items = await search_products_in_shopify(q or "")
+            shopify_items = await cached_shopify_search(q)
             if shopify_items:
                  # Return in the format UCP/Telegram Bot expects
                  return {"items": shopify_items}
@@ -66,7 +93,7 @@ async def get_product_detail(product_id: str, session: AsyncSession = Depends(ge
         try:
              # Product IDs from Shopify often come as URIs or Base64. 
              # Our client helper expects the raw ID or URI.
-             p = await get_product_in_shopify(product_id)
+             p = await cached_shopify_product(product_id)
              if p:
                  return p
         except Exception:
@@ -21,17 +21,16 @@ import logging
 import re
 from typing import Annotated, Any
 
+import agent_profiles
 import dependencies
 from fastapi import APIRouter
 from fastapi import Body
 from fastapi import Depends
 from fastapi import Path
 from fastapi.routing import APIRoute
-import httpx
+import idempotency
 import models
 from models import UnifiedCheckoutCreateRequest
-from pydantic import BaseModel
-from pydantic import HttpUrl
 from services.checkout_service import CheckoutService
 from ucp_sdk.models.schemas.shopping.ap2_mandate import Ap2CompleteRequest
 from ucp_sdk.models.schemas.shopping.order import Order
@@ -48,67 +47,19 @@ logger = logging.getLogger(__name__)
 # Implementation wrappers
 
 
-class UcpConfig(BaseModel):
-  """Configuration for UCP."""
-
-  webhook_url: HttpUrl | None = None
-
-
-class Capability(BaseModel):
-  """UCP capability definition."""
-
-  config: UcpConfig | None = None
-
-
-class UcpProfile(BaseModel):
-  """UCP discovery profile."""
-
-  capabilities: list[Capability] = []
-
-
-class AgentProfile(BaseModel):
-  """Agent profile schema."""
-
-  ucp: UcpProfile | None = None
-
-
 async def extract_webhook_url(ucp_agent: str) -> str | None:
-  """Extract webhook URL from UCP-Agent header."""
+  """Extract webhook URL from UCP-Agent header.
+
+  The profile is resolved through `agent_profiles.resolver`, so repeated
+  requests from the same agent are answered from cache.
+  """
   match = re.search(r'profile="([^"]+)"', ucp_agent)
   if not match:
     return None
 
   profile_uri = match.group(1)
-
   try:
-    async with httpx.AsyncClient() as client:
-      response = await client.get(profile_uri)
-      if response.status_code != 200:
-        logger.error(
-          "Failed to fetch profile from %s: Status %d",
-          profile_uri,
-          response.status_code,
-        )
-        return None
-
-      try:
-        profile = AgentProfile.model_validate(response.json())
-      except (ValueError, TypeError) as e:
-        logger.error(
-          "Failed to validate Agent Profile from %s: %s", profile_uri, e
-        )
-        return None
-
-      if profile.ucp and profile.ucp.capabilities:
-        for cap in profile.ucp.capabilities:
-          if cap.config and cap.config.webhook_url:
-            return str(cap.config.webhook_url)
-
-      logger.warning("No webhook_url found in profile from %s", profile_uri)
-  except httpx.RequestError as e:
-    logger.error("Network error fetching profile from %s: %s", profile_uri, e)
-  except ValueError as e:
-    logger.error("Failed to decode JSON profile from %s: %s", profile_uri, e)
+    return await agent_profiles.resolver.resolve(profile_uri)
   except Exception as e:  # pylint: disable=broad-exception-caught
     logger.error(
       "Unexpected error extracting webhook from %s: %s", profile_uri, e
@@ -138,9 +89,10 @@ async def create_checkout(
   if webhook_url:
     platform_config = PlatformConfig(webhook_url=webhook_url)
 
-  result = await checkout_service.create_checkout(
-    unified_req, idempotency_key, platform_config
-  )
+  async with idempotency.store.lock(idempotency_key):
+    result = await checkout_service.create_checkout(
+      unified_req, idempotency_key, platform_config
+    )
   return result.model_dump(mode="json", by_alias=True)
 
 
@@ -179,9 +131,10 @@ async def update_checkout(
   if webhook_url:
     platform_config = PlatformConfig(webhook_url=webhook_url)
 
-  result = await checkout_service.update_checkout(
-    checkout_id, unified_req, idempotency_key, platform_config
-  )
+  async with idempotency.store.lock(idempotency_key):
+    result = await checkout_service.update_checkout(
+      checkout_id, unified_req, idempotency_key, platform_config
+    )
   return result.model_dump(mode="json", by_alias=True)
 
 
@@ -208,9 +161,10 @@ async def complete_checkout(
     instruments=[instrument],
   )
 
-  checkout_result = await checkout_service.complete_checkout(
-    checkout_id, payment_req, risk_signals, idempotency_key, ap2=ap2
-  )
+  async with idempotency.store.lock(idempotency_key):
+    checkout_result = await checkout_service.complete_checkout(
+      checkout_id, payment_req, risk_signals, idempotency_key, ap2=ap2
+    )
   return checkout_result.model_dump(mode="json", by_alias=True)
 
 
@@ -226,7 +180,8 @@ async def cancel_checkout(
 ) -> models.UnifiedCheckout:
   """Cancel Checkout Implementation."""
   del common_headers  # Unused
-  return await checkout_service.cancel_checkout(checkout_id, idempotency_key)
+  async with idempotency.store.lock(idempotency_key):
+    return await checkout_service.cancel_checkout(checkout_id, idempotency_key)
 
 
 async def order_event_webhook(
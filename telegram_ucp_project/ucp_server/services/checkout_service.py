@@ -31,12 +31,11 @@ Key responsibilities include:
 """
 
 import datetime
-import hashlib
-import json
 import logging
 from typing import Any
 import uuid
 
+import canonical_hash
 import config
 import db
 from enums import CheckoutStatus
@@ -46,12 +45,13 @@ from exceptions import InvalidRequestError
 from exceptions import OutOfStockError
 from exceptions import PaymentFailedError
 from exceptions import ResourceNotFoundError
-import httpx
+import idempotency
 from models import UnifiedCheckout as Checkout
 from models import UnifiedCheckoutCreateRequest
 from models import UnifiedCheckoutUpdateRequest
 from pydantic import AnyUrl
-from pydantic import BaseModel
+from pydantic import ValidationError
+import request_log
 from services.fulfillment_service import FulfillmentService
 from sqlalchemy.ext.asyncio import AsyncSession
 from ucp_sdk.models._internal import Response
@@ -111,6 +111,7 @@ from ucp_sdk.models.schemas.shopping.types.token_credential_resp import (
 from ucp_sdk.models.schemas.shopping.types.total_resp import (
   TotalResponse as Total,
 )
+import webhook_outbox
 
 logger = logging.getLogger(__name__)
 
@@ -132,16 +133,17 @@ class CheckoutService:
     self.base_url = base_url.rstrip("/")
 
   def _compute_hash(self, data: Any) -> str:
-    """Compute SHA256 hash of the JSON-serialized data."""
-    if isinstance(data, BaseModel):
-      # Pydantic's optimized JSON dump
-      # sort_keys is not supported in model_dump_json in Pydantic V2.
-      # We dump to dict and use standard json.dumps for deterministic sorting.
-      json_str = json.dumps(data.model_dump(mode="json"), sort_keys=True)
-    else:
-      # sort_keys=True ensures deterministic hashing for dicts
-      json_str = json.dumps(data, sort_keys=True)
-    return hashlib.sha256(json_str.encode("utf-8")).hexdigest()
+    """Compute the canonical hash of a request body."""
+    return canonical_hash.hasher.digest(data)
+
+  def _same_request(
+    self, stored_hash: str, request_hash: str, data: Any
+  ) -> bool:
+    """Tell whether a stored request hash was computed from `data`."""
+    # Only records hashed in another format, e.g. before an upgrade, rehash.
+    return stored_hash == request_hash or canonical_hash.hasher.matches(
+      stored_hash, data
+    )
 
   async def create_checkout(
     self,
@@ -154,12 +156,14 @@ class CheckoutService:
 
     # Idempotency Check
     request_hash = self._compute_hash(checkout_req)
-    existing_record = await db.get_idempotency_record(
+    existing_record = await idempotency.store.get(
       self.transactions_session, idempotency_key
     )
 
     if existing_record:
-      if existing_record.request_hash != request_hash:
+      if not self._same_request(
+        existing_record.request_hash, request_hash, checkout_req
+      ):
         raise IdempotencyConflictError(
           "Idempotency key reused with different parameters"
         )
@@ -353,6 +357,9 @@ class CheckoutService:
     )
 
     await self.transactions_session.commit()
+    idempotency.store.remember(
+      idempotency_key, request_hash, 201, response_body
+    )
 
     return checkout
 
@@ -362,13 +369,11 @@ class CheckoutService:
   ) -> Checkout:
     """Retrieve a checkout session."""
     # Log the request
-    await db.log_request(
-      self.transactions_session,
+    request_log.sink.record(
       method="GET",
       url=f"/checkout-sessions/{checkout_id}",
       checkout_id=checkout_id,
     )
-    await self.transactions_session.commit()
 
     return await self._get_and_validate_checkout(checkout_id)
 
@@ -385,11 +390,13 @@ class CheckoutService:
     # Idempotency Check
     request_hash = self._compute_hash(checkout_req)
 
-    existing_record = await db.get_idempotency_record(
+    existing_record = await idempotency.store.get(
       self.transactions_session, idempotency_key
     )
     if existing_record:
-      if existing_record.request_hash != request_hash:
+      if not self._same_request(
+        existing_record.request_hash, request_hash, checkout_req
+      ):
         raise IdempotencyConflictError(
           "Idempotency key reused with different parameters"
         )
@@ -397,8 +404,7 @@ class CheckoutService:
 
     # Log the request
     payload_dict = checkout_req.model_dump(mode="json")
-    await db.log_request(
-      self.transactions_session,
+    request_log.sink.record(
       method="PUT",
       url=f"/checkout-sessions/{checkout_id}",
       checkout_id=checkout_id,
@@ -606,6 +612,9 @@ class CheckoutService:
     )
 
     await self.transactions_session.commit()
+    idempotency.store.remember(
+      idempotency_key, request_hash, 200, response_body
+    )
     return existing
 
   async def complete_checkout(
@@ -628,19 +637,20 @@ class CheckoutService:
     }
     request_hash = self._compute_hash(combined_data)
 
-    existing_record = await db.get_idempotency_record(
+    existing_record = await idempotency.store.get(
       self.transactions_session, idempotency_key
     )
     if existing_record:
-      if existing_record.request_hash != request_hash:
+      if not self._same_request(
+        existing_record.request_hash, request_hash, combined_data
+      ):
         raise IdempotencyConflictError(
           "Idempotency key reused with different parameters"
         )
       return Checkout(**existing_record.response_body)
 
     # Log the request
-    await db.log_request(
-      self.transactions_session,
+    request_log.sink.record(
       method="POST",
       url=f"/checkout-sessions/{checkout_id}/complete",
       checkout_id=checkout_id,
@@ -674,19 +684,28 @@ class CheckoutService:
 
     # Atomic Inventory Reservation + Order Completion
     try:
-      for line in checkout.line_items:
-        product_id = line.item.id
-        # We verify product existence again (optional but good practice)
-        if await db.get_product(self.products_session, product_id):
-          success = await db.reserve_stock(
-            self.transactions_session, product_id, line.quantity
-          )
-          if not success:
-            # This rollback applies to the transaction_session
-            await self.transactions_session.rollback()
-            raise OutOfStockError(
-              f"Item {product_id} is out of stock", status_code=409
-            )
+      # We verify product existence again (optional but good practice)
+      products = await db.get_products(
+        self.products_session, [line.item.id for line in checkout.line_items]
+      )
+      known_product_ids = {p.id for p in products}
+      reservations = [
+        (line.item.id, line.quantity)
+        for line in checkout.line_items
+        if line.item.id in known_product_ids
+      ]
+      # Reserve the whole cart in one statement (all-or-nothing)
+      success = await db.reserve_stock_bulk(
+        self.transactions_session, reservations
+      )
+      if not success:
+        # This rollback applies to the transaction_session
+        await self.transactions_session.rollback()
+        product_ids = ", ".join(sorted({pid for pid, _ in reservations}))
+        raise OutOfStockError(
+          f"Insufficient stock to reserve items: {product_ids}",
+          status_code=409,
+        )
 
       checkout.status = CheckoutStatus.COMPLETED
       order_id = f"{uuid.uuid4()}"
@@ -778,11 +797,8 @@ class CheckoutService:
         fulfillment=OrderFulfillment(expectations=expectations, events=[]),
       )
 
-      await db.save_order(
-        self.transactions_session,
-        order.id,
-        order.model_dump(mode="json", by_alias=True),
-      )
+      order_data = order.model_dump(mode="json", by_alias=True)
+      await db.save_order(self.transactions_session, order.id, order_data)
 
       await db.save_checkout(
         self.transactions_session,
@@ -800,11 +816,15 @@ class CheckoutService:
         response_body,
       )
 
-      # Commit both inventory updates and checkout status update atomically
-      await self.transactions_session.commit()
+      # Queue the order placement webhook in the same transaction
+      await self._enqueue_webhook(checkout, "order_placed", order_data)
 
-      # Notify webhook of order placement
-      await self._notify_webhook(checkout, "order_placed")
+      # Commit inventory updates, checkout status update and webhook atomically
+      await self.transactions_session.commit()
+      idempotency.store.remember(
+        idempotency_key, request_hash, 200, response_body
+      )
+      webhook_outbox.wake()
 
     except Exception as e:
       await self.transactions_session.rollback()
@@ -812,29 +832,31 @@ class CheckoutService:
 
     return checkout
 
-  async def _notify_webhook(self, checkout: Checkout, event_type: str) -> None:
-    """Notifies the configured webhook of an event."""
+  async def _enqueue_webhook(
+    self,
+    checkout: Checkout,
+    event_type: str,
+    order_data: dict[str, Any] | None,
+  ) -> None:
+    """Add a webhook event to the outbox, committed by the caller.
+
+    Delivery happens in the background (see `webhook_outbox`), so a slow or
+    failing webhook receiver never delays the buyer's response.
+    """
     if not checkout.platform or not checkout.platform.webhook_url:
       return
 
-    webhook_url = str(checkout.platform.webhook_url)
-    order_data = None
-    if checkout.order and checkout.order.id:
-      order_data = await db.get_order(
-        self.transactions_session, checkout.order.id
-      )
-
     payload = {
       "event_type": event_type,
       "checkout_id": checkout.id,
       "order": order_data,
     }
-
-    try:
-      async with httpx.AsyncClient() as client:
-        await client.post(webhook_url, json=payload, timeout=5.0)
-    except Exception as e:  # pylint: disable=broad-exception-caught
-      logger.error("Failed to notify webhook at %s: %s", webhook_url, e)
+    await db.enqueue_webhook_event(
+      self.transactions_session,
+      str(checkout.platform.webhook_url),
+      event_type,
+      payload,
+    )
 
   async def ship_order(self, order_id: str) -> None:
     """Simulate shipping an order and notifies the webhook."""
@@ -863,13 +885,25 @@ class CheckoutService:
     )
 
     await db.save_order(self.transactions_session, order_id, order_data)
-    await self.transactions_session.commit()
 
-    # Get checkout to find webhook_url
+    # Get checkout to find webhook_url. The shipment is recorded either way:
+    # a missing or invalid checkout only means there is nobody to notify.
     checkout_id = order_data.get("checkout_id")
     if checkout_id:
-      checkout = await self._get_and_validate_checkout(checkout_id)
-      await self._notify_webhook(checkout, "order_shipped")
+      try:
+        checkout = await self._get_and_validate_checkout(checkout_id)
+      except (ResourceNotFoundError, ValidationError) as e:
+        logger.warning(
+          "Not notifying shipment of order %s: checkout %s: %s",
+          order_id,
+          checkout_id,
+          e,
+        )
+      else:
+        await self._enqueue_webhook(checkout, "order_shipped", order_data)
+
+    await self.transactions_session.commit()
+    webhook_outbox.wake()
 
   async def cancel_checkout(
     self,
@@ -883,19 +917,20 @@ class CheckoutService:
     # Payload is empty for cancel usually.
     request_hash = self._compute_hash({})
 
-    existing_record = await db.get_idempotency_record(
+    existing_record = await idempotency.store.get(
       self.transactions_session, idempotency_key
     )
     if existing_record:
-      if existing_record.request_hash != request_hash:
+      if not self._same_request(
+        existing_record.request_hash, request_hash, {}
+      ):
         raise IdempotencyConflictError(
           "Idempotency key reused with different parameters"
         )
       return Checkout(**existing_record.response_body)
 
     # Log the request
-    await db.log_request(
-      self.transactions_session,
+    request_log.sink.record(
       method="POST",
       url=f"/checkout-sessions/{checkout_id}/cancel",
       checkout_id=checkout_id,
@@ -924,6 +959,9 @@ class CheckoutService:
     )
 
     await self.transactions_session.commit()
+    idempotency.store.remember(
+      idempotency_key, request_hash, 200, response_body
+    )
     return checkout
 
   async def get_order(
@@ -986,9 +1024,15 @@ class CheckoutService:
     """Recalculate line item subtotals and checkout totals."""
     grand_total = 0
 
+    # Batch fetch products to avoid N+1 queries
+    products = await db.get_products(
+      self.products_session, [line.item.id for line in checkout.line_items]
+    )
+    product_map = {p.id: p for p in products}
+
     for line in checkout.line_items:
       product_id = line.item.id
-      product = await db.get_product(self.products_session, product_id)
+      product = product_map.get(product_id)
       if not product:
         raise InvalidRequestError(f"Product {product_id} not found")
 
@@ -1,6 +1,10 @@
+import asyncio
+import importlib.util
 import httpx
 import os
 import logging
+import random
+import time
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -11,40 +15,192 @@ load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file_
 
 # CONFIGURATION
 # We define them here but fetch dynamically in function to be safe
-SHOPIFY_STORE_DOMAIN = os.getenv("SHOPIFY_STORE_DOMAIN", "your-store.myshopify.com") 
-SHOPIFY_STOREFRONT_TOKEN = os.getenv("SHOPIFY_STOREFRONT_TOKEN", "") 
+SHOPIFY_STORE_DOMAIN = os.getenv("SHOPIFY_STORE_DOMAIN", "your-store.myshopify.com")
+SHOPIFY_STOREFRONT_TOKEN = os.getenv("SHOPIFY_STOREFRONT_TOKEN", "")
+
+# Connection pool and retry tuning for the shared client.
+SHOPIFY_TIMEOUT_SECONDS = float(os.getenv("SHOPIFY_TIMEOUT_SECONDS", "10"))
+SHOPIFY_MAX_CONNECTIONS = int(os.getenv("SHOPIFY_MAX_CONNECTIONS", "20"))
+SHOPIFY_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("SHOPIFY_MAX_KEEPALIVE_CONNECTIONS", "10")
+)
+SHOPIFY_MAX_RETRIES = int(os.getenv("SHOPIFY_MAX_RETRIES", "3"))
+SHOPIFY_RETRY_BASE_DELAY = float(os.getenv("SHOPIFY_RETRY_BASE_DELAY", "0.25"))
+SHOPIFY_RETRY_MAX_DELAY = float(os.getenv("SHOPIFY_RETRY_MAX_DELAY", "4.0"))
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]").
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Shared client, opened by the server lifespan or lazily on first use.
+_client: httpx.AsyncClient | None = None
+# Monotonic time before which no request should be sent (Shopify throttling).
+_throttled_until = 0.0
+
+
+def open_client(**overrides) -> httpx.AsyncClient:
+    """Create the shared pooled client. `overrides` go to httpx.AsyncClient."""
+    global _client
+    options = {
+        "http2": HTTP2_AVAILABLE,
+        "timeout": SHOPIFY_TIMEOUT_SECONDS,
+        "limits": httpx.Limits(
+            max_connections=SHOPIFY_MAX_CONNECTIONS,
+            max_keepalive_connections=SHOPIFY_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        "headers": {"Content-Type": "application/json"},
+    }
+    options.update(overrides)
+    _client = httpx.AsyncClient(**options)
+    return _client
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, opening it if needed."""
+    if _client is None or _client.is_closed:
+        return open_client()
+    return _client
+
+
+async def close_client():
+    """Close the shared client and its pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _graphql_url(domain: str) -> str:
+    # SHOPIFY_STOREFRONT_URL points the client at a proxy or a local fake.
+    return os.getenv("SHOPIFY_STOREFRONT_URL") or f"https://{domain}/api/2024-01/graphql.json"
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    ceiling = min(
+        SHOPIFY_RETRY_MAX_DELAY, SHOPIFY_RETRY_BASE_DELAY * (2 ** attempt)
+    )
+    return random.uniform(0, ceiling)
+
+
+def _is_throttled(body) -> bool:
+    if not isinstance(body, dict):
+        return False
+    return any(
+        (error.get("extensions") or {}).get("code") == "THROTTLED"
+        for error in body.get("errors") or []
+        if isinstance(error, dict)
+    )
+
+
+def _throttle_delay(resp: httpx.Response, body) -> float | None:
+    """Seconds Shopify asks us to wait before the next query, if any.
+
+    Uses `Retry-After`, then the GraphQL cost extension (`requestedQueryCost`
+    vs `throttleStatus.currentlyAvailable` and `restoreRate`), then the
+    `X-Shopify-Shop-Api-Call-Limit` bucket header.
+    """
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+    cost = None
+    if isinstance(body, dict):
+        cost = (body.get("extensions") or {}).get("cost")
+    if isinstance(cost, dict):
+        status = cost.get("throttleStatus") or {}
+        requested = cost.get("requestedQueryCost")
+        available = status.get("currentlyAvailable")
+        restore_rate = status.get("restoreRate")
+        if requested is not None and available is not None and restore_rate:
+            if requested > available:
+                return (requested - available) / restore_rate
+            return None
+
+    call_limit = resp.headers.get("X-Shopify-Shop-Api-Call-Limit")
+    if call_limit:
+        try:
+            used, limit = (int(part) for part in call_limit.split("/"))
+        except ValueError:
+            return None
+        if used >= limit:
+            return 1.0
+    return None
+
+
+async def _wait_for_throttle():
+    delay = _throttled_until - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+def _defer_until(delay: float):
+    global _throttled_until
+    _throttled_until = max(_throttled_until, time.monotonic() + delay)
+
 
 async def shopify_graphql(query: str, variables: dict = None):
-    """Generic helper to send GraphQL queries to Shopify Storefront API."""
+    """Generic helper to send GraphQL queries to Shopify Storefront API.
+
+    Requests share one pooled client. 429s, 5xx responses, THROTTLED errors and
+    transport errors are retried up to SHOPIFY_MAX_RETRIES times, waiting for
+    as long as Shopify asks or with jittered exponential backoff otherwise.
+    """
     # Re-fetch in case env vars were loaded late
     token = os.getenv("SHOPIFY_STOREFRONT_TOKEN")
     domain = os.getenv("SHOPIFY_STORE_DOMAIN")
-    
+
     if not token or not domain:
         logger.error("SHOPIFY_STOREFRONT_TOKEN or DOMAIN is missing")
         return None
-        
-    url = f"https://{domain}/api/2024-01/graphql.json"
 
-    headers = {
-        "X-Shopify-Storefront-Access-Token": token,
-        "Content-Type": "application/json"
-    }
-    
-    async with httpx.AsyncClient(timeout=10.0) as client:
+    url = _graphql_url(domain)
+    headers = {"X-Shopify-Storefront-Access-Token": token}
+    payload = {"query": query, "variables": variables or {}}
+    client = get_client()
+
+    for attempt in range(SHOPIFY_MAX_RETRIES + 1):
+        await _wait_for_throttle()
         try:
-            resp = await client.post(
-                url,
-                json={"query": query, "variables": variables or {}},
-                headers=headers
+            resp = await client.post(url, json=payload, headers=headers)
+        except httpx.TransportError as e:
+            logger.warning(
+                f"Shopify Request Failed (attempt {attempt + 1}): {e}"
             )
-            # Log response if error for debugging
-            if resp.status_code != 200:
-                 logger.error(f"Shopify Error {resp.status_code}: {resp.text}")
-            return resp.json()
-        except Exception as e:
-            logger.error(f"Shopify Request Failed: {e}")
-            return None
+            delay = _backoff_delay(attempt)
+        else:
+            try:
+                body = resp.json()
+            except ValueError:
+                body = None
+            throttled = resp.status_code == 429 or _is_throttled(body)
+            wait = _throttle_delay(resp, body)
+            if not throttled and resp.status_code < 500:
+                # Spend the remaining budget slowly instead of hitting a 429.
+                if wait:
+                    _defer_until(wait)
+                # Log response if error for debugging
+                if resp.status_code != 200:
+                    logger.error(
+                        f"Shopify Error {resp.status_code}: {resp.text}"
+                    )
+                return body
+            kind = "throttled" if throttled else "error"
+            logger.warning(
+                f"Shopify {kind} {resp.status_code} (attempt {attempt + 1})"
+            )
+            delay = wait if wait is not None else _backoff_delay(attempt)
+            if throttled:
+                _defer_until(delay)
+        if attempt < SHOPIFY_MAX_RETRIES:
+            await asyncio.sleep(delay)
+
+    logger.error(
+        f"Shopify Request Failed after {SHOPIFY_MAX_RETRIES + 1} attempts"
+    )
+    return None
 
 async def search_products_in_shopify(query_term: str):
     """Search products using Shopify Storefront API."""
@@ -103,11 +259,25 @@ async def search_products_in_shopify(query_term: str):
         
     return ucp_items
 
-async def get_product_in_shopify(product_id: str):
-    """Fetch a single product by ID."""
-    gql = """
-    query getProduct($id: ID!) {
-      product(id: $id) {
+def _product_from_node(node: dict):
+    """Translate a Storefront Product node into the UCP product dict."""
+    price = 0
+    currency = "USD"
+    if node["variants"]["edges"]:
+        price_data = node["variants"]["edges"][0]["node"]["price"]
+        price = float(price_data["amount"])
+        currency = price_data["currencyCode"]
+
+    return {
+        "id": node["id"],
+        "name": node["title"],
+        "title": node["title"], # Support both naming conventions
+        "description": node.get("description", ""),
+        "price": price,
+        "currency": currency
+    }
+
+PRODUCT_FIELDS = """
         id
         title
         description
@@ -121,27 +291,115 @@ async def get_product_in_shopify(product_id: str):
             }
           }
         }
-      }
-    }
+"""
+
+# Storefront rejects `nodes` queries with more than 250 IDs.
+SHOPIFY_NODES_BATCH_SIZE = 250
+
+
+async def _fetch_product_in_shopify(product_id: str):
+    """Fetch a single product with the `product(id:)` query."""
+    gql = f"""
+    query getProduct($id: ID!) {{
+      product(id: $id) {{{PRODUCT_FIELDS}}}
+    }}
     """
     response = await shopify_graphql(gql, {"id": product_id})
-    if not response or "data" not in response or not response["data"]["product"]:
+    data = (response or {}).get("data") or {}
+    if not data.get("product"):
         return None
-        
-    node = response["data"]["product"]
-    
-    price = 0
-    currency = "USD"
-    if node["variants"]["edges"]:
-        price_data = node["variants"]["edges"][0]["node"]["price"]
-        price = float(price_data["amount"])
-        currency = price_data["currencyCode"]
-        
+
+    return _product_from_node(response["data"]["product"])
+
+
+async def get_products_in_shopify(product_ids: list[str]) -> dict:
+    """Fetch many products, one `nodes(ids:)` query per 250 IDs.
+
+    Returns a dict keyed by the requested ID; unknown IDs are left out. If
+    Shopify rejects a batch (e.g. because one ID is malformed) or answers
+    with the wrong number of nodes, its IDs are looked up one by one so a
+    bad ID cannot hide the others.
+    """
+    ids = list(dict.fromkeys(product_ids))
+    gql = f"""
+    query getProducts($ids: [ID!]!) {{
+      nodes(ids: $ids) {{
+        ... on Product {{{PRODUCT_FIELDS}}}
+      }}
+    }}
+    """
+
+    async def fetch_chunk(chunk):
+        response = await shopify_graphql(gql, {"ids": chunk})
+        nodes = ((response or {}).get("data") or {}).get("nodes")
+        if nodes is None or len(nodes) != len(chunk):
+            singles = await asyncio.gather(
+                *(_fetch_product_in_shopify(pid) for pid in chunk)
+            )
+            return list(zip(chunk, singles, strict=True))
+        # `nodes` is positional; non-products come back as {}, misses as null.
+        return [
+            (pid, _product_from_node(node) if node else None)
+            for pid, node in zip(chunk, nodes, strict=True)
+        ]
+
+    size = SHOPIFY_NODES_BATCH_SIZE
+    chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+    results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
     return {
-        "id": node["id"],
-        "name": node["title"],
-        "title": node["title"], # Support both naming conventions
-        "description": node.get("description", ""),
-        "price": price,
-        "currency": currency
+        pid: product
+        for pairs in results
+        for pid, product in pairs
+        if product
     }
+
+
+class ProductLoader:
+    """DataLoader-style micro-batcher for single product lookups.
+
+    `load()` calls issued in the same event-loop tick are queued and sent as
+    one `get_products_in_shopify` request once the tick's ready callbacks have
+    run.
+    """
+
+    def __init__(self, batch_fn=get_products_in_shopify):
+        """Initialize ProductLoader with the batch lookup to call."""
+        self._batch_fn = batch_fn
+        self._pending: dict[str, list[asyncio.Future]] = {}
+
+    async def load(self, product_id: str):
+        """Return one product, looked up in the next batch."""
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            loop.call_soon(self._dispatch)
+        future = loop.create_future()
+        self._pending.setdefault(product_id, []).append(future)
+        return await future
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        task = asyncio.ensure_future(self._batch_fn(list(pending)))
+
+        def resolve(done):
+            error = None if done.cancelled() else done.exception()
+            for product_id, futures in pending.items():
+                for future in futures:
+                    # Waiters may have been cancelled while the batch ran.
+                    if future.done():
+                        continue
+                    if done.cancelled():
+                        future.cancel()
+                    elif error is not None:
+                        future.set_exception(error)
+                    else:
+                        future.set_result(done.result().get(product_id))
+
+        task.add_done_callback(resolve)
+
+
+product_loader = ProductLoader()
+
+
+async def get_product_in_shopify(product_id: str):
+    """Fetch a single product by ID, batched with concurrent lookups."""
+    return await product_loader.load(product_id)
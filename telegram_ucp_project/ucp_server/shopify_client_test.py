@@ -0,0 +1,261 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for the pooled Shopify Storefront client."""
+
+import asyncio
+import json
+import os
+from unittest import mock
+
+from absl.testing import absltest
+import httpx
+import shopify_client
+
+PRODUCT = {
+  "id": "gid://shopify/Product/1",
+  "title": "Almond Cake",
+  "description": "",
+  "variants": {
+    "edges": [{"node": {"price": {"amount": "4.5", "currencyCode": "USD"}}}]
+  },
+}
+
+
+class ShopifyClientTest(absltest.TestCase):
+  """Tests for shopify_graphql retries, throttling and client reuse."""
+
+  def setUp(self) -> None:
+    """Point the client at a scripted transport with fast backoff."""
+    super().setUp()
+    self.enter_context(
+      mock.patch.dict(
+        os.environ,
+        {
+          "SHOPIFY_STOREFRONT_TOKEN": "token",
+          "SHOPIFY_STORE_DOMAIN": "test.myshopify.com",
+        },
+      )
+    )
+    self.enter_context(
+      mock.patch.object(shopify_client, "SHOPIFY_RETRY_BASE_DELAY", 0.001)
+    )
+    self.enter_context(mock.patch.object(shopify_client, "_throttled_until", 0))
+    self.responses = []
+    self.requests = []
+
+  def _run(self, coro_fn):
+    """Run `coro_fn()` against a client serving `self.responses` in order."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+      self.requests.append(request)
+      return self.responses.pop(0)
+
+    async def run():
+      shopify_client.open_client(transport=httpx.MockTransport(handler))
+      try:
+        return await coro_fn()
+      finally:
+        await shopify_client.close_client()
+
+    return asyncio.run(run())
+
+  def test_client_is_shared_across_calls(self) -> None:
+    """Tests that search and product detail reuse one pooled client."""
+    self.responses = [
+      httpx.Response(
+        200, json={"data": {"products": {"edges": [{"node": PRODUCT}]}}}
+      ),
+      httpx.Response(200, json={"data": {"nodes": [PRODUCT]}}),
+    ]
+
+    async def run():
+      client = shopify_client.get_client()
+      items = await shopify_client.search_products_in_shopify("almond")
+      product = await shopify_client.get_product_in_shopify(PRODUCT["id"])
+      return client is shopify_client.get_client(), items, product
+
+    same_client, items, product = self._run(run)
+    self.assertTrue(same_client)
+    self.assertEqual(items[0]["price"], 4.5)
+    self.assertEqual(product["title"], "Almond Cake")
+    self.assertEqual(
+      self.requests[0].headers["X-Shopify-Storefront-Access-Token"], "token"
+    )
+
+  def test_retries_server_errors(self) -> None:
+    """Tests that 5xx responses are retried until one succeeds."""
+    self.responses = [
+      httpx.Response(503),
+      httpx.Response(502, text="bad gateway"),
+      httpx.Response(200, json={"data": {"nodes": [PRODUCT]}}),
+    ]
+    product = self._run(
+      lambda: shopify_client.get_product_in_shopify(PRODUCT["id"])
+    )
+    self.assertEqual(product["name"], "Almond Cake")
+    self.assertLen(self.requests, 3)
+
+  def test_gives_up_after_max_retries(self) -> None:
+    """Tests that persistent failures return None after the retry budget."""
+    self.responses = [httpx.Response(500)] * 4
+    self.assertIsNone(
+      self._run(lambda: shopify_client.shopify_graphql("{ shop { name } }"))
+    )
+    self.assertLen(self.requests, shopify_client.SHOPIFY_MAX_RETRIES + 1)
+
+  def test_honors_retry_after_on_429(self) -> None:
+    """Tests that a 429 waits for Retry-After before retrying."""
+    self.responses = [
+      httpx.Response(429, headers={"Retry-After": "0.2"}),
+      httpx.Response(200, json={"data": {}}),
+    ]
+
+    async def run():
+      loop = asyncio.get_running_loop()
+      start = loop.time()
+      await shopify_client.shopify_graphql("{ shop { name } }")
+      return loop.time() - start
+
+    self.assertGreaterEqual(self._run(run), 0.2)
+
+  def test_throttled_error_waits_for_cost_budget(self) -> None:
+    """Tests that THROTTLED errors wait for the bucket to refill."""
+    throttled = {
+      "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+      "extensions": {
+        "cost": {
+          "requestedQueryCost": 10,
+          "throttleStatus": {"currentlyAvailable": 5, "restoreRate": 50},
+        }
+      },
+    }
+    self.responses = [
+      httpx.Response(200, json=throttled),
+      httpx.Response(200, json={"data": {}}),
+    ]
+
+    async def run():
+      loop = asyncio.get_running_loop()
+      start = loop.time()
+      body = await shopify_client.shopify_graphql("{ shop { name } }")
+      return body, loop.time() - start
+
+    body, elapsed = self._run(run)
+    self.assertEqual(body, {"data": {}})
+    self.assertGreaterEqual(elapsed, 0.1)
+
+  def test_throttle_delay_from_headers(self) -> None:
+    """Tests the header-based throttle hints."""
+    self.assertEqual(
+      shopify_client._throttle_delay(
+        httpx.Response(429, headers={"Retry-After": "2"}), None
+      ),
+      2.0,
+    )
+    self.assertEqual(
+      shopify_client._throttle_delay(
+        httpx.Response(200, headers={"X-Shopify-Shop-Api-Call-Limit": "40/40"}),
+        {},
+      ),
+      1.0,
+    )
+    self.assertIsNone(
+      shopify_client._throttle_delay(
+        httpx.Response(200, headers={"X-Shopify-Shop-Api-Call-Limit": "3/40"}),
+        {},
+      )
+    )
+
+  def test_get_products_uses_one_nodes_query(self) -> None:
+    """Tests that a batch is one `nodes` query keyed by requested ID."""
+    tulip = {**PRODUCT, "id": "gid://shopify/Product/2", "title": "Tulip"}
+    self.responses = [
+      httpx.Response(200, json={"data": {"nodes": [PRODUCT, None, tulip]}})
+    ]
+    ids = [PRODUCT["id"], "gid://shopify/Product/404", tulip["id"]]
+    products = self._run(
+      lambda: shopify_client.get_products_in_shopify(ids + [PRODUCT["id"]])
+    )
+    self.assertEqual(
+      {pid: p["name"] for pid, p in products.items()},
+      {PRODUCT["id"]: "Almond Cake", tulip["id"]: "Tulip"},
+    )
+    self.assertLen(self.requests, 1)
+    self.assertEqual(
+      json.loads(self.requests[0].content)["variables"]["ids"], ids
+    )
+
+  def test_get_products_chunks_large_batches(self) -> None:
+    """Tests that batches are split at SHOPIFY_NODES_BATCH_SIZE IDs."""
+    self.enter_context(
+      mock.patch.object(shopify_client, "SHOPIFY_NODES_BATCH_SIZE", 2)
+    )
+    self.responses = [
+      httpx.Response(200, json={"data": {"nodes": [None] * size}})
+      for size in (2, 2, 1)
+    ]
+    self._run(
+      lambda: shopify_client.get_products_in_shopify(
+        [f"gid://shopify/Product/{i}" for i in range(5)]
+      )
+    )
+    self.assertLen(self.requests, 3)
+
+  def test_rejected_batch_falls_back_to_single_lookups(self) -> None:
+    """Tests that one malformed ID does not hide the other products."""
+    self.responses = [
+      httpx.Response(200, json={"errors": [{"message": "Invalid id"}]}),
+      httpx.Response(200, json={"data": {"product": PRODUCT}}),
+      httpx.Response(200, json={"errors": [{"message": "Invalid id"}]}),
+    ]
+    products = self._run(
+      lambda: shopify_client.get_products_in_shopify([PRODUCT["id"], "bad"])
+    )
+    self.assertEqual(list(products), [PRODUCT["id"]])
+
+  def test_concurrent_lookups_are_batched(self) -> None:
+    """Tests that lookups in the same tick share one upstream request."""
+    self.responses = [httpx.Response(200, json={"data": {"nodes": [PRODUCT]}})]
+
+    async def run():
+      return await asyncio.gather(
+        *[
+          shopify_client.get_product_in_shopify(PRODUCT["id"]) for _ in range(5)
+        ]
+      )
+
+    products = self._run(run)
+    self.assertEqual([p["name"] for p in products], ["Almond Cake"] * 5)
+    self.assertLen(self.requests, 1)
+
+  def test_loader_propagates_batch_errors(self) -> None:
+    """Tests that a failing batch raises in every waiting lookup."""
+
+    async def fail(product_ids):
+      raise RuntimeError(f"boom {len(product_ids)}")
+
+    loader = shopify_client.ProductLoader(batch_fn=fail)
+
+    async def run():
+      return await asyncio.gather(
+        loader.load("a"), loader.load("b"), return_exceptions=True
+      )
+
+    errors = asyncio.run(run())
+    self.assertEqual([str(e) for e in errors], ["boom 2", "boom 2"])
+
+
+if __name__ == "__main__":
+  absltest.main()
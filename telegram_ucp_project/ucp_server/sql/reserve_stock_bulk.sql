@@ -0,0 +1,68 @@
+--   Copyright 2026 UCP Authors
+--
+--   Licensed under the Apache License, Version 2.0 (the "License");
+--   you may not use this file except in compliance with the License.
+--   You may obtain a copy of the License at
+--
+--       http://www.apache.org/licenses/LICENSE-2.0
+--
+--   Unless required by applicable law or agreed to in writing, software
+--   distributed under the License is distributed on an "AS IS" BASIS,
+--   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+--   See the License for the specific language governing permissions and
+--   limitations under the License.
+
+-- Atomically reserves stock for every item of a cart (all-or-nothing).
+--
+-- Called by db.reserve_stock_bulk via `supabase.rpc("reserve_stock_bulk", ...)`
+-- with a payload of the form:
+--   {"items": [{"product_id": "p1", "quantity": 2}, ...]}
+--
+-- Rows are locked in primary-key order so that concurrent carts sharing
+-- products cannot deadlock. Returns false (and changes nothing) if any
+-- product is unknown or short on stock.
+
+create or replace function reserve_stock_bulk(items jsonb)
+returns boolean
+language plpgsql
+as $$
+declare
+  wanted integer;
+  reserved integer;
+begin
+  create temporary table if not exists _reserve_request (
+    product_id text primary key,
+    quantity integer not null
+  ) on commit drop;
+  truncate _reserve_request;
+
+  insert into _reserve_request (product_id, quantity)
+  select item ->> 'product_id', sum((item ->> 'quantity')::integer)
+  from jsonb_array_elements(items) as item
+  group by item ->> 'product_id';
+
+  select count(*) into wanted from _reserve_request;
+
+  perform 1
+  from products p
+  join _reserve_request r on p.id::text = r.product_id
+  order by p.id
+  for update of p;
+
+  update products p
+  set stock = p.stock - r.quantity
+  from _reserve_request r
+  where p.id::text = r.product_id
+    and p.stock >= r.quantity;
+  get diagnostics reserved = row_count;
+
+  if reserved <> wanted then
+    raise exception 'insufficient stock' using errcode = 'P0001';
+  end if;
+  return true;
+exception
+  when sqlstate 'P0001' then
+    -- Leaving the block through the handler rolls back the partial update.
+    return false;
+end;
+$$;
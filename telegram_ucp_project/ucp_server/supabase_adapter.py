@@ -0,0 +1,146 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Non-blocking Supabase (PostgREST) data access adapter.
+
+The synchronous `supabase` client blocks the event loop for a full network
+round trip on every call. `SupabaseAdapter` talks to the PostgREST endpoint
+(`<SUPABASE_URL>/rest/v1`) directly over a pooled `httpx.AsyncClient` instead,
+with:
+- a concurrency limit shared by all calls made through the adapter, and
+- a per-call deadline covering both the wait for a slot and the request.
+
+Only the small subset of PostgREST used by `db.py` is implemented: filtered
+selects, updates, inserts and stored procedure (RPC) calls.
+"""
+
+import asyncio
+from collections.abc import Iterable
+from typing import Any
+
+import httpx
+
+
+class SupabaseError(Exception):
+  """Raised when a Supabase call fails or exceeds its deadline."""
+
+
+def eq(value: Any) -> str:
+  """Build a PostgREST equality filter."""
+  return f"eq.{value}"
+
+
+def in_(values: Iterable[Any]) -> str:
+  """Build a PostgREST `in` filter, quoting each value."""
+  quoted = []
+  for value in values:
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    quoted.append(f'"{escaped}"')
+  return f"in.({','.join(quoted)})"
+
+
+class SupabaseAdapter:
+  """Async PostgREST client with a concurrency limit and per-call timeouts."""
+
+  def __init__(
+    self,
+    url: str,
+    key: str,
+    *,
+    timeout: float = 5.0,
+    max_concurrency: int = 10,
+    client: httpx.AsyncClient | None = None,
+  ) -> None:
+    """Initialize SupabaseAdapter.
+
+    Args:
+      url: The Supabase project URL (e.g. https://<ref>.supabase.co).
+      key: The API key sent as both `apikey` and bearer token.
+      timeout: Deadline in seconds for each call, including queueing.
+      max_concurrency: Maximum number of calls in flight at once.
+      client: Optional preconfigured client (mainly for tests).
+
+    """
+    self.timeout = timeout
+    self._semaphore = asyncio.Semaphore(max_concurrency)
+    self._client = client or httpx.AsyncClient(
+      base_url=f"{url.rstrip('/')}/rest/v1",
+      headers={"apikey": key, "Authorization": f"Bearer {key}"},
+      limits=httpx.Limits(
+        max_connections=max_concurrency,
+        max_keepalive_connections=max_concurrency,
+      ),
+      timeout=timeout,
+    )
+
+  async def select(
+    self, table: str, columns: str = "*", **filters: str
+  ) -> list[dict[str, Any]]:
+    """Select rows from `table` matching PostgREST `filters`."""
+    return await self._request(
+      "GET", f"/{table}", params={"select": columns, **filters}
+    )
+
+  async def update(
+    self, table: str, values: dict[str, Any], **filters: str
+  ) -> list[dict[str, Any]]:
+    """Update rows of `table` matching `filters`, returning them."""
+    return await self._request(
+      "PATCH",
+      f"/{table}",
+      params=filters,
+      json=values,
+      headers={"Prefer": "return=representation"},
+    )
+
+  async def insert(
+    self, table: str, row: dict[str, Any]
+  ) -> list[dict[str, Any]]:
+    """Insert a row into `table`, returning the stored row."""
+    return await self._request(
+      "POST",
+      f"/{table}",
+      json=row,
+      headers={"Prefer": "return=representation"},
+    )
+
+  async def rpc(self, function: str, params: dict[str, Any]) -> Any:
+    """Call a stored procedure and return its decoded result."""
+    return await self._request("POST", f"/rpc/{function}", json=params)
+
+  async def aclose(self) -> None:
+    """Close the underlying connection pool."""
+    await self._client.aclose()
+
+  async def _request(self, method: str, path: str, **kwargs: Any) -> Any:
+    """Send one request under the concurrency limit and deadline."""
+    try:
+      return await asyncio.wait_for(
+        self._send(method, path, **kwargs), timeout=self.timeout
+      )
+    except asyncio.TimeoutError as e:
+      raise SupabaseError(
+        f"{method} {path} timed out after {self.timeout}s"
+      ) from e
+    except httpx.HTTPError as e:
+      raise SupabaseError(f"{method} {path} failed: {e}") from e
+
+  async def _send(self, method: str, path: str, **kwargs: Any) -> Any:
+    """Send a request once a concurrency slot is free."""
+    async with self._semaphore:
+      response = await self._client.request(method, path, **kwargs)
+    response.raise_for_status()
+    if not response.content:
+      return None
+    return response.json()
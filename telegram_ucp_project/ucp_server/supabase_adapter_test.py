@@ -0,0 +1,267 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for the async Supabase adapter against a stub PostgREST server."""
+
+import asyncio
+import http.server
+import json
+from pathlib import Path
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from absl.testing import absltest
+import db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+import supabase_adapter
+
+
+class StubPostgrest(http.server.ThreadingHTTPServer):
+  """Minimal in-memory PostgREST lookalike for the `products` schema."""
+
+  def __init__(self) -> None:
+    """Start listening on an ephemeral localhost port."""
+    super().__init__(("127.0.0.1", 0), StubPostgrestHandler)
+    self.products = {
+      "rose": {"id": "rose", "name": "Red Rose", "price": 10.0, "stock": 5},
+      "tulip": {"id": "tulip", "name": "Tulip", "price": 8.0, "stock": 2},
+    }
+    self.orders = []
+    self.requests = []
+    self.delay = 0.0
+    self.lock = threading.Lock()
+
+  @property
+  def url(self) -> str:
+    """Base URL of the stub project."""
+    return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubPostgrestHandler(http.server.BaseHTTPRequestHandler):
+  """Serves selects, inserts and the reserve_stock_bulk RPC."""
+
+  server: StubPostgrest
+
+  def log_message(self, *args) -> None:  # noqa: D102
+    del args
+
+  def _reply(self, status: int, body) -> None:
+    data = json.dumps(body).encode()
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def _body(self):
+    length = int(self.headers.get("Content-Length", 0))
+    return json.loads(self.rfile.read(length) or b"null")
+
+  def do_GET(self) -> None:  # noqa: N802, D102
+    url = urllib.parse.urlparse(self.path)
+    params = dict(urllib.parse.parse_qsl(url.query))
+    self.server.requests.append(("GET", url.path, params))
+    time.sleep(self.server.delay)
+    if url.path != "/rest/v1/products":
+      self._reply(404, {"message": "unknown table"})
+      return
+    rows = list(self.server.products.values())
+    id_filter = params.get("id", "")
+    if id_filter.startswith("eq."):
+      rows = [r for r in rows if r["id"] == id_filter[3:]]
+    elif id_filter.startswith("in."):
+      wanted = set(re.findall(r'"((?:[^"\\]|\\.)*)"', id_filter))
+      rows = [r for r in rows if r["id"] in wanted]
+    columns = params.get("select", "*")
+    if columns != "*":
+      rows = [{c: r[c] for c in columns.split(",")} for r in rows]
+    self._reply(200, rows)
+
+  def do_POST(self) -> None:  # noqa: N802, D102
+    body = self._body()
+    self.server.requests.append(("POST", self.path, body))
+    if self.path == "/rest/v1/orders":
+      self.server.orders.append(body)
+      self._reply(201, [body])
+    elif self.path == "/rest/v1/rpc/reserve_stock_bulk":
+      with self.server.lock:
+        products = self.server.products
+        ok = all(
+          i["product_id"] in products
+          and products[i["product_id"]]["stock"] >= i["quantity"]
+          for i in body["items"]
+        )
+        if ok:
+          for i in body["items"]:
+            products[i["product_id"]]["stock"] -= i["quantity"]
+      self._reply(200, ok)
+    else:
+      self._reply(404, {"message": "unknown route"})
+
+
+class SupabaseAdapterTest(absltest.TestCase):
+  """Tests for SupabaseAdapter and the db helpers that use it."""
+
+  def setUp(self) -> None:
+    """Start the stub server and a local Products/Transactions DB."""
+    super().setUp()
+    db.reference_cache.clear()
+    self.stub = StubPostgrest()
+    threading.Thread(target=self.stub.serve_forever, daemon=True).start()
+
+    self.test_dir = Path(tempfile.mkdtemp())
+    self.engine = create_async_engine(
+      f"sqlite+aiosqlite:///{self.test_dir / 'test.db'}", echo=False
+    )
+    self.session_factory = sessionmaker(
+      self.engine, expire_on_commit=False, class_=AsyncSession
+    )
+
+    async def init_schemas() -> None:
+      async with self.engine.begin() as conn:
+        await conn.run_sync(db.ProductBase.metadata.create_all)
+        await conn.run_sync(db.TransactionBase.metadata.create_all)
+      async with self.session_factory() as session:
+        session.add(db.Product(id="lily", title="Lily", price=1200))
+        await session.commit()
+
+    asyncio.run(init_schemas())
+
+  def tearDown(self) -> None:
+    """Stop the stub server and remove the local DB."""
+    db.supabase = None
+    self.stub.shutdown()
+    self.stub.server_close()
+    asyncio.run(self.engine.dispose())
+    shutil.rmtree(self.test_dir)
+    super().tearDown()
+
+  def _run_with_adapter(self, coro_fn, **adapter_kwargs):
+    """Run `coro_fn(session)` with db.supabase pointed at the stub."""
+
+    async def run():
+      db.supabase = supabase_adapter.SupabaseAdapter(
+        self.stub.url, "test-key", **adapter_kwargs
+      )
+      try:
+        async with self.session_factory() as session:
+          return await coro_fn(session)
+      finally:
+        await db.supabase.aclose()
+
+    return asyncio.run(run())
+
+  def test_in_filter_quotes_values(self) -> None:
+    """Tests that `in` filters survive commas and quotes in IDs."""
+    self.assertEqual(supabase_adapter.in_(["a,b", 'c"d']), 'in.("a,b","c\\"d")')
+
+  def test_get_products_uses_one_in_query(self) -> None:
+    """Tests that the batch lookup is one `in` query plus SQLite fallback."""
+
+    async def lookup(session):
+      return await db.get_products(session, ["rose", "tulip", "lily"])
+
+    products = self._run_with_adapter(lookup)
+    self.assertEqual(
+      {p.id: p.price for p in products},
+      {"rose": 1000, "tulip": 800, "lily": 1200},
+    )
+    self.assertLen(self.stub.requests, 1)
+    self.assertEqual(
+      self.stub.requests[0][2]["id"], 'in.("rose","tulip","lily")'
+    )
+
+  def test_get_inventory_and_reserve_stock(self) -> None:
+    """Tests stock reads and atomic reservations through the RPC."""
+
+    async def reserve(session):
+      first = await db.reserve_stock_bulk(session, [("rose", 3), ("tulip", 2)])
+      second = await db.reserve_stock(session, "rose", 3)
+      return first, second, await db.get_inventory(session, "rose")
+
+    self.assertEqual(self._run_with_adapter(reserve), (True, False, 2))
+    self.assertEqual(self.stub.products["tulip"]["stock"], 0)
+
+  def test_save_order_inserts_remote_row(self) -> None:
+    """Tests that orders are mirrored to the remote `orders` table."""
+
+    async def save(session):
+      await db.save_order(session, "order_1", {"line_items": [{"id": "li"}]})
+      await session.commit()
+      return await db.get_order(session, "order_1")
+
+    self.assertEqual(
+      self._run_with_adapter(save), {"line_items": [{"id": "li"}]}
+    )
+    self.assertEqual(self.stub.orders[0]["order_id"], "order_1")
+
+  def test_slow_call_times_out_and_falls_back(self) -> None:
+    """Tests that a slow Supabase call is abandoned after its deadline."""
+    self.stub.delay = 1.0
+
+    async def lookup(session):
+      start = time.perf_counter()
+      product = await db.get_product(session, "lily")
+      return product.title, time.perf_counter() - start
+
+    title, elapsed = self._run_with_adapter(lookup, timeout=0.2)
+    self.assertEqual(title, "Lily")
+    self.assertLess(elapsed, 0.9)
+
+  def test_calls_do_not_block_the_event_loop(self) -> None:
+    """Tests that other tasks keep running while Supabase calls are slow."""
+    self.stub.delay = 0.3
+
+    async def lookup(session):
+      ticks = 0
+
+      async def ticker():
+        nonlocal ticks
+        while True:
+          await asyncio.sleep(0.01)
+          ticks += 1
+
+      task = asyncio.create_task(ticker())
+      await asyncio.gather(
+        db.get_inventory(session, "rose"), db.get_inventory(session, "tulip")
+      )
+      task.cancel()
+      return ticks
+
+    self.assertGreater(self._run_with_adapter(lookup), 10)
+
+  def test_concurrency_limit(self) -> None:
+    """Tests that at most `max_concurrency` calls are in flight."""
+    self.stub.delay = 0.2
+
+    async def lookup(session):
+      del session
+      start = time.perf_counter()
+      await asyncio.gather(
+        *[db.supabase.select("products", id="eq.rose") for _ in range(4)]
+      )
+      return time.perf_counter() - start
+
+    elapsed = self._run_with_adapter(lookup, max_concurrency=2)
+    self.assertGreaterEqual(elapsed, 0.4)
+
+
+if __name__ == "__main__":
+  absltest.main()
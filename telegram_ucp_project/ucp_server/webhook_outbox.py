@@ -0,0 +1,288 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Background delivery of webhook events from the transactional outbox.
+
+`CheckoutService` no longer POSTs to the platform webhook while the buyer
+waits. It writes the event to the `webhook_outbox` table in the same commit
+as the order (see `db.enqueue_webhook_event`), and `WebhookDispatcher`
+delivers it afterwards:
+- a claimer task claims due events in batches (`db.claim_webhook_events`)
+  and groups them by URL;
+- a pool of workers delivers each group in order over a shared, pooled
+  `httpx.AsyncClient`, with at most `max_per_endpoint` groups in flight per
+  URL, and records the outcomes of a group in one transaction;
+- failed deliveries are retried with exponential backoff and full jitter, up
+  to `max_attempts`; 4xx responses other than 408 and 429 are not retried.
+
+Delivery is at least once: an event whose dispatcher dies mid-delivery is
+claimed again when its lease runs out. Receivers should deduplicate on the
+`event_id` field of the payload.
+
+The server lifespan runs one dispatcher (`start_dispatcher`/
+`stop_dispatcher`); `wake()` lets a committing request skip the poll wait.
+"""
+
+import asyncio
+import collections
+from collections.abc import Callable
+import contextlib
+import logging
+import random
+import time
+from typing import Any
+
+import db
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying; other 4xx responses are permanent failures.
+RETRYABLE_CLIENT_ERRORS = frozenset({408, 429})
+
+# Dispatcher run by the server lifespan, if any.
+_dispatcher: "WebhookDispatcher | None" = None
+
+
+class WebhookDispatcher:
+  """Delivers outbox events with a worker pool and per-endpoint limits."""
+
+  def __init__(
+    self,
+    session_factory: Callable[[], AsyncSession],
+    *,
+    workers: int = 4,
+    max_per_endpoint: int = 2,
+    batch_size: int = 50,
+    max_attempts: int = 8,
+    base_backoff: float = 1.0,
+    max_backoff: float = 300.0,
+    timeout: float = 5.0,
+    lease_seconds: float = 300.0,
+    poll_interval: float = 1.0,
+    client: httpx.AsyncClient | None = None,
+    clock: Callable[[], float] = time.time,
+  ) -> None:
+    """Initialize WebhookDispatcher.
+
+    Args:
+      session_factory: Factory for Transactions DB sessions.
+      workers: Number of groups delivered concurrently.
+      max_per_endpoint: Maximum groups in flight for one webhook URL.
+      batch_size: Maximum events claimed at once.
+      max_attempts: Attempts before an event is marked `failed`.
+      base_backoff: Delay ceiling in seconds after the first failure.
+      max_backoff: Upper bound of the delay ceiling.
+      timeout: Deadline in seconds of one delivery.
+      lease_seconds: How long claimed events stay invisible to other
+        dispatchers; must exceed the time a group may wait for a worker.
+      poll_interval: Seconds between polls when the outbox is idle.
+      client: Optional preconfigured client (mainly for tests).
+      clock: Wall-clock time source (epoch seconds), injectable for tests.
+
+    """
+    self._session_factory = session_factory
+    self.workers = workers
+    self.max_per_endpoint = max_per_endpoint
+    self.batch_size = batch_size
+    self.max_attempts = max_attempts
+    self.base_backoff = base_backoff
+    self.max_backoff = max_backoff
+    self.lease_seconds = lease_seconds
+    self.poll_interval = poll_interval
+    self._clock = clock
+    self._client = client or httpx.AsyncClient(
+      timeout=timeout,
+      limits=httpx.Limits(
+        max_connections=workers * max_per_endpoint,
+        max_keepalive_connections=workers * max_per_endpoint,
+      ),
+    )
+    self._endpoint_slots: dict[str, asyncio.Semaphore] = (
+      collections.defaultdict(lambda: asyncio.Semaphore(max_per_endpoint))
+    )
+    self._queue: asyncio.Queue | None = None
+    self._wakeup = asyncio.Event()
+    self._tasks: list[asyncio.Task] = []
+    self.delivered = self.retried = self.failed = 0
+
+  def wake(self) -> None:
+    """Poll the outbox now instead of after the poll interval."""
+    self._wakeup.set()
+
+  def start(self) -> None:
+    """Start the claimer and the workers on the running event loop."""
+    self._queue = asyncio.Queue(maxsize=self.workers)
+    self._tasks = [asyncio.create_task(self._claim_loop())]
+    self._tasks += [
+      asyncio.create_task(self._worker()) for _ in range(self.workers)
+    ]
+
+  async def aclose(self) -> None:
+    """Stop the tasks and close the connection pool.
+
+    Groups still queued keep their lease and are delivered after a restart.
+    """
+    for task in self._tasks:
+      task.cancel()
+    await asyncio.gather(*self._tasks, return_exceptions=True)
+    self._tasks = []
+    await self._client.aclose()
+
+  async def run_once(self) -> int:
+    """Claim and deliver one batch in the foreground; returns its size."""
+    groups = await self._claim()
+    await asyncio.gather(*[self._deliver_group(g) for g in groups])
+    return sum(len(g) for g in groups)
+
+  async def _claim(self) -> list[list[db.WebhookEvent]]:
+    """Claim due events and group them by URL, keeping creation order."""
+    async with self._session_factory() as session:
+      events = await db.claim_webhook_events(
+        session, self._clock(), self.lease_seconds, self.batch_size
+      )
+      await session.commit()
+    groups: dict[str, list[db.WebhookEvent]] = {}
+    for event in events:
+      groups.setdefault(event.url, []).append(event)
+    return list(groups.values())
+
+  async def _claim_loop(self) -> None:
+    while True:
+      try:
+        groups = await self._claim()
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error("Failed to claim webhook events: %s", e)
+        groups = []
+      for group in groups:
+        await self._queue.put(group)
+      if sum(len(g) for g in groups) >= self.batch_size:
+        continue  # More may be due already.
+      with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+      self._wakeup.clear()
+
+  async def _worker(self) -> None:
+    while True:
+      group = await self._queue.get()
+      try:
+        await self._deliver_group(group)
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        logger.error("Failed to deliver webhooks to %s: %s", group[0].url, e)
+      finally:
+        self._queue.task_done()
+
+  async def _deliver_group(self, group: list[db.WebhookEvent]) -> None:
+    """Deliver events bound for one URL in order; record all outcomes."""
+    url = group[0].url
+    outcomes: list[tuple[db.WebhookEvent, str | None, bool]] = []
+    async with self._endpoint_slots[url]:
+      unreachable = None
+      for event in group:
+        if unreachable is not None:
+          # No point hammering an endpoint that just refused a connection.
+          outcomes.append((event, unreachable, True))
+          continue
+        try:
+          error, retryable = await self._post(event)
+        except httpx.TransportError as e:
+          unreachable = error = f"unreachable: {e!r}"
+          retryable = True
+        outcomes.append((event, error, retryable))
+
+    async with self._session_factory() as session:
+      for event, error, retryable in outcomes:
+        await db.update_webhook_event(
+          session, event.id, **self._outcome(event, error, retryable)
+        )
+      await session.commit()
+
+  async def _post(self, event: db.WebhookEvent) -> tuple[str | None, bool]:
+    """POST one event; returns (error or None, whether to retry).
+
+    Raises:
+      httpx.TransportError: The endpoint could not be reached.
+
+    """
+    payload = {"event_id": event.id, **event.payload}
+    response = await self._client.post(event.url, json=payload)
+    if response.is_success:
+      return None, False
+    status = response.status_code
+    retryable = status >= 500 or status in RETRYABLE_CLIENT_ERRORS
+    return f"HTTP {status}", retryable
+
+  def _outcome(
+    self, event: db.WebhookEvent, error: str | None, retryable: bool
+  ) -> dict[str, Any]:
+    """Column values recording one delivery attempt."""
+    attempts = event.attempts + 1
+    if error is None:
+      self.delivered += 1
+      return {"status": "delivered", "attempts": attempts, "last_error": None}
+    if not retryable or attempts >= self.max_attempts:
+      self.failed += 1
+      logger.error(
+        "Giving up on webhook %s to %s after %d attempts: %s",
+        event.id,
+        event.url,
+        attempts,
+        error,
+      )
+      return {"status": "failed", "attempts": attempts, "last_error": error}
+    self.retried += 1
+    return {
+      "attempts": attempts,
+      "last_error": error,
+      "next_attempt_at": self._clock() + self._backoff_delay(attempts),
+    }
+
+  def _backoff_delay(self, attempts: int) -> float:
+    """Exponential backoff with full jitter."""
+    ceiling = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+    return random.uniform(0, ceiling)
+
+  def stats(self) -> dict[str, int]:
+    """Return delivery counters."""
+    return {
+      "delivered": self.delivered,
+      "retried": self.retried,
+      "failed": self.failed,
+    }
+
+
+def start_dispatcher(
+  session_factory: Callable[[], AsyncSession], **options: Any
+) -> WebhookDispatcher:
+  """Create and start the server's dispatcher. `options` go to the class."""
+  global _dispatcher
+  _dispatcher = WebhookDispatcher(session_factory, **options)
+  _dispatcher.start()
+  return _dispatcher
+
+
+async def stop_dispatcher() -> None:
+  """Stop the server's dispatcher, if running."""
+  global _dispatcher
+  if _dispatcher is not None:
+    logger.info("Webhook outbox stats: %s", _dispatcher.stats())
+    await _dispatcher.aclose()
+    _dispatcher = None
+
+
+def wake() -> None:
+  """Tell the server's dispatcher, if any, that new events were committed."""
+  if _dispatcher is not None:
+    _dispatcher.wake()
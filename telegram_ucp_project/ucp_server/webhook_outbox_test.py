@@ -0,0 +1,259 @@
+#   Copyright 2026 UCP Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Tests for the webhook outbox and its background dispatcher."""
+
+import asyncio
+import json
+from pathlib import Path
+import shutil
+import tempfile
+import time
+
+from absl.testing import absltest
+import db
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+import webhook_outbox
+
+HOOK = "http://platform.test/webhooks"
+OTHER_HOOK = "http://other.test/webhooks"
+
+
+class WebhookOutboxTest(absltest.TestCase):
+  """Tests for enqueueing, delivery, retries and per-endpoint limits."""
+
+  def setUp(self) -> None:
+    """Create a temporary Transactions DB and a scripted transport."""
+    super().setUp()
+    self.test_dir = Path(tempfile.mkdtemp())
+    self.engine = create_async_engine(
+      f"sqlite+aiosqlite:///{self.test_dir / 'transactions.db'}", echo=False
+    )
+    self.session_factory = sessionmaker(
+      self.engine, expire_on_commit=False, class_=AsyncSession
+    )
+
+    async def init_schema() -> None:
+      async with self.engine.begin() as conn:
+        await conn.run_sync(db.TransactionBase.metadata.create_all)
+
+    asyncio.run(init_schema())
+    self.now = 1_000_000.0
+    self.requests = []
+    self.statuses = []
+
+  def tearDown(self) -> None:
+    """Dispose the engine and remove the temporary DB."""
+    asyncio.run(self.engine.dispose())
+    shutil.rmtree(self.test_dir)
+    super().tearDown()
+
+  def _handler(self, request: httpx.Request) -> httpx.Response:
+    self.requests.append((str(request.url), json.loads(request.content)))
+    status = self.statuses.pop(0) if self.statuses else 200
+    if isinstance(status, Exception):
+      raise status
+    return httpx.Response(status)
+
+  def _dispatcher(self, **options) -> webhook_outbox.WebhookDispatcher:
+    return webhook_outbox.WebhookDispatcher(
+      self.session_factory,
+      client=httpx.AsyncClient(transport=httpx.MockTransport(self._handler)),
+      clock=lambda: self.now,
+      **options,
+    )
+
+  async def _enqueue(self, *events: tuple[str, str]) -> None:
+    async with self.session_factory() as session:
+      for url, event_type in events:
+        await db.enqueue_webhook_event(
+          session, url, event_type, {"event_type": event_type}
+        )
+      await session.commit()
+
+  async def _rows(self) -> list[db.WebhookEvent]:
+    async with self.session_factory() as session:
+      result = await session.execute(
+        select(db.WebhookEvent).order_by(db.WebhookEvent.id)
+      )
+      return list(result.scalars().all())
+
+  def _run(self, coro_fn, **options):
+    """Run `coro_fn(dispatcher)`; enqueued events are due at `self.now`."""
+
+    async def run():
+      dispatcher = self._dispatcher(**options)
+      try:
+        return await coro_fn(dispatcher)
+      finally:
+        await dispatcher.aclose()
+
+    return asyncio.run(run())
+
+  def test_enqueue_commits_with_the_caller(self) -> None:
+    """Tests that a rolled back transaction leaves no outbox event."""
+
+    async def scenario():
+      async with self.session_factory() as session:
+        await db.enqueue_webhook_event(session, HOOK, "order_placed", {})
+        await session.rollback()
+      return await self._rows()
+
+    self.assertEmpty(asyncio.run(scenario()))
+
+  def test_event_is_delivered_once(self) -> None:
+    """Tests delivery, the event_id field and that rows are not resent."""
+    self.now = time.time() + 1
+
+    async def scenario(dispatcher):
+      await self._enqueue((HOOK, "order_placed"))
+      delivered = await dispatcher.run_once()
+      again = await dispatcher.run_once()
+      return delivered, again, await self._rows()
+
+    delivered, again, rows = self._run(scenario)
+    self.assertEqual((delivered, again), (1, 0))
+    self.assertEqual(
+      self.requests,
+      [(HOOK, {"event_id": rows[0].id, "event_type": "order_placed"})],
+    )
+    self.assertEqual(rows[0].status, "delivered")
+    self.assertEqual(rows[0].attempts, 1)
+    self.assertIsNone(rows[0].claim_token)
+
+  def test_server_error_is_retried_with_backoff(self) -> None:
+    """Tests that a 5xx reschedules the event and a later attempt succeeds."""
+    self.now = time.time() + 1
+    self.statuses = [503]
+
+    async def scenario(dispatcher):
+      await self._enqueue((HOOK, "order_placed"))
+      await dispatcher.run_once()
+      rescheduled = (await self._rows())[0]
+      not_due = await dispatcher.run_once()
+      self.now += 10
+      retried = await dispatcher.run_once()
+      return rescheduled, not_due, retried, await self._rows()
+
+    rescheduled, not_due, retried, rows = self._run(
+      scenario, base_backoff=5.0
+    )
+    self.assertEqual(rescheduled.status, "pending")
+    self.assertEqual(rescheduled.attempts, 1)
+    self.assertEqual(rescheduled.last_error, "HTTP 503")
+    self.assertBetween(rescheduled.next_attempt_at, self.now - 10, self.now - 5)
+    self.assertEqual((not_due, retried), (0, 1))
+    self.assertEqual(rows[0].status, "delivered")
+    self.assertEqual(rows[0].attempts, 2)
+
+  def test_client_error_is_not_retried(self) -> None:
+    """Tests that a 4xx other than 408/429 fails the event immediately."""
+    self.now = time.time() + 1
+    self.statuses = [400]
+
+    async def scenario(dispatcher):
+      await self._enqueue((HOOK, "order_placed"))
+      await dispatcher.run_once()
+      return await self._rows(), dispatcher.stats()
+
+    rows, stats = self._run(scenario)
+    self.assertEqual(rows[0].status, "failed")
+    self.assertEqual(stats, {"delivered": 0, "retried": 0, "failed": 1})
+
+  def test_gives_up_after_max_attempts(self) -> None:
+    """Tests that an event is failed once it used up its attempts."""
+    self.now = time.time() + 1
+    self.statuses = [500, 500]
+
+    async def scenario(dispatcher):
+      await self._enqueue((HOOK, "order_placed"))
+      await dispatcher.run_once()
+      self.now += 60
+      await dispatcher.run_once()
+      return await self._rows()
+
+    rows = self._run(scenario, max_attempts=2)
+    self.assertEqual(rows[0].status, "failed")
+    self.assertEqual(rows[0].attempts, 2)
+
+  def test_unreachable_endpoint_skips_rest_of_batch(self) -> None:
+    """Tests that one connection error reschedules the URL's whole batch."""
+    self.now = time.time() + 1
+    self.statuses = [httpx.ConnectError("refused"), 200]
+
+    async def scenario(dispatcher):
+      await self._enqueue(
+        (HOOK, "order_placed"),
+        (HOOK, "order_shipped"),
+        (OTHER_HOOK, "order_placed"),
+      )
+      await dispatcher.run_once()
+      return await self._rows()
+
+    rows = self._run(scenario)
+    self.assertEqual([url for url, _ in self.requests], [HOOK, OTHER_HOOK])
+    self.assertEqual(
+      [(r.url, r.status, r.attempts) for r in rows],
+      [
+        (HOOK, "pending", 1),
+        (HOOK, "pending", 1),
+        (OTHER_HOOK, "delivered", 1),
+      ],
+    )
+
+  def test_per_endpoint_concurrency_limit(self) -> None:
+    """Tests that background workers respect `max_per_endpoint`."""
+    in_flight = {HOOK: 0, OTHER_HOOK: 0}
+    peak = {HOOK: 0, OTHER_HOOK: 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+      url = str(request.url)
+      in_flight[url] += 1
+      peak[url] = max(peak[url], in_flight[url])
+      await asyncio.sleep(0.02)
+      in_flight[url] -= 1
+      return httpx.Response(200)
+
+    async def scenario():
+      await self._enqueue(*[(HOOK, "order_placed")] * 4)
+      await self._enqueue(*[(OTHER_HOOK, "order_placed")] * 4)
+      dispatcher = webhook_outbox.WebhookDispatcher(
+        self.session_factory,
+        client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        workers=4,
+        max_per_endpoint=1,
+        batch_size=1,
+        poll_interval=0.01,
+      )
+      dispatcher.start()
+      try:
+        for _ in range(200):
+          if dispatcher.stats()["delivered"] == 8:
+            break
+          await asyncio.sleep(0.01)
+      finally:
+        await dispatcher.aclose()
+      return dispatcher.stats()
+
+    stats = asyncio.run(scenario())
+    self.assertEqual(stats["delivered"], 8)
+    self.assertEqual(peak, {HOOK: 1, OTHER_HOOK: 1})
+
+
+if __name__ == "__main__":
+  absltest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Concurrent dispatch of the function calls of one model turn
+
+When the model asks for several tools in one turn (say, three product
+searches), running them one after another costs the sum of their latencies.
+dispatch_tool_calls() starts every call at once on the shared MCP session
+and returns the results in the order the model asked for them.
+
+Calls that depend on an earlier call of the same turn still wait for it:
+DEPENDS_ON lists, per tool, the tools whose effects it needs (an item can
+only be added to a cart that exists). If a prerequisite fails, the
+dependent call is skipped; a call has failed if the MCP result is an error
+or, as mcp_server_official reports backend failures, its payload carries
+an "error" key. Every call has a timeout (TOOL_TIMEOUTS, else
+DEFAULT_TOOL_TIMEOUT) after which it is cancelled and reported as an error.
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+
+DEFAULT_TOOL_TIMEOUT = 15.0
+TOOL_TIMEOUTS = {"create_order": 30.0}
+
+# tool -> tools that must finish first when called earlier in the same turn
+DEPENDS_ON = {
+    "add_item_to_cart": {"create_cart"},
+    "get_cart": {"create_cart", "add_item_to_cart"},
+    "create_order": {"create_cart", "add_item_to_cart"},
+    "get_order_status": {"create_order"},
+}
+
+
+@dataclass
+class ToolCallResult:
+    name: str
+    args: dict
+    data: dict
+    elapsed_ms: float = 0.0
+    ok: bool = True
+
+
+def _parse(result) -> dict:
+    result_text = result.content[0].text if result.content else "{}"
+    try:
+        return json.loads(result_text)
+    except Exception:
+        return {"result": result_text}
+
+
+async def _run(mcp_client, name: str, args: dict, prerequisites: list) -> ToolCallResult:
+    for prerequisite in prerequisites:
+        done = await prerequisite
+        if not done.ok:
+            return ToolCallResult(name, args, {"error": f"skipped: {done.name} failed"}, ok=False)
+
+    start = time.perf_counter()
+    timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+    try:
+        result = await asyncio.wait_for(mcp_client.call_tool(name, args), timeout)
+        data = _parse(result)
+        # Backend failures come back as ordinary results with an "error" key.
+        ok = not result.isError and not (isinstance(data, dict) and "error" in data)
+    except asyncio.TimeoutError:
+        data, ok = {"error": f"{name} timed out after {timeout:g}s"}, False
+    except Exception as e:
+        data, ok = {"error": str(e)}, False
+    return ToolCallResult(name, args, data, (time.perf_counter() - start) * 1000, ok)
+
+
+async def dispatch_tool_calls(mcp_client, calls: list[tuple[str, dict]]) -> list[ToolCallResult]:
+    """Run (name, args) calls concurrently, honouring DEPENDS_ON; results in call order."""
+    tasks = []
+    for name, args in calls:
+        prerequisites = [task for (earlier, _), task in zip(calls, tasks) if earlier in DEPENDS_ON.get(name, ())]
+        tasks.append(asyncio.ensure_future(_run(mcp_client, name, args, prerequisites)))
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        # On cancellation (e.g. Ctrl-C) do not leave calls running.
+        for task in tasks:
+            task.cancel()
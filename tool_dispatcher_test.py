@@ -0,0 +1,48 @@
+"""Tests for tool_dispatcher: concurrency, dependencies and failures."""
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+
+from tool_dispatcher import dispatch_tool_calls
+
+
+class FakeMCPClient:
+    """Answers call_tool() from a dict of tool name -> JSON payload."""
+
+    def __init__(self, payloads: dict):
+        self.payloads = payloads
+        self.called = []
+
+    async def call_tool(self, name: str, args: dict):
+        self.called.append(name)
+        await asyncio.sleep(0)
+        text = json.dumps(self.payloads[name])
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], isError=False)
+
+
+class DispatchToolCallsTest(unittest.TestCase):
+    def test_results_keep_call_order(self):
+        client = FakeMCPClient({"search_products": {"items": []}, "get_cart": {"items": []}})
+        results = asyncio.run(dispatch_tool_calls(client, [("search_products", {"q": "honey"}), ("get_cart", {})]))
+        self.assertEqual([r.name for r in results], ["search_products", "get_cart"])
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_error_payload_fails_the_call_and_skips_dependents(self):
+        client = FakeMCPClient({
+            "create_cart": {"error": "Backend error: unavailable"},
+            "add_item_to_cart": {"cart_id": "c1"},
+            "search_products": {"items": []},
+        })
+        calls = [("create_cart", {}), ("add_item_to_cart", {"product_id": "p1"}), ("search_products", {})]
+        create, add, search = asyncio.run(dispatch_tool_calls(client, calls))
+
+        self.assertFalse(create.ok)
+        self.assertFalse(add.ok)
+        self.assertEqual(add.data, {"error": "skipped: create_cart failed"})
+        self.assertTrue(search.ok)
+        self.assertNotIn("add_item_to_cart", client.called)
+
+
+if __name__ == "__main__":
+    unittest.main()